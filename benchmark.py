@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import List, Tuple, Dict
+import numpy as np
+from components.grid_environment_3d import Grid3DEnvironment
+from components.chunked_grid import ChunkedGrid3DEnvironment
+from pathfinding_algorithms_3d import Pathfinding3DAlgorithms
+
+BENCHMARK_VERSION = 1
+
+# name -> (rows, cols, height)
+SIZES = {
+    'demo': (35, 35, 5),
+    'medium': (100, 100, 10),
+    'large': (250, 250, 10),
+    'city': (1000, 1000, 20),
+}
+ALGORITHMS = ['dijkstra', 'a_star']
+MAP_TYPES = ['random', 'buildings']
+STORAGE = {
+    'dense': Grid3DEnvironment,
+    'chunked': ChunkedGrid3DEnvironment,
+}
+DISPLAY_MODULES = ('pygame', 'requests', 'PIL')
+
+STARTUP_SNIPPET = (
+    "import sys, time, json\n"
+    "t0 = time.perf_counter()\n"
+    "import pathfinding_algorithms_3d\n"
+    "elapsed = time.perf_counter() - t0\n"
+    "print(json.dumps([elapsed, [m for m in %r if m in sys.modules]]))\n" % (DISPLAY_MODULES,)
+)
+
+
+def measure_startup(runs: int = 5) -> Dict:
+    # Each run is a fresh interpreter so module caches don't hide the import cost
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    import_times = []
+    process_times = []
+    loaded = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_SNIPPET], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout
+        process_times.append(time.perf_counter() - t0)
+        elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+        import_times.append(elapsed)
+    return {
+        'solver_import_ms': float(np.median(import_times) * 1000.0),
+        'process_startup_ms': float(np.median(process_times) * 1000.0),
+        'display_modules_loaded': loaded,
+    }
+
+
+def build_map(rows: int, cols: int, height: int, map_type: str, seed: int, density: float = 0.15,
+              storage: str = 'dense') -> Grid3DEnvironment:
+    random.seed(seed)
+    grid = STORAGE[storage](rows, cols, height)
+    if map_type == 'random':
+        grid.generate_random_obstacles(density)
+    elif map_type == 'tiled':
+        grid.generate_city(seed)
+    else:
+        grid.generate_buildings(use_recursive=(map_type == 'recursive'))
+    return grid
+
+
+def make_queries(grid: Grid3DEnvironment, count: int, seed: int) -> List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]]:
+    rng = random.Random(seed)
+    free_cells = [(0, row, col) for row in range(grid.rows) for col in range(grid.cols)
+                  if not grid.is_obstacle(0, row, col)]
+    queries = []
+    for _ in range(count):
+        start, goal = rng.sample(free_cells, 2)
+        queries.append((start, goal))
+    return queries
+
+
+def path_cost(grid: Grid3DEnvironment, path: List[Tuple[int, int, int]]) -> float:
+    return float(sum(grid.get_cost(z, row, col) for z, row, col in path[1:]))
+
+
+def run_case(grid: Grid3DEnvironment, algorithm: str, queries, measure_memory: bool = True,
+             instrument: bool = False) -> Dict:
+    pathfinder = Pathfinding3DAlgorithms(grid, instrument=instrument)
+    search = getattr(pathfinder, algorithm)
+    latencies = []
+    nodes = 0
+    costs = []
+    found = 0
+    counters = {}
+
+    for start, goal in queries:
+        t0 = time.perf_counter()
+        path, metrics = search(start, goal)
+        latencies.append(time.perf_counter() - t0)
+        nodes += metrics['nodes_explored']
+        for name, value in metrics.get('counters', {}).items():
+            if name.startswith('peak_'):
+                counters[name] = max(counters.get(name, 0), value)
+            else:
+                counters[name] = counters.get(name, 0) + value
+        if path:
+            found += 1
+            costs.append(path_cost(grid, path))
+
+    # tracemalloc slows the interpreter down, so memory gets its own pass
+    peak_memory = None
+    if measure_memory:
+        peak_memory = 0
+        for start, goal in queries:
+            tracemalloc.start()
+            search(start, goal)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    total_time = sum(latencies)
+    latencies_ms = np.array(latencies) * 1000.0
+    case = {
+        'algorithm': algorithm,
+        'queries': len(queries),
+        'paths_found': found,
+        'nodes_explored': nodes,
+        'nodes_per_sec': nodes / total_time if total_time > 0 else 0.0,
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'max': float(latencies_ms.max()),
+        },
+        'peak_memory_bytes': peak_memory,
+        'total_path_cost': float(sum(costs)),
+    }
+    if counters:
+        case['counters'] = counters
+    return case
+
+
+def run_benchmark(sizes: List[str], map_types: List[str], algorithms: List[str],
+                  num_queries: int, seed: int, measure_memory: bool = True, instrument: bool = False,
+                  storage: str = 'dense') -> Dict:
+    startup = measure_startup()
+    print(f"Solver import {startup['solver_import_ms']:.1f} ms "
+          f"(process {startup['process_startup_ms']:.1f} ms, display modules: {startup['display_modules_loaded'] or 'none'})")
+    results = []
+    for size_name in sizes:
+        rows, cols, height = SIZES[size_name]
+        for map_type in map_types:
+            t0 = time.perf_counter()
+            grid = build_map(rows, cols, height, map_type, seed, storage=storage)
+            build_time = time.perf_counter() - t0
+            queries = make_queries(grid, num_queries, seed)
+            print(f"{size_name} {rows}x{cols}x{height} [{map_type}] built in {build_time:.2f}s")
+
+            for algorithm in algorithms:
+                case = run_case(grid, algorithm, queries, measure_memory, instrument)
+                case.update({
+                    'size': size_name,
+                    'shape': [rows, cols, height],
+                    'map_type': map_type,
+                    'storage': storage,
+                    'map_build_time': build_time,
+                })
+                results.append(case)
+                print(f"  {algorithm:<9} {case['nodes_per_sec']:>12.0f} nodes/s  "
+                      f"p50 {case['latency_ms']['p50']:.2f} ms  p95 {case['latency_ms']['p95']:.2f} ms  "
+                      f"p99 {case['latency_ms']['p99']:.2f} ms  cost {case['total_path_cost']:.1f}")
+
+    return {
+        'benchmark_version': BENCHMARK_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'queries_per_case': num_queries,
+        'storage': storage,
+        'startup': startup,
+        'results': results,
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    def cases(report):
+        # Reports older than per-case storage ran one backend, named at the top level
+        storage = report.get('storage', 'dense')
+        return {(case['size'], case['map_type'], case['algorithm'], case.get('storage', storage)): case
+                for case in report['results']}
+
+    baseline_cases = cases(baseline)
+    regressions = []
+    for key, case in cases(current).items():
+        old = baseline_cases.get(key)
+        if old is None:
+            continue
+        old_p50 = old['latency_ms']['p50']
+        new_p50 = case['latency_ms']['p50']
+        if old_p50 > 0 and new_p50 > old_p50 * (1 + threshold):
+            regressions.append(f"{'/'.join(key)}: p50 {old_p50:.2f} ms -> {new_p50:.2f} ms")
+        if abs(case['total_path_cost'] - old['total_path_cost']) > 1e-6:
+            regressions.append(f"{'/'.join(key)}: path cost {old['total_path_cost']:.3f} -> {case['total_path_cost']:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark for the 3D search algorithms")
+    parser.add_argument('--sizes', nargs='+', default=['demo', 'medium'], choices=list(SIZES))
+    parser.add_argument('--maps', nargs='+', default=MAP_TYPES, choices=MAP_TYPES + ['recursive', 'tiled'])
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument('--storage', default='dense', choices=list(STORAGE), help="grid storage backend")
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--instrument', action='store_true', help="collect heap/relaxation counters")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="baseline JSON report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.maps, args.algorithms, args.queries, args.seed,
+                           measure_memory=not args.no_memory, instrument=args.instrument, storage=args.storage)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.threshold)
+        if regressions:
+            print("✗ Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,40 @@
+import importlib
 
-from .grid_environment_3d import Grid3DEnvironment
-from .map_loader import OSMMapLoader
-from .ui_components import Button, Dropdown, LocationDropdown, ButtonManager
-from .vehicle_3d import Vehicle3D
+# Submodules load on first attribute access, so headless users of the solver
+# (numpy only) never import pygame, requests or PIL.
+_LAZY_IMPORTS = {
+    'Grid3DEnvironment': '.grid_environment_3d',
+    'ChunkedGrid3DEnvironment': '.chunked_grid',
+    'OSMMapLoader': '.map_loader',
+    'OSMExtract': '.osm_extract',
+    'Button': '.ui_components',
+    'Dropdown': '.ui_components',
+    'LocationDropdown': '.ui_components',
+    'ButtonManager': '.ui_components',
+    'Vehicle3D': '.vehicle_3d',
+}
 
 __all__ = [
     'Grid3DEnvironment',
+    'ChunkedGrid3DEnvironment',
     'OSMMapLoader',
+    'OSMExtract',
     'Button',
     'Dropdown',
     'LocationDropdown',
     'ButtonManager',
     'Vehicle3D'
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,599 @@
+import numpy as np
+from collections import deque
+from typing import Tuple, Dict, Callable, Optional
+from .grid_environment_3d import Grid3DEnvironment
+from .clearance_map import ClearanceMap
+from .location_registry import MOVES, flood_fill
+
+DEFAULT_CHUNK_SHAPE = (4, 32, 32)
+
+
+class ChunkedVoxelStore:
+    """Sparse (height, rows, cols) volume split into fixed-size chunks.
+
+    Chunks are allocated on first write. A chunk whose in-range voxels all hold the same
+    value is collapsed to that scalar, and chunks equal to fill_value are not stored at
+    all, so memory follows the occupied content rather than the bounding volume.
+    Supports the indexing the grid uses: single cells, boxes of slices (strided ones for
+    reads only), tuples of index arrays and boolean masks of full shape.
+    """
+
+    def __init__(self, shape: Tuple[int, int, int], dtype, fill_value,
+                 chunk_shape: Tuple[int, int, int] = DEFAULT_CHUNK_SHAPE):
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        self.fill_value = self.dtype.type(fill_value)
+        self.chunk_shape = tuple(int(n) for n in chunk_shape)
+        self.chunk_grid = tuple(-(-n // c) for n, c in zip(self.shape, self.chunk_shape))
+        # linear chunk id -> padded ndarray of chunk_shape, or a scalar for uniform chunks
+        self.chunks: Dict[int, object] = {}
+
+    @classmethod
+    def from_array(cls, array, fill_value, chunk_shape: Tuple[int, int, int] = DEFAULT_CHUNK_SHAPE) -> 'ChunkedVoxelStore':
+        # Reads one chunk at a time, so memory-mapped arrays are never loaded whole
+        store = cls(array.shape, array.dtype, fill_value, chunk_shape)
+        for chunk_id in range(store.chunk_count):
+            store._write_box(store.chunk_box(chunk_id), np.asarray(array[store.chunk_slices(chunk_id)]))
+        return store
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1] * self.shape[2]
+
+    @property
+    def ndim(self) -> int:
+        return 3
+
+    @property
+    def chunk_count(self) -> int:
+        return self.chunk_grid[0] * self.chunk_grid[1] * self.chunk_grid[2]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(chunk.nbytes for chunk in self.chunks.values() if isinstance(chunk, np.ndarray))
+
+    def allocated_chunks(self) -> int:
+        return sum(1 for chunk in self.chunks.values() if isinstance(chunk, np.ndarray))
+
+    def chunk_id(self, z: int, row: int, col: int) -> int:
+        cz, cr, cc = self.chunk_shape
+        return ((z // cz) * self.chunk_grid[1] + row // cr) * self.chunk_grid[2] + col // cc
+
+    def chunk_box(self, chunk_id: int) -> Tuple[int, int, int, int, int, int]:
+        """In-range (z0, row0, col0, z1, row1, col1) covered by a chunk."""
+        chunk_z, rest = divmod(chunk_id, self.chunk_grid[1] * self.chunk_grid[2])
+        chunk_row, chunk_col = divmod(rest, self.chunk_grid[2])
+        start = (chunk_z * self.chunk_shape[0], chunk_row * self.chunk_shape[1], chunk_col * self.chunk_shape[2])
+        stop = tuple(min(s + c, n) for s, c, n in zip(start, self.chunk_shape, self.shape))
+        return start + stop
+
+    def chunk_slices(self, chunk_id: int) -> Tuple[slice, slice, slice]:
+        z0, r0, c0, z1, r1, c1 = self.chunk_box(chunk_id)
+        return slice(z0, z1), slice(r0, r1), slice(c0, c1)
+
+    def chunks_in_box(self, box) -> np.ndarray:
+        z0, r0, c0, z1, r1, c1 = box
+        if z1 <= z0 or r1 <= r0 or c1 <= c0:
+            return np.empty(0, dtype=np.intp)
+        cz, cr, cc = self.chunk_shape
+        z, row, col = np.meshgrid(np.arange(z0 // cz, -(-z1 // cz)),
+                                  np.arange(r0 // cr, -(-r1 // cr)),
+                                  np.arange(c0 // cc, -(-c1 // cc)), indexing='ij')
+        return ((z * self.chunk_grid[1] + row) * self.chunk_grid[2] + col).ravel()
+
+    def chunk_value(self, chunk_id: int):
+        """The chunk's ndarray, or its uniform scalar value."""
+        return self.chunks.get(chunk_id, self.fill_value)
+
+    def cell(self, z: int, row: int, col: int):
+        """Unchecked single-voxel read for hot loops; skips the generic key parsing."""
+        cz, cr, cc = self.chunk_shape
+        chunk = self.chunks.get(((z // cz) * self.chunk_grid[1] + row // cr) * self.chunk_grid[2] + col // cc,
+                                self.fill_value)
+        if chunk.__class__ is np.ndarray:
+            return chunk[z % cz, row % cr, col % cc]
+        return chunk
+
+    def fill(self, value):
+        self.fill_value = self.dtype.type(value)
+        self.chunks.clear()
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.full(self.shape, self.fill_value, dtype=self.dtype)
+        for chunk_id, chunk in self.chunks.items():
+            z0, r0, c0, z1, r1, c1 = self.chunk_box(chunk_id)
+            dense[z0:z1, r0:r1, c0:c1] = chunk[:z1 - z0, :r1 - r0, :c1 - c0] if isinstance(chunk, np.ndarray) else chunk
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.to_dense()
+        return dense if dtype is None else dense.astype(dtype, copy=False)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _materialize(self, chunk_id: int) -> np.ndarray:
+        chunk = self.chunks.get(chunk_id, self.fill_value)
+        if not isinstance(chunk, np.ndarray):
+            chunk = np.full(self.chunk_shape, chunk, dtype=self.dtype)
+            self.chunks[chunk_id] = chunk
+        return chunk
+
+    def _settle(self, chunk_id: int):
+        # Collapse a chunk back to a scalar when its in-range voxels became uniform
+        chunk = self.chunks[chunk_id]
+        z0, r0, c0, z1, r1, c1 = self.chunk_box(chunk_id)
+        live = chunk[:z1 - z0, :r1 - r0, :c1 - c0]
+        first = live.flat[0]
+        if (live == first).all():
+            self._set_uniform(chunk_id, first)
+
+    def _set_uniform(self, chunk_id: int, value):
+        if value == self.fill_value:
+            self.chunks.pop(chunk_id, None)
+        else:
+            self.chunks[chunk_id] = self.dtype.type(value)
+
+    # --- indexing ---
+
+    def _parse_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) == 1 and isinstance(key[0], np.ndarray) and key[0].dtype == bool:
+            if key[0].shape != self.shape:
+                raise IndexError(f"Mask shape {key[0].shape} does not match store shape {self.shape}")
+            return 'points', np.nonzero(key[0]), (-1,)
+        if len(key) > 3:
+            raise IndexError(f"Too many indices for a 3D store: {len(key)}")
+        if len(key) == 3 and all(isinstance(k, (int, np.integer)) for k in key):
+            z, row, col = (int(k) for k in key)
+            if not (0 <= z < self.shape[0] and 0 <= row < self.shape[1] and 0 <= col < self.shape[2]):
+                raise IndexError(f"Index {key} out of bounds for shape {self.shape}")
+            return 'cell', (z, row, col), ()
+        if any(isinstance(k, (np.ndarray, list)) for k in key):
+            if len(key) != 3 or any(isinstance(k, slice) for k in key):
+                raise IndexError("Array indexing needs one index array (or int) per axis")
+            arrays = np.broadcast_arrays(*(np.asarray(k, dtype=np.intp) for k in key))
+            return 'points', tuple(a.ravel() for a in arrays), arrays[0].shape
+
+        key = key + (slice(None),) * (3 - len(key))
+        bounds = []
+        squeeze = []
+        strides = []
+        for axis, (k, n) in enumerate(zip(key, self.shape)):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                if step == 1:
+                    bounds.append((start, max(start, stop)))
+                    continue
+                # Strided: read the covering box, then step through it
+                picked = range(start, stop, step)
+                if len(picked) == 0:
+                    bounds.append((0, 0))
+                    continue
+                low = min(picked[0], picked[-1])
+                bounds.append((low, max(picked[0], picked[-1]) + 1))
+                strides.append((axis, slice(picked[0] - low, None, step)))
+            else:
+                k = int(k) + n if int(k) < 0 else int(k)
+                if not 0 <= k < n:
+                    raise IndexError(f"Index {k} out of bounds for axis {axis} with size {n}")
+                bounds.append((k, k + 1))
+                squeeze.append(axis)
+        box = tuple(b[0] for b in bounds) + tuple(b[1] for b in bounds)
+        return 'box', box, (tuple(squeeze), tuple(strides))
+
+    def __getitem__(self, key):
+        kind, index, extra = self._parse_key(key)
+        if kind == 'cell':
+            z, row, col = index
+            chunk = self.chunks.get(self.chunk_id(z, row, col), self.fill_value)
+            if isinstance(chunk, np.ndarray):
+                cz, cr, cc = self.chunk_shape
+                return chunk[z % cz, row % cr, col % cc]
+            return chunk
+        if kind == 'points':
+            return self._read_points(*index).reshape(extra)
+        squeeze, strides = extra
+        values = self._read_box(index)
+        if strides:
+            picks = [slice(None)] * 3
+            for axis, pick in strides:
+                picks[axis] = pick
+            values = values[tuple(picks)]
+        return values.squeeze(axis=squeeze) if squeeze else values
+
+    def __setitem__(self, key, value):
+        kind, index, extra = self._parse_key(key)
+        if kind == 'cell':
+            z, row, col = index
+            chunk_id = self.chunk_id(z, row, col)
+            if not isinstance(self.chunks.get(chunk_id), np.ndarray) and self.chunk_value(chunk_id) == value:
+                return
+            cz, cr, cc = self.chunk_shape
+            self._materialize(chunk_id)[z % cz, row % cr, col % cc] = value
+            self._settle(chunk_id)
+        elif kind == 'points':
+            values = np.asarray(value, dtype=self.dtype)
+            if values.ndim:
+                values = np.broadcast_to(values.reshape(-1) if values.size == len(index[0]) else values,
+                                         (len(index[0]),))
+            self._write_points(index, values)
+        else:
+            squeeze, strides = extra
+            if strides:
+                raise IndexError("Strided slices are not supported for writes")
+            z0, r0, c0, z1, r1, c1 = index
+            shape = (z1 - z0, r1 - r0, c1 - c0)
+            values = np.asarray(value, dtype=self.dtype)
+            if values.ndim and squeeze:
+                values = np.expand_dims(values, squeeze)
+            self._write_box(index, np.broadcast_to(values, shape))
+
+    def _read_box(self, box) -> np.ndarray:
+        z0, r0, c0, z1, r1, c1 = box
+        out = np.empty((z1 - z0, r1 - r0, c1 - c0), dtype=self.dtype)
+        for chunk_id in self.chunks_in_box(box):
+            (dst, src) = self._overlap(int(chunk_id), box)
+            chunk = self.chunk_value(int(chunk_id))
+            out[dst] = chunk[src] if isinstance(chunk, np.ndarray) else chunk
+        return out
+
+    def _write_box(self, box, values: np.ndarray):
+        for chunk_id in self.chunks_in_box(box):
+            chunk_id = int(chunk_id)
+            dst, src = self._overlap(chunk_id, box)
+            piece = values[dst]
+            z0, r0, c0, z1, r1, c1 = self.chunk_box(chunk_id)
+            first = piece.flat[0]
+            if piece.shape == (z1 - z0, r1 - r0, c1 - c0) and (piece == first).all():
+                # Whole chunk overwritten with a single value: no allocation needed
+                self._set_uniform(chunk_id, first)
+                continue
+            chunk = self.chunk_value(chunk_id)
+            if not isinstance(chunk, np.ndarray) and (piece == chunk).all():
+                continue
+            self._materialize(chunk_id)[src] = piece
+            self._settle(chunk_id)
+
+    def _overlap(self, chunk_id: int, box):
+        """(slices into the box, slices into the chunk) for where they intersect."""
+        z0, r0, c0, z1, r1, c1 = box
+        cz0, cr0, cc0, cz1, cr1, cc1 = self.chunk_box(chunk_id)
+        dst = []
+        src = []
+        for lo, hi, clo, chi in ((z0, z1, cz0, cz1), (r0, r1, cr0, cr1), (c0, c1, cc0, cc1)):
+            start, stop = max(lo, clo), min(hi, chi)
+            dst.append(slice(start - lo, stop - lo))
+            src.append(slice(start - clo, stop - clo))
+        return tuple(dst), tuple(src)
+
+    def _group_points(self, z: np.ndarray, row: np.ndarray, col: np.ndarray):
+        """Yield (chunk_id, positions, local flat offsets) with points grouped by chunk."""
+        cz, cr, cc = self.chunk_shape
+        chunk_ids = ((z // cz) * self.chunk_grid[1] + row // cr) * self.chunk_grid[2] + col // cc
+        local = ((z % cz) * cr + row % cr) * cc + col % cc
+        # Stable so repeated writes to one voxel keep numpy's last-one-wins order
+        order = np.argsort(chunk_ids, kind='stable')
+        sorted_ids = chunk_ids[order]
+        splits = np.flatnonzero(np.diff(sorted_ids)) + 1
+        for positions in np.split(order, splits):
+            yield int(chunk_ids[positions[0]]), positions, local[positions]
+
+    def _check_points(self, z: np.ndarray, row: np.ndarray, col: np.ndarray):
+        for axis, (values, n) in enumerate(zip((z, row, col), self.shape)):
+            if len(values) and (values.min() < 0 or values.max() >= n):
+                raise IndexError(f"Index out of bounds for axis {axis} with size {n}")
+
+    def _read_points(self, z: np.ndarray, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        out = np.empty(len(z), dtype=self.dtype)
+        if len(z) == 0:
+            return out
+        self._check_points(z, row, col)
+        for chunk_id, positions, local in self._group_points(z, row, col):
+            chunk = self.chunk_value(chunk_id)
+            out[positions] = chunk.reshape(-1)[local] if isinstance(chunk, np.ndarray) else chunk
+        return out
+
+    def _write_points(self, index, values: np.ndarray):
+        z, row, col = index
+        if len(z) == 0:
+            return
+        self._check_points(z, row, col)
+        for chunk_id, positions, local in self._group_points(z, row, col):
+            piece = values[positions] if values.ndim else values
+            chunk = self.chunk_value(chunk_id)
+            if not isinstance(chunk, np.ndarray) and (piece == chunk).all():
+                continue
+            self._materialize(chunk_id).reshape(-1)[local] = piece
+            self._settle(chunk_id)
+
+
+class ChunkedGrid3DEnvironment(Grid3DEnvironment):
+    """Grid3DEnvironment backed by ChunkedVoxelStore volumes for city-scale extents.
+
+    Cell types, terrain costs and the overlay are chunked; the 2D elevation map stays
+    dense. Empty air above the buildings costs nothing until something is written there.
+    """
+
+    def __init__(self, rows: int = 30, cols: int = 30, height: int = 5,
+                 chunk_shape: Tuple[int, int, int] = DEFAULT_CHUNK_SHAPE):
+        self.chunk_shape = tuple(chunk_shape)
+        self._chunk_bits = {}
+        # min_clearance -> (revision, {chunk_id: packed bits or True})
+        self._restricted_chunk_bits = {}
+        super().__init__(rows, cols, height)
+
+    def _allocate_storage(self):
+        shape = (self.height, self.rows, self.cols)
+        self.grid = ChunkedVoxelStore(shape, self.CELL_DTYPE, self.EMPTY, self.chunk_shape)
+        self.terrain_costs = ChunkedVoxelStore(shape, float, 1.0, self.chunk_shape)
+        self.elevation = np.zeros((self.rows, self.cols), dtype=float)
+        self.overlay = ChunkedVoxelStore(shape, self.CELL_DTYPE, self.EMPTY, self.chunk_shape)
+
+    def load_state(self, arrays: dict, meta: dict):
+        arrays = dict(arrays)
+        if not isinstance(arrays['grid'], ChunkedVoxelStore):
+            arrays['grid'] = ChunkedVoxelStore.from_array(arrays['grid'], self.EMPTY, self.chunk_shape)
+        if not isinstance(arrays['terrain_costs'], ChunkedVoxelStore):
+            arrays['terrain_costs'] = ChunkedVoxelStore.from_array(arrays['terrain_costs'], 1.0, self.chunk_shape)
+        arrays['elevation'] = np.array(arrays['elevation'], dtype=float)
+        super().load_state(arrays, meta)
+        self.overlay = ChunkedVoxelStore(self.grid.shape, self.CELL_DTYPE, self.EMPTY, self.chunk_shape)
+
+    @property
+    def nbytes(self) -> int:
+        return self.grid.nbytes + self.terrain_costs.nbytes + self.overlay.nbytes + self.elevation.nbytes
+
+    def cells_of_type(self, cell_type: int) -> np.ndarray:
+        found = []
+        for chunk_id in sorted(self._chunks_holding(cell_type)):
+            z0, r0, c0, z1, r1, c1 = self.grid.chunk_box(chunk_id)
+            chunk = self.grid.chunk_value(chunk_id)
+            if isinstance(chunk, np.ndarray):
+                coords = np.argwhere(chunk[:z1 - z0, :r1 - r0, :c1 - c0] == cell_type)
+            else:
+                coords = np.argwhere(np.ones((z1 - z0, r1 - r0, c1 - c0), dtype=bool))
+            found.append(coords + (z0, r0, c0))
+        if not found:
+            return np.empty((0, 3), dtype=np.intp)
+        # Match the C order np.argwhere gives on a dense grid
+        coords = np.concatenate(found)
+        return coords[np.lexsort((coords[:, 2], coords[:, 1], coords[:, 0]))]
+
+    def count_cells(self, cell_type: int) -> int:
+        count = 0
+        for chunk_id in self._chunks_holding(cell_type):
+            z0, r0, c0, z1, r1, c1 = self.grid.chunk_box(chunk_id)
+            chunk = self.grid.chunk_value(chunk_id)
+            if isinstance(chunk, np.ndarray):
+                count += int(np.count_nonzero(chunk[:z1 - z0, :r1 - r0, :c1 - c0] == cell_type))
+            else:
+                count += (z1 - z0) * (r1 - r0) * (c1 - c0)
+        return count
+
+    def _chunks_holding(self, cell_type: int):
+        if cell_type == self.grid.fill_value:
+            return range(self.grid.chunk_count)
+        return [chunk_id for chunk_id, chunk in self.grid.chunks.items()
+                if isinstance(chunk, np.ndarray) or chunk == cell_type]
+
+    def is_obstacle(self, z: int, row: int, col: int) -> bool:
+        cell_type = self.grid.cell(z, row, col)
+        return cell_type == self.OBSTACLE or cell_type == self.CAR
+
+    def get_cost(self, z: int, row: int, col: int) -> float:
+        return self.terrain_costs.cell(z, row, col) + abs(self.elevation[row, col] - z) * 0.5
+
+    def blocked_mask(self, box: Optional[Tuple[int, int, int, int, int, int]] = None) -> np.ndarray:
+        """Assembled from the per-chunk packed occupancy: only chunks holding obstacles
+        are unpacked. Pass a box to keep the result smaller than the bounding volume."""
+        self._refresh_chunk_bits()
+        box = self.full_box() if box is None else box
+        z0, r0, c0, z1, r1, c1 = box
+        mask = np.zeros((z1 - z0, r1 - r0, c1 - c0), dtype=bool)
+        for chunk_id in self.grid.chunks_in_box(box).tolist():
+            bits = self._chunk_bits.get(chunk_id)
+            if bits is None:
+                continue
+            dst, src = self.grid._overlap(chunk_id, box)
+            mask[dst] = True if bits is True else self._unpack_chunk(bits)[src]
+        return mask
+
+    def _unpack_chunk(self, bits: bytes) -> np.ndarray:
+        chunk_shape = self.grid.chunk_shape
+        unpacked = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=int(np.prod(chunk_shape)))
+        return unpacked.view(bool).reshape(chunk_shape)
+
+    def _chunk_blocked_bits(self, chunk_id: int):
+        chunk = self.grid.chunk_value(chunk_id)
+        if isinstance(chunk, np.ndarray):
+            return np.packbits(((chunk == self.OBSTACLE) | (chunk == self.CAR)).ravel()).tobytes()
+        return chunk in (self.OBSTACLE, self.CAR)
+
+    def _refresh_chunk_bits(self):
+        if self._blocked_bits_revision == self.revision:
+            return
+        changes = self.changes_since(self._blocked_bits_revision)
+        if changes is None:
+            chunk_ids = self.grid.chunks.keys()
+            bits = {}
+        else:
+            chunk_ids = set()
+            for box in changes:
+                chunk_ids.update(self.grid.chunks_in_box(box).tolist())
+            # Copied rather than patched so lookups handed out earlier keep a consistent view
+            bits = dict(self._chunk_bits)
+        for chunk_id in chunk_ids:
+            chunk_bits = self._chunk_blocked_bits(chunk_id)
+            if chunk_bits is False:
+                bits.pop(chunk_id, None)
+            else:
+                bits[chunk_id] = chunk_bits
+        self._chunk_bits = bits
+        self._blocked_bits_revision = self.revision
+
+    def blocked_bits(self) -> bytes:
+        """The dense packed layout of Grid3DEnvironment.blocked_bits, set bit by bit from
+        the blocked chunks; the solvers use blocked_lookup instead."""
+        self._refresh_chunk_bits()
+        flat = [np.empty(0, dtype=np.intp)]
+        for chunk_id, bits in self._chunk_bits.items():
+            z0, r0, c0, z1, r1, c1 = self.grid.chunk_box(chunk_id)
+            live = np.ones((z1 - z0, r1 - r0, c1 - c0), dtype=bool) if bits is True \
+                else self._unpack_chunk(bits)[:z1 - z0, :r1 - r0, :c1 - c0]
+            z, row, col = np.nonzero(live)
+            flat.append(np.ravel_multi_index((z + z0, row + r0, col + c0), self.grid.shape))
+        flat = np.sort(np.concatenate(flat))
+        packed = np.zeros(-(-self.grid.size // 8), dtype=np.uint8)
+        if len(flat):
+            byte = flat >> 3
+            starts = np.flatnonzero(np.r_[True, byte[1:] != byte[:-1]])
+            packed[byte[starts]] = np.bitwise_or.reduceat((128 >> (flat & 7)).astype(np.uint8), starts)
+        return packed.tobytes()
+
+    def _chunk_restricted_bits(self, chunk_id: int, min_clearance: int):
+        # Cells closer than min_clearance to an obstacle only see obstacles within
+        # min_clearance - 1 cells, so a halo that wide around the chunk is enough
+        reach = min_clearance - 1
+        z0, r0, c0, z1, r1, c1 = self.grid.chunk_box(chunk_id)
+        box = (z0, max(r0 - reach, 0), max(c0 - reach, 0), z1, min(r1 + reach, self.rows), min(c1 + reach, self.cols))
+        blocked = self.blocked_mask(box)
+        if not blocked.any():
+            return False
+        distance = ClearanceMap.distance_transform(blocked, min_clearance)
+        restricted = distance[:, r0 - box[1]:r1 - box[1], c0 - box[2]:c1 - box[2]] < min_clearance
+        if restricted.all():
+            return True
+        padded = np.zeros(self.grid.chunk_shape, dtype=bool)
+        padded[:z1 - z0, :r1 - r0, :c1 - c0] = restricted
+        return np.packbits(padded.ravel()).tobytes()
+
+    def _refresh_restricted_bits(self, min_clearance: int) -> Dict[int, object]:
+        revision, bits = self._restricted_chunk_bits.get(min_clearance, (-1, None))
+        if revision == self.revision:
+            return bits
+        changes = self.changes_since(revision) if bits is not None else None
+        if changes is None or self.full_box() in changes:
+            # Restricted cells all lie within reach of a blocked chunk
+            self._refresh_chunk_bits()
+            boxes = [self.grid.chunk_box(chunk_id) for chunk_id in self._chunk_bits]
+            bits = {}
+        else:
+            boxes = changes
+            bits = dict(bits)
+        reach = min_clearance - 1
+        chunk_ids = set()
+        for z0, r0, c0, z1, r1, c1 in boxes:
+            chunk_ids.update(self.grid.chunks_in_box(
+                (z0, max(r0 - reach, 0), max(c0 - reach, 0), z1, min(r1 + reach, self.rows), min(c1 + reach, self.cols))
+            ).tolist())
+        for chunk_id in chunk_ids:
+            chunk_bits = self._chunk_restricted_bits(chunk_id, min_clearance)
+            if chunk_bits is False:
+                bits.pop(chunk_id, None)
+            else:
+                bits[chunk_id] = chunk_bits
+        self._restricted_chunk_bits[min_clearance] = (self.revision, bits)
+        return bits
+
+    def blocked_lookup(self, min_clearance: int = 0) -> Callable[[int, int, int], int]:
+        """Per-chunk packed occupancy, rebuilt only for chunks the journal marks dirty.
+        Fully blocked chunks are stored as True and free ones are left out. With
+        min_clearance > 1 the same layout holds each chunk's too-close cells, computed
+        from the chunk and a halo around it rather than a full-volume clearance field."""
+        if min_clearance > 1:
+            chunk_bits = self._refresh_restricted_bits(min_clearance)
+        else:
+            self._refresh_chunk_bits()
+            chunk_bits = self._chunk_bits
+        cz, cr, cc = self.grid.chunk_shape
+        grid_rows, grid_cols = self.grid.chunk_grid[1], self.grid.chunk_grid[2]
+
+        def is_blocked(z: int, row: int, col: int) -> int:
+            bits = chunk_bits.get(((z // cz) * grid_rows + row // cr) * grid_cols + col // cc)
+            if bits is None or bits is True:
+                return bits is True
+            index = ((z % cz) * cr + row % cr) * cc + col % cc
+            return bits[index >> 3] & (128 >> (index & 7))
+
+        return is_blocked
+
+    def reachable_mask(self, start: Tuple[int, int, int]) -> ChunkedVoxelStore:
+        """Flood fill chunk by chunk. A chunk without obstacles is reached whole as soon
+        as any cell of it is and stays a scalar, so memory follows the obstacle chunks
+        on the reachable region's edge rather than the volume."""
+        self._refresh_chunk_bits()
+        store = self.grid
+        reached = ChunkedVoxelStore(store.shape, bool, False, store.chunk_shape)
+        moves = np.array(MOVES)
+        cz, cr, cc = store.chunk_shape
+        pending = {store.chunk_id(*start): [np.array([start])]}
+        queue = deque(pending)
+
+        def hand_over(target: int, seeds: Optional[np.ndarray]):
+            done = reached.chunk_value(target)
+            if self._chunk_bits.get(target) is True or (not isinstance(done, np.ndarray) and done):
+                return
+            if target not in pending:
+                pending[target] = []
+                queue.append(target)
+            # Free chunks are reached whole from any cell, so they need no seeds
+            if seeds is not None and target in self._chunk_bits:
+                pending[target].append(seeds)
+
+        while queue:
+            chunk_id = queue.popleft()
+            seeds = pending.pop(chunk_id)
+            bits = self._chunk_bits.get(chunk_id)
+            if bits is True:
+                continue
+            z0, r0, c0, z1, r1, c1 = box = store.chunk_box(chunk_id)
+            if bits is None:
+                # Free chunks are connected throughout, and every cell bordering one is a
+                # neighbour: the ring around it on its own levels and the slabs above and below
+                reached._set_uniform(chunk_id, True)
+                for slab in ((z0, r0 - 1, c0 - 1, z1, r1 + 1, c1 + 1), (z0 - 1, r0, c0, z0, r1, c1),
+                             (z1, r0, c0, z1 + 1, r1, c1)):
+                    slab = tuple(max(a, 0) for a in slab[:3]) + tuple(min(b, n) for b, n in zip(slab[3:], store.shape))
+                    for target in store.chunks_in_box(slab).tolist():
+                        if target == chunk_id:
+                            continue
+                        target_seeds = None
+                        if target in self._chunk_bits:
+                            tz0, tr0, tc0, tz1, tr1, tc1 = store.chunk_box(target)
+                            lo = np.maximum(slab[:3], (tz0, tr0, tc0))
+                            hi = np.minimum(slab[3:], (tz1, tr1, tc1))
+                            target_seeds = np.argwhere(np.ones(hi - lo, dtype=bool)) + lo
+                        hand_over(target, target_seeds)
+                continue
+
+            before = reached.chunk_value(chunk_id)
+            seen = before[:z1 - z0, :r1 - r0, :c1 - c0] if isinstance(before, np.ndarray) \
+                else np.zeros((z1 - z0, r1 - r0, c1 - c0), dtype=bool)
+            # Cells reached earlier were flooded to closure, so only unseen open cells can be new
+            open_cells = ~self._unpack_chunk(bits)[:z1 - z0, :r1 - r0, :c1 - c0] & ~seen
+            new = flood_fill(open_cells, np.concatenate(seeds) - (z0, r0, c0))
+            if not new.any():
+                continue
+            reached._write_box(box, seen | new)
+
+            # Hand the new cells' neighbours outside this chunk to the chunks they fall in;
+            # every move is one step per axis, so only cells on the chunk's faces have any
+            new[1:-1, 1:-1, 1:-1] = False
+            cells = np.argwhere(new) + (z0, r0, c0)
+            neighbours = (cells[:, None, :] + moves).reshape(-1, 3)
+            inside = np.all((neighbours >= 0) & (neighbours < store.shape), axis=1)
+            neighbours = neighbours[inside]
+            in_chunk = np.all((neighbours >= (z0, r0, c0)) & (neighbours < (z1, r1, c1)), axis=1)
+            neighbours = neighbours[~in_chunk]
+            if not len(neighbours):
+                continue
+            ids = ((neighbours[:, 0] // cz) * store.chunk_grid[1] + neighbours[:, 1] // cr) * store.chunk_grid[2] \
+                + neighbours[:, 2] // cc
+            order = np.argsort(ids, kind='stable')
+            ids, neighbours = ids[order], neighbours[order]
+            splits = np.flatnonzero(np.diff(ids)) + 1
+            for group_ids, group in zip(np.split(ids, splits), np.split(neighbours, splits)):
+                hand_over(int(group_ids[0]), group)
+        return reached
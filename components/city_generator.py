@@ -0,0 +1,72 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# The demo map places ~165 buildings on 35x35 cells; keep that density at any size
+DEMO_BUILDING_DENSITY = 165 / (35 * 35)
+
+
+def _generate_tile(task: Tuple[int, int, int, int, int, int, int, float]) -> Tuple[int, int, np.ndarray]:
+    """Height map for one tile. Module-level so worker processes can unpickle it."""
+    seed, tile_row, tile_col, rows, cols, max_height, street_width, density = task
+    # The stream depends only on (seed, tile position), not on worker count or order
+    rng = np.random.default_rng([seed, tile_row, tile_col])
+    heights = np.zeros((rows, cols), dtype=np.int32)
+
+    # Streets along the top and left edge of every tile join up into a grid once stitched
+    lot_rows, lot_cols = rows - street_width, cols - street_width
+    if lot_rows <= 0 or lot_cols <= 0:
+        return tile_row, tile_col, heights
+
+    count = rng.poisson(density * lot_rows * lot_cols)
+    row = rng.integers(street_width, rows, count)
+    col = rng.integers(street_width, cols, count)
+    # Mostly low-rise with a few towers, like the perimeter/center split of the demo map
+    building_height = np.minimum(rng.geometric(0.45, count), max_height)
+    np.maximum.at(heights, (row, col), building_height)
+    return tile_row, tile_col, heights
+
+
+class CityGenerator:
+    """Seeded procedural city built tile by tile.
+
+    Every tile draws from its own stream keyed by (seed, tile_row, tile_col), so the same
+    seed gives the same city whether tiles run serially or across processes, and any
+    tile can be regenerated on its own. Building counts scale with the tile area.
+    """
+
+    def __init__(self, seed: int = 0, tile_size: int = 64, street_width: int = 1,
+                 density: float = DEMO_BUILDING_DENSITY):
+        self.seed = seed
+        self.tile_size = tile_size
+        self.street_width = street_width
+        self.density = density
+
+    def _tasks(self, rows: int, cols: int, max_height: int) -> List[Tuple]:
+        tasks = []
+        for tile_row, r0 in enumerate(range(0, rows, self.tile_size)):
+            for tile_col, c0 in enumerate(range(0, cols, self.tile_size)):
+                tasks.append((self.seed, tile_row, tile_col,
+                              min(self.tile_size, rows - r0), min(self.tile_size, cols - c0),
+                              max_height, self.street_width, self.density))
+        return tasks
+
+    def height_map(self, rows: int, cols: int, max_height: int, workers: Optional[int] = None) -> np.ndarray:
+        """Stitched (rows, cols) building heights. workers > 1 spreads tiles over processes."""
+        tasks = self._tasks(rows, cols, max_height)
+        heights = np.zeros((rows, cols), dtype=np.int32)
+        if workers is not None and workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                tiles = pool.map(_generate_tile, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+                self._stitch(heights, tiles)
+        else:
+            self._stitch(heights, map(_generate_tile, tasks))
+        return heights
+
+    def _stitch(self, heights: np.ndarray, tiles):
+        for tile_row, tile_col, tile in tiles:
+            r0, c0 = tile_row * self.tile_size, tile_col * self.tile_size
+            heights[r0:r0 + tile.shape[0], c0:c0 + tile.shape[1]] = tile
+
+    def generate(self, grid, workers: Optional[int] = None):
+        grid.extrude_columns(self.height_map(grid.rows, grid.cols, grid.height, workers))
@@ -0,0 +1,91 @@
+import numpy as np
+from typing import Dict, Tuple
+
+MAX_CLEARANCE = 8
+
+
+class ClearanceMap:
+    """Per-level distance from each cell to the nearest blocked cell on the same level.
+
+    Distances are chessboard (8-connected) steps, capped at max_clearance: a blocked cell
+    has clearance 0, its free neighbours 1, and so on. A vehicle that needs r free cells
+    on every side asks for min_clearance = r + 1; asking for more than the cap raises it
+    and rebuilds the field. The field follows the grid's change journal, so local edits
+    only recompute the neighbourhood they can influence.
+    """
+
+    def __init__(self, grid, max_clearance: int = MAX_CLEARANCE):
+        self.grid = grid
+        self.max_clearance = max_clearance
+        self.field = None
+        self.revision = -1
+        self._restricted_bits: Dict[int, bytes] = {}
+
+    def update(self) -> np.ndarray:
+        if self.revision == self.grid.revision:
+            return self.field
+        changes = self.grid.changes_since(self.revision)
+        shape = (self.grid.height, self.grid.rows, self.grid.cols)
+        if changes is None or self.field is None or self.field.shape != shape:
+            self.field = np.empty(shape, dtype=np.uint8)
+            changes = [self.grid.full_box()]
+        for box in changes:
+            self._recompute(box)
+        self.revision = self.grid.revision
+        self._restricted_bits.clear()
+        return self.field
+
+    def _recompute(self, box: Tuple[int, int, int, int, int, int]):
+        # A change can move clearances up to max_clearance cells away, and those cells in
+        # turn depend on obstacles up to max_clearance further out
+        z0, r0, c0, z1, r1, c1 = box
+        reach = self.max_clearance
+        rows, cols = self.grid.rows, self.grid.cols
+        out_r0, out_r1 = max(r0 - reach, 0), min(r1 + reach, rows)
+        out_c0, out_c1 = max(c0 - reach, 0), min(c1 + reach, cols)
+        in_r0, in_r1 = max(out_r0 - reach, 0), min(out_r1 + reach, rows)
+        in_c0, in_c1 = max(out_c0 - reach, 0), min(out_c1 + reach, cols)
+
+        cells = np.asarray(self.grid.grid[z0:z1, in_r0:in_r1, in_c0:in_c1])
+        blocked = (cells == self.grid.OBSTACLE) | (cells == self.grid.CAR)
+        distance = self.distance_transform(blocked, self.max_clearance)
+        self.field[z0:z1, out_r0:out_r1, out_c0:out_c1] = distance[
+            :, out_r0 - in_r0:out_r1 - in_r0, out_c0 - in_c0:out_c1 - in_c0]
+
+    @staticmethod
+    def distance_transform(blocked: np.ndarray, cap: int) -> np.ndarray:
+        """Capped chessboard distance to the nearest True cell in each (rows, cols) plane,
+        by repeated 3x3 dilation. Cells beyond the array edge count as free."""
+        distance = np.full(blocked.shape, cap, dtype=np.uint8)
+        distance[blocked] = 0
+        reached = blocked.copy()
+        for step in range(1, cap):
+            if reached.all() or not reached.any():
+                break
+            grown = reached.copy()
+            grown[:, 1:, :] |= reached[:, :-1, :]
+            grown[:, :-1, :] |= reached[:, 1:, :]
+            spread = grown.copy()
+            spread[:, :, 1:] |= grown[:, :, :-1]
+            spread[:, :, :-1] |= grown[:, :, 1:]
+            distance[spread & ~reached] = step
+            reached = spread
+        return distance
+
+    def clearance(self, z: int, row: int, col: int) -> int:
+        return int(self.update()[z, row, col])
+
+    def restricted_bits(self, min_clearance: int) -> bytes:
+        """Packed mask (same layout as Grid3DEnvironment.blocked_bits) of cells whose
+        clearance is below min_clearance, cached per threshold until the grid changes."""
+        if min_clearance > self.max_clearance:
+            # A capped field can't tell min_clearance apart from anything further out
+            self.max_clearance = min_clearance
+            self.field = None
+            self.revision = -1
+        field = self.update()
+        bits = self._restricted_bits.get(min_clearance)
+        if bits is None:
+            bits = np.packbits((field < min_clearance).ravel()).tobytes()
+            self._restricted_bits[min_clearance] = bits
+        return bits
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+import numpy as np
+import pygame
+
+# Fill of transparent layers; nothing in the scene is drawn in pure magenta
+LAYER_COLORKEY = (255, 0, 255)
+GROUND_CACHE_SIZE = 8
+
+
+def vertical_gradient(size: Tuple[int, int], top: Tuple[int, int, int], bottom: Tuple[int, int, int]) -> pygame.Surface:
+    """A size surface blending from top to bottom, one colour per row, truncated
+    like the per-row pygame.draw.line loop it replaces."""
+    width, height = size
+    progress = np.arange(height) / height
+    top_color, bottom_color = np.array(top, dtype=float), np.array(bottom, dtype=float)
+    rows = (top_color + (bottom_color - top_color) * progress[:, None]).astype(np.uint8)
+    # surfarray is (width, height, 3)
+    return pygame.surfarray.make_surface(np.broadcast_to(rows[None, :, :], (width, height, 3)).copy())
+
+
+class FrameLayers:
+    """Window-sized surfaces for the parts of a frame that stay put between frames.
+
+    Each layer is rendered by a callback and kept with the key it was rendered for
+    (camera state, grid revision, map); it is re-rendered only when a different key
+    is asked for. Transparent layers are colour-keyed rather than per-pixel alpha, so
+    shapes land on them exactly as they would on the window (drawing colours' alpha is
+    ignored there too), and they are blitted through their bounding box, so a sparse
+    layer costs little more than the pixels it covers.
+
+    While a layer's key changes every frame (the camera is being dragged) caching
+    would only add a fill and a blit, so blit draws straight onto the screen until
+    the same key is asked for twice in a row.
+    """
+
+    def __init__(self, size: Tuple[int, int]):
+        self.size = size
+        self._layers: Dict[str, Tuple[Hashable, pygame.Surface, pygame.Rect]] = {}
+        self._requested: Dict[str, Hashable] = {}
+
+    def layer(self, name: str, key: Hashable, render: Callable[[pygame.Surface], None],
+              transparent: bool = True) -> Tuple[pygame.Surface, pygame.Rect]:
+        """The layer's surface and the rect holding its content, rendered for key."""
+        cached = self._layers.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        surface = cached[1] if cached is not None else pygame.Surface(self.size).convert()
+        if transparent:
+            surface.fill(LAYER_COLORKEY)
+            surface.set_colorkey(LAYER_COLORKEY)
+        render(surface)
+        rect = surface.get_bounding_rect() if transparent else surface.get_rect()
+        self._layers[name] = (key, surface, rect)
+        return surface, rect
+
+    def blit(self, screen: pygame.Surface, name: str, key: Hashable,
+             render: Callable[[pygame.Surface], None], transparent: bool = True):
+        cached = self._layers.get(name)
+        settled = self._requested.get(name, key) == key
+        self._requested[name] = key
+        if not settled and (cached is None or cached[0] != key):
+            render(screen)
+            return
+        surface, rect = self.layer(name, key, render, transparent)
+        screen.blit(surface, rect.topleft, rect)
+
+    def invalidate(self, name: str = None):
+        """Drop one layer (or all), forcing a re-render on the next request."""
+        if name is None:
+            self._layers.clear()
+            self._requested.clear()
+        else:
+            self._layers.pop(name, None)
+            self._requested.pop(name, None)
+
+
+class GroundPlaneCache:
+    """Map textures cut to the ground-plane quad, kept per camera state.
+
+    Scaling the map and masking it to the quad is the most expensive part of drawing
+    a loaded map, and it only depends on where the quad's corners land on screen, so
+    the last few results are reused. Preview textures are built at PREVIEW_SCALE of
+    the on-screen size with nearest-neighbour scaling, for frames where the camera is
+    still moving.
+    """
+
+    PREVIEW_SCALE = 0.25
+
+    def __init__(self, cache_size: int = GROUND_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._map = None
+
+    def get(self, camera: Hashable, corners, background: pygame.Surface, pyramid=None,
+            version: Hashable = None, preview: bool = False) -> Tuple[pygame.Surface, Tuple[float, float]]:
+        """The masked texture for the quad with screen corners and where to blit it.
+
+        camera identifies the corners; background, pyramid and version identify the map,
+        and a different map empties the cache.
+        """
+        map_key = (background, pyramid, version)
+        if self._map != map_key:
+            self._map = map_key
+            self._cache.clear()
+        key = (camera, preview)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        min_x = min(c[0] for c in corners)
+        max_x = max(c[0] for c in corners)
+        min_y = min(c[1] for c in corners)
+        max_y = max(c[1] for c in corners)
+        width = int(max_x - min_x)
+        height = int(max_y - min_y)
+        scale = self.PREVIEW_SCALE if preview else 1.0
+        build_w, build_h = max(1, int(width * scale)), max(1, int(height * scale))
+
+        # Scale down from the nearest pyramid level rather than the full crop
+        source = pyramid.surface_for(build_w, build_h) if pyramid is not None else background
+        resize = pygame.transform.scale if preview else pygame.transform.smoothscale
+        scaled_map = resize(source, (build_w, build_h))
+
+        plane_surface = pygame.Surface((build_w, build_h), pygame.SRCALPHA)
+        plane_surface.blit(scaled_map, (0, 0))
+
+        mask_surface = pygame.Surface((build_w, build_h), pygame.SRCALPHA)
+        mask_corners = [((c[0] - min_x) * scale, (c[1] - min_y) * scale) for c in corners]
+        pygame.draw.polygon(mask_surface, (255, 255, 255, 255), mask_corners)
+
+        plane_surface.blit(mask_surface, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        if preview:
+            plane_surface = pygame.transform.scale(plane_surface, (width, height))
+
+        result = (plane_surface, (min_x, min_y))
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
@@ -1,7 +1,58 @@
 
 import random
+import struct
 import numpy as np
-from typing import Tuple, List, Set
+from collections import deque
+from collections.abc import Set as AbstractSet
+from contextlib import contextmanager
+from typing import Tuple, List, Set, Iterator, Optional, Callable
+
+_HASH_INDEX_MULT = np.uint64(0x9E3779B97F4A7C15)
+_HASH_ELEVATION_SALT = np.uint64(0xD6E8FEB86659FD93)
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer; uint64 arithmetic wraps, which is what we want here
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _mix64_int(value: int) -> int:
+    # Scalar twin of _mix64 for single-cell edits, where numpy call overhead dominates
+    value ^= value >> 30
+    value = (value * 0xBF58476D1CE4E5B9) & _MASK64
+    value ^= value >> 27
+    value = (value * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class CellTypeView(AbstractSet):
+    """Read-only set view of the cells holding one cell type, derived from the grid array."""
+    
+    def __init__(self, environment: 'Grid3DEnvironment', cell_type: int):
+        self._environment = environment
+        self._cell_type = cell_type
+    
+    def __contains__(self, cell) -> bool:
+        z, row, col = cell
+        env = self._environment
+        if not (0 <= z < env.height and 0 <= row < env.rows and 0 <= col < env.cols):
+            return False
+        return env.grid[z, row, col] == self._cell_type
+    
+    def __iter__(self) -> Iterator[Tuple[int, int, int]]:
+        for z, row, col in self._environment.cells_of_type(self._cell_type):
+            yield (int(z), int(row), int(col))
+    
+    def __len__(self) -> int:
+        return self._environment.count_cells(self._cell_type)
+
 
 class Grid3DEnvironment:
     # Cell types
@@ -13,63 +64,291 @@ class Grid3DEnvironment:
     EXPLORED = 5
     CAR = 6  # Car obstacle type
     
+    # One byte per voxel is plenty for the seven cell types
+    CELL_DTYPE = np.uint8
+    
+    JOURNAL_SIZE = 256
+    
     def __init__(self, rows: int = 30, cols: int = 30, height: int = 5):
         self.rows = rows
         self.cols = cols
         self.height = height
-        self.grid = np.zeros((height, rows, cols), dtype=int)
-        self.terrain_costs = np.ones((height, rows, cols), dtype=float)
-        self.elevation = np.zeros((rows, cols), dtype=float)  
+        self._allocate_storage()
         self.start = None
         self.goal = None
-        self.obstacles = set()
-        self.cars = set()  
+        self.obstacles = CellTypeView(self, self.OBSTACLE)
+        self.cars = CellTypeView(self, self.CAR)
+        # Every mutation bumps the revision and journals its dirty box (z0, row0, col0, z1, row1, col1)
+        self.revision = 0
+        self.journal = deque(maxlen=self.JOURNAL_SIZE)
+        self.content_hash = 0
+        self._blocked_bits = None
+        self._blocked_bits_revision = -1
+        self._clearance = None
+        self._overlay_dirty = False
     
-    def reset(self):
-        self.grid = np.zeros((self.height, self.rows, self.cols), dtype=int)
-        self.terrain_costs = np.ones((self.height, self.rows, self.cols), dtype=float)
+    def _allocate_storage(self):
+        shape = (self.height, self.rows, self.cols)
+        self.grid = np.zeros(shape, dtype=self.CELL_DTYPE)
+        self.terrain_costs = np.ones(shape, dtype=float)
         self.elevation = np.zeros((self.rows, self.cols), dtype=float)
+        # PATH/EXPLORED live in their own layer so the occupancy grid the solvers read stays untouched
+        self.overlay = np.zeros(shape, dtype=self.CELL_DTYPE)
+    
+    def reset(self):
+        self._allocate_storage()
+        self._overlay_dirty = False
         self.start = None
         self.goal = None
-        self.obstacles = set()
-        self.cars = set()
+        # An all-default grid hashes to zero, so no digest pass is needed
+        self.content_hash = 0
+        self._record_change(self.full_box())
+        self.clear_path_visualization()
     
-    def set_start(self, z: int, row: int, col: int):
-        if self.start:
-            old_z, old_row, old_col = self.start
-            if self.grid[old_z, old_row, old_col] == self.START:
-                self.grid[old_z, old_row, old_col] = self.EMPTY
+    def load_state(self, arrays: dict, meta: dict):
+        """Adopt snapshot arrays in place (they may be memory-mapped) and their endpoints."""
+        self.grid = arrays['grid']
+        self.height, self.rows, self.cols = self.grid.shape
+        self.terrain_costs = arrays['terrain_costs']
+        self.elevation = arrays['elevation']
+        self.start = tuple(meta['start']) if meta.get('start') else None
+        self.goal = tuple(meta['goal']) if meta.get('goal') else None
+        self.overlay = np.zeros(self.grid.shape, dtype=self.CELL_DTYPE)
+        self._overlay_dirty = False
+        # Trust the stored hash so memory-mapped volumes are not read in full on open
+        stored_hash = meta.get('content_hash')
+        self.content_hash = stored_hash if stored_hash is not None else self.compute_content_hash()
+        self._record_change(self.full_box())
+    
+    def save_snapshot(self, path: str, mode: str = 'compressed') -> str:
+        from .grid_snapshot import save_snapshot
+        return save_snapshot(self, path, mode)
+    
+    def restore_snapshot(self, path: str, mmap_mode: str = 'c'):
+        from .grid_snapshot import read_snapshot
+        meta, arrays = read_snapshot(path, mmap_mode)
+        self.load_state(arrays, meta)
+    
+    def import_heightmap(self, path: str, **options):
+        """Fill elevation (and optionally slope costs) from a heightmap; see terrain_import."""
+        from .terrain_import import import_heightmap
+        import_heightmap(self, path, **options)
+    
+    def import_osm_extract(self, path: str, **options):
+        """Reset to the roads and buildings of a local .osm extract; see osm_extract.
+        Returns its bounds and named locations."""
+        from .osm_extract import import_osm_extract
+        return import_osm_extract(self, path, **options)
+    
+    def full_box(self) -> Tuple[int, int, int, int, int, int]:
+        return (0, 0, 0, self.height, self.rows, self.cols)
+    
+    @staticmethod
+    def _cell_box(z: int, row: int, col: int) -> Tuple[int, int, int, int, int, int]:
+        return (z, row, col, z + 1, row + 1, col + 1)
+    
+    def _flat_box(self, flat: np.ndarray) -> Optional[Tuple[int, int, int, int, int, int]]:
+        if len(flat) == 0:
+            return None
+        z, row, col = np.unravel_index(flat, self.grid.shape)
+        return (int(z.min()), int(row.min()), int(col.min()),
+                int(z.max()) + 1, int(row.max()) + 1, int(col.max()) + 1)
+    
+    def _flat_index(self, z: int, row: int, col: int) -> int:
+        return (z * self.rows + row) * self.cols + col
+    
+    def _selection_flat(self, selection) -> np.ndarray:
+        if isinstance(selection, np.ndarray):
+            return np.flatnonzero(selection)
+        return np.unique(np.ravel_multi_index(selection, self.grid.shape))
+    
+    @contextmanager
+    def _edit(self, boxes, cells=None):
+        """Wrap a mutation: folds the content change into content_hash, bumps the
+        revision and journals the dirty boxes. cells (unique flat indices) limits the
+        hash update to the touched cells; otherwise the disjoint boxes are digested."""
+        boxes = [box for box in boxes if box is not None]
+        if cells is None:
+            digest = lambda: self._boxes_digest(boxes)
+        else:
+            digest = lambda: self._cells_digest(cells)
+        before = digest()
+        yield
+        self.content_hash ^= before ^ digest()
+        self._record_change(*boxes)
+    
+    def _edit_cells(self, *cells):
+        # Coordinates may be numpy integers (e.g. from np.argwhere); the scalar hash needs ints
+        cells = list(dict.fromkeys(tuple(map(int, cell)) for cell in cells if cell is not None))
+        return self._edit([self._cell_box(*cell) for cell in cells],
+                          [self._flat_index(*cell) for cell in cells])
+    
+    def _record_change(self, *boxes):
+        self.revision += 1
+        self.journal.append((self.revision, boxes))
+    
+    def changes_since(self, revision: int) -> Optional[List[Tuple[int, int, int, int, int, int]]]:
+        """Dirty boxes recorded after revision, or None when the journal no longer
+        reaches back that far and the caller must assume everything changed."""
+        if revision >= self.revision:
+            return []
+        if revision < 0 or not self.journal or self.journal[0][0] > revision + 1:
+            return None
+        return [box for rev, boxes in self.journal if rev > revision for box in boxes]
+    
+    # Content hash: XOR of per-cell hashes. Cells in their default state (EMPTY, cost 1.0,
+    # elevation 0) contribute nothing, so the hash is independent of edit order.
+    def _cell_hash_keys(self, flat: np.ndarray, cells: np.ndarray, costs: np.ndarray) -> int:
+        changed = (cells != self.EMPTY) | (costs != 1.0)
+        if not changed.any():
+            return 0
+        key = (flat[changed].astype(np.uint64) * _HASH_INDEX_MULT) ^ (cells[changed].astype(np.uint64) << np.uint64(56))
+        key ^= np.ascontiguousarray(costs[changed], dtype=np.float64).view(np.uint64)
+        return int(np.bitwise_xor.reduce(_mix64(key)))
+    
+    def _cells_digest(self, cells) -> int:
+        if isinstance(cells, np.ndarray):
+            index = np.unravel_index(cells, self.grid.shape)
+            return self._cell_hash_keys(cells, self.grid[index], self.terrain_costs[index])
         
-        self.start = (z, row, col)
-        self.grid[z, row, col] = self.START
+        digest = 0
+        for flat in cells:
+            index = np.unravel_index(flat, self.grid.shape)
+            cell = int(self.grid[index])
+            cost = float(self.terrain_costs[index])
+            if cell == self.EMPTY and cost == 1.0:
+                continue
+            key = ((flat * int(_HASH_INDEX_MULT)) & _MASK64) ^ (cell << 56) ^ struct.unpack('<Q', struct.pack('<d', cost))[0]
+            digest ^= _mix64_int(key)
+        return digest
     
-    def set_goal(self, z: int, row: int, col: int):
-        if self.goal:
-            old_z, old_row, old_col = self.goal
-            if self.grid[old_z, old_row, old_col] == self.GOAL:
-                self.grid[old_z, old_row, old_col] = self.EMPTY
+    def _boxes_digest(self, boxes) -> int:
+        digest = 0
+        for box in dict.fromkeys(boxes):
+            digest ^= self._region_digest(box)
+        return digest
+    
+    def _region_digest(self, box) -> int:
+        z0, r0, c0, z1, r1, c1 = box
+        cells = self.grid[z0:z1, r0:r1, c0:c1]
+        costs = self.terrain_costs[z0:z1, r0:r1, c0:c1]
+        z, row, col = np.indices(cells.shape, sparse=True)
+        flat = ((z + z0) * self.rows + (row + r0)) * self.cols + (col + c0)
+        return self._cell_hash_keys(np.broadcast_to(flat, cells.shape), cells, costs) ^ self._elevation_digest(r0, c0, r1, c1)
+    
+    def _elevation_digest(self, r0: int, c0: int, r1: int, c1: int) -> int:
+        elevation = self.elevation[r0:r1, c0:c1]
+        raised = elevation != 0
+        if not raised.any():
+            return 0
+        row, col = np.nonzero(raised)
+        flat = np.ravel_multi_index((row + r0, col + c0), self.elevation.shape).astype(np.uint64)
+        key = (flat * _HASH_INDEX_MULT) ^ _HASH_ELEVATION_SALT
+        key ^= np.ascontiguousarray(elevation[row, col], dtype=np.float64).view(np.uint64)
+        return int(np.bitwise_xor.reduce(_mix64(key)))
+    
+    def compute_content_hash(self) -> int:
+        return self._region_digest(self.full_box())
+    
+    def cells_of_type(self, cell_type: int) -> np.ndarray:
+        return np.argwhere(self.grid == cell_type)
+    
+    def count_cells(self, cell_type: int) -> int:
+        return int(np.count_nonzero(self.grid == cell_type))
+    
+    def blocked_mask(self, box: Optional[Tuple[int, int, int, int, int, int]] = None) -> np.ndarray:
+        """Obstacle or car cells, over the whole grid or a (z0, row0, col0, z1, row1, col1) box."""
+        cells = self.grid if box is None else self.grid[box[0]:box[3], box[1]:box[4], box[2]:box[5]]
+        return (cells == self.OBSTACLE) | (cells == self.CAR)
+    
+    def reachable_mask(self, start: Tuple[int, int, int]):
+        """Cells the solvers can reach from start, indexable like the grid.
+        Storage backends override this with their own layout."""
+        from .location_registry import reachable_mask
+        return reachable_mask(self, start)
+    
+    def blocked_bits(self) -> bytes:
+        """Bit-packed blocked mask in C order: cell (z, row, col) is bit
+        i = (z * rows + row) * cols + col, tested as bits[i >> 3] & (128 >> (i & 7))."""
+        if self._blocked_bits_revision != self.revision:
+            self._blocked_bits = np.packbits(self.blocked_mask().ravel()).tobytes()
+            self._blocked_bits_revision = self.revision
+        return self._blocked_bits
+    
+    @property
+    def clearance(self):
+        """Distance-to-nearest-obstacle field, built on first use and kept current
+        from the change journal."""
+        if self._clearance is None:
+            from .clearance_map import ClearanceMap
+            self._clearance = ClearanceMap(self)
+        return self._clearance
+    
+    def blocked_lookup(self, min_clearance: int = 0) -> Callable[[int, int, int], int]:
+        """Fast (z, row, col) -> truthy-if-blocked test for the solvers, bound to the
+        current revision. With min_clearance > 1, cells closer than that to an obstacle
+        count as blocked too; the per-node cost is the same bit test either way.
+        Storage backends override this with their own layout."""
+        if min_clearance > 1:
+            bits = self.clearance.restricted_bits(min_clearance)
+        else:
+            bits = self.blocked_bits()
+        rows, cols = self.rows, self.cols
         
-        self.goal = (z, row, col)
-        self.grid[z, row, col] = self.GOAL
+        def is_blocked(z: int, row: int, col: int) -> int:
+            index = (z * rows + row) * cols + col
+            return bits[index >> 3] & (128 >> (index & 7))
+        
+        return is_blocked
+    
+    def set_start(self, z: int, row: int, col: int):
+        with self._edit_cells(self.start, (z, row, col)):
+            if self.start:
+                old_z, old_row, old_col = self.start
+                if self.grid[old_z, old_row, old_col] == self.START:
+                    self.grid[old_z, old_row, old_col] = self.EMPTY
+            
+            self.start = (int(z), int(row), int(col))
+            self.grid[z, row, col] = self.START
+    
+    def set_goal(self, z: int, row: int, col: int):
+        with self._edit_cells(self.goal, (z, row, col)):
+            if self.goal:
+                old_z, old_row, old_col = self.goal
+                if self.grid[old_z, old_row, old_col] == self.GOAL:
+                    self.grid[old_z, old_row, old_col] = self.EMPTY
+            
+            self.goal = (int(z), int(row), int(col))
+            self.grid[z, row, col] = self.GOAL
     
     def add_obstacle(self, z: int, row: int, col: int):
         if (z, row, col) != self.start and (z, row, col) != self.goal:
-            self.grid[z, row, col] = self.OBSTACLE
-            self.obstacles.add((z, row, col))
+            with self._edit_cells((z, row, col)):
+                self.grid[z, row, col] = self.OBSTACLE
     
     def add_car(self, z: int, row: int, col: int):
         if (z, row, col) != self.start and (z, row, col) != self.goal and z == 0:
-            self.grid[z, row, col] = self.CAR
-            self.cars.add((z, row, col))
+            with self._edit_cells((z, row, col)):
+                self.grid[z, row, col] = self.CAR
     
     def remove_obstacle(self, z: int, row: int, col: int):
-        if (z, row, col) in self.obstacles:
-            self.grid[z, row, col] = self.EMPTY
-            self.obstacles.discard((z, row, col))
-            self.terrain_costs[z, row, col] = 1.0
-        if (z, row, col) in self.cars:
-            self.grid[z, row, col] = self.EMPTY
-            self.cars.discard((z, row, col))
+        cell_type = self.grid[z, row, col]
+        if cell_type == self.OBSTACLE:
+            with self._edit_cells((z, row, col)):
+                self.grid[z, row, col] = self.EMPTY
+                self.terrain_costs[z, row, col] = 1.0
+        elif cell_type == self.CAR:
+            with self._edit_cells((z, row, col)):
+                self.grid[z, row, col] = self.EMPTY
+    
+    def set_elevation(self, values: np.ndarray, row: int = 0, col: int = 0):
+        """Write a block of ground heights (in levels) with its top-left corner at (row, col)."""
+        values = np.asarray(values, dtype=float)
+        r1, c1 = row + values.shape[0], col + values.shape[1]
+        before = self._elevation_digest(row, col, r1, c1)
+        self.elevation[row:r1, col:c1] = values
+        self.content_hash ^= before ^ self._elevation_digest(row, col, r1, c1)
+        self._record_change((0, row, col, self.height, r1, c1))
     
     def is_obstacle(self, z: int, row: int, col: int) -> bool:
         cell_type = self.grid[z, row, col]
@@ -83,27 +362,151 @@ class Grid3DEnvironment:
     
     def set_terrain_cost(self, z: int, row: int, col: int, cost: float):
         if not self.is_obstacle(z, row, col):
-            self.terrain_costs[z, row, col] = cost
+            with self._edit_cells((z, row, col)):
+                self.terrain_costs[z, row, col] = cost
+    
+    def _selection(self, cells):
+        """Index for a boolean mask of grid shape or an (N, 3) array of (z, row, col),
+        leaving out the start and goal cells. Masks are used as-is (copied only when
+        they cover an endpoint) so bulk edits never expand them into coordinates."""
+        cells = np.asarray(cells)
+        if cells.dtype == bool:
+            if cells.shape != self.grid.shape:
+                raise ValueError(f"Mask shape {cells.shape} does not match grid shape {self.grid.shape}")
+            endpoints = [e for e in (self.start, self.goal) if e is not None and cells[e]]
+            if endpoints:
+                cells = cells.copy()
+                for endpoint in endpoints:
+                    cells[endpoint] = False
+            return cells
+        
+        coords = cells.reshape(-1, 3).astype(np.intp)
+        for endpoint in (self.start, self.goal):
+            if endpoint is not None and len(coords):
+                coords = coords[np.any(coords != endpoint, axis=1)]
+        return coords[:, 0], coords[:, 1], coords[:, 2]
+    
+    def add_obstacles(self, cells):
+        selection = self._selection(cells)
+        flat = self._selection_flat(selection)
+        with self._edit([self._flat_box(flat)], flat):
+            self.grid[selection] = self.OBSTACLE
+    
+    def add_cars(self, cells):
+        selection = self._selection(cells)
+        z, row, col = np.nonzero(selection) if isinstance(selection, np.ndarray) else selection
+        on_ground = z == 0
+        selection = (z[on_ground], row[on_ground], col[on_ground])
+        flat = self._selection_flat(selection)
+        with self._edit([self._flat_box(flat)], flat):
+            self.grid[selection] = self.CAR
+    
+    def remove_obstacles(self, cells):
+        selection = self._selection(cells)
+        flat = self._selection_flat(selection)
+        with self._edit([self._flat_box(flat)], flat):
+            cell_types = self.grid[selection]
+            is_obstacle = cell_types == self.OBSTACLE
+            costs = self.terrain_costs[selection]
+            costs[is_obstacle] = 1.0
+            self.terrain_costs[selection] = costs
+            cell_types[is_obstacle | (cell_types == self.CAR)] = self.EMPTY
+            self.grid[selection] = cell_types
+    
+    def extrude_columns(self, height_map: np.ndarray, base_z: int = 0):
+        """Fill obstacle columns from base_z up to base_z + height_map[row, col] levels."""
+        height_map = np.asarray(height_map)
+        top = min(self.height, base_z + int(height_map.max(initial=0)))
+        z_start = max(base_z, 0)
+        if top <= z_start:
+            return
+        rows, cols = np.nonzero(height_map > 0)
+        box = (z_start, int(rows.min()), int(cols.min()), top, int(rows.max()) + 1, int(cols.max()) + 1)
+        footprint = rows * self.cols + cols
+        column_heights = height_map[rows, cols]
+        level_size = self.rows * self.cols
+        cells = np.concatenate([z * level_size + footprint[column_heights > z - base_z]
+                                for z in range(z_start, top)])
+        
+        with self._edit([box], cells):
+            self.grid[np.unravel_index(cells, self.grid.shape)] = self.OBSTACLE
+            self._restore_endpoints()
+    
+    def _restore_endpoints(self):
+        if self.start:
+            self.grid[self.start] = self.START
+        if self.goal:
+            self.grid[self.goal] = self.GOAL
+    
+    def paint_terrain_cost(self, region, cost, z: int = 0):
+        """Set terrain cost over a region, skipping obstacles like set_terrain_cost.
+
+        region is a boolean mask of grid shape, a (rows, cols) mask applied on level z,
+        or a tuple of slices; cost is a scalar, an array shaped like the region (the
+        mask, or the block the slices select) or one of grid shape.
+        """
+        # Work on the region's box, so painting one level never builds a full-volume mask
+        box = self.full_box()
+        mask = None
+        cost = np.asarray(cost, dtype=float)
+        if isinstance(region, tuple):
+            if all(isinstance(k, slice) and k.step in (None, 1) for k in region) and len(region) <= 3:
+                keys = region + (slice(None),) * (3 - len(region))
+                bounds = [k.indices(n)[:2] for k, n in zip(keys, self.grid.shape)]
+                box = tuple(start for start, _ in bounds) + tuple(max(start, stop) for start, stop in bounds)
+            else:
+                mask = np.zeros(self.grid.shape, dtype=bool)
+                mask[region] = True
+                if cost.ndim and cost.shape != self.grid.shape:
+                    # Spread a region-shaped cost over the cells the slices select
+                    region_cost = np.ones(self.grid.shape)
+                    region_cost[region] = cost
+                    cost = region_cost
+        else:
+            mask = np.asarray(region, dtype=bool)
+            if mask.shape == (self.rows, self.cols):
+                box = (z, 0, 0, z + 1, self.rows, self.cols)
+                mask = mask[None]
+            elif mask.shape != self.grid.shape:
+                raise ValueError(f"Region shape {mask.shape} does not match grid shape {self.grid.shape}")
+        
+        z0, r0, c0, z1, r1, c1 = box
+        paint = ~self.blocked_mask(box)
+        if mask is not None:
+            paint &= mask
+        if cost.ndim:
+            if cost.shape == self.grid.shape:
+                cost = cost[z0:z1, r0:r1, c0:c1]
+            # Costs are indexed relative to the box, like paint
+            cost = np.broadcast_to(cost, paint.shape)
+        z_index, row_index, col_index = np.nonzero(paint)
+        cells = (z_index + z0, row_index + r0, col_index + c0)
+        flat = np.ravel_multi_index(cells, self.grid.shape)
+        with self._edit([self._flat_box(flat)], flat):
+            if cost.ndim == 0:
+                self.terrain_costs[cells] = cost
+            else:
+                self.terrain_costs[cells] = cost[z_index, row_index, col_index]
     
     def generate_random_obstacles(self, density: float = 0.15):
         num_obstacles = int(self.height * self.rows * self.cols * density)
+        # Seeded from the global random state so random.seed() still reproduces the layout
+        rng = np.random.default_rng(random.getrandbits(64))
         
-        for _ in range(num_obstacles):
-            z = random.randint(0, self.height - 1)
-            row = random.randint(0, self.rows - 1)
-            col = random.randint(0, self.cols - 1)
-
-            if (z, row, col) != self.start and (z, row, col) != self.goal:
-                self.add_obstacle(z, row, col)
+        mask = np.zeros(self.grid.size, dtype=bool)
+        mask[rng.integers(0, self.grid.size, num_obstacles)] = True
+        self.add_obstacles(mask.reshape(self.grid.shape))
     
     def generate_buildings(self, use_recursive=False):
+        heights = np.zeros((self.rows, self.cols), dtype=np.intp)
+        
         if use_recursive:
             num_edge_buildings = random.randint(10, 12)
             total_edge = num_edge_buildings * 4  # 4 edges
             center_buildings = random.randint(160, 170) - total_edge  
             
-            self._place_perimeter_buildings(num_edge_buildings)
-            self._generate_buildings_recursive_center(5, self.rows - 6, 5, self.cols - 6, target=center_buildings)
+            self._place_perimeter_buildings(heights, num_edge_buildings)
+            self._generate_buildings_recursive_center(heights, 5, self.rows - 6, 5, self.cols - 6, target=center_buildings)
         else:
             num_buildings = random.randint(8, 15)
             
@@ -111,12 +514,19 @@ class Grid3DEnvironment:
                 base_row = random.randint(2, self.rows - 3)
                 base_col = random.randint(2, self.cols - 3)
                 building_height = random.randint(1, self.height)
+                self._add_column(heights, base_row, base_col, building_height)
         
-                for z in range(building_height):
-                    if (z, base_row, base_col) != self.start and (z, base_row, base_col) != self.goal:
-                        self.add_obstacle(z, base_row, base_col)
+        self.extrude_columns(heights)
+    
+    def generate_city(self, seed: int, tile_size: int = 64, workers: Optional[int] = None):
+        """Reproducible city from a seed, built tile by tile (optionally across processes)."""
+        from .city_generator import CityGenerator
+        CityGenerator(seed, tile_size).generate(self, workers)
     
-    def _place_perimeter_buildings(self, buildings_per_edge=10):
+    def _add_column(self, heights, row, col, building_height):
+        heights[row, col] = max(heights[row, col], building_height)
+    
+    def _place_perimeter_buildings(self, heights, buildings_per_edge=10):
         min_r, max_r = 2, self.rows - 3
         min_c, max_c = 2, self.cols - 3
         
@@ -124,27 +534,27 @@ class Grid3DEnvironment:
             col = min_c + int((max_c - min_c) * i / buildings_per_edge) + random.randint(0, 2)
             col = min(col, max_c)
             building_height = random.randint(2, self.height)
-            self._build_column_recursive(min_r, col, 0, building_height)
+            self._add_column(heights, min_r, col, building_height)
 
         for i in range(buildings_per_edge):
             col = min_c + int((max_c - min_c) * i / buildings_per_edge) + random.randint(0, 2)
             col = min(col, max_c)
             building_height = random.randint(2, self.height)
-            self._build_column_recursive(max_r, col, 0, building_height)
+            self._add_column(heights, max_r, col, building_height)
 
         for i in range(buildings_per_edge):
             row = min_r + int((max_r - min_r) * i / buildings_per_edge) + random.randint(0, 2)
             row = min(row, max_r)
             building_height = random.randint(2, self.height)
-            self._build_column_recursive(row, min_c, 0, building_height)
+            self._add_column(heights, row, min_c, building_height)
 
         for i in range(buildings_per_edge):
             row = min_r + int((max_r - min_r) * i / buildings_per_edge) + random.randint(0, 2)
             row = min(row, max_r)
             building_height = random.randint(2, self.height)
-            self._build_column_recursive(row, max_c, 0, building_height)
+            self._add_column(heights, row, max_c, building_height)
     
-    def _generate_buildings_recursive_center(self, min_row, max_row, min_col, max_col, target=40, count=0):
+    def _generate_buildings_recursive_center(self, heights, min_row, max_row, min_col, max_col, target=40, count=0):
         if count >= target:
             return count     
         if max_row - min_row < 3 or max_col - min_col < 3:
@@ -154,7 +564,7 @@ class Grid3DEnvironment:
         col = random.randint(min_col, max_col)
         building_height = random.randint(1, 3)
         
-        self._build_column_recursive(row, col, 0, building_height)
+        self._add_column(heights, row, col, building_height)
         count += 1
         
         if count >= target:
@@ -163,53 +573,48 @@ class Grid3DEnvironment:
         mid_row = (min_row + max_row) // 2
         mid_col = (min_col + max_col) // 2
  
-        count = self._generate_buildings_recursive_center(min_row, mid_row, min_col, mid_col, target, count)
+        count = self._generate_buildings_recursive_center(heights, min_row, mid_row, min_col, mid_col, target, count)
         if count >= target:
             return count
             
-        count = self._generate_buildings_recursive_center(min_row, mid_row, mid_col, max_col, target, count)
+        count = self._generate_buildings_recursive_center(heights, min_row, mid_row, mid_col, max_col, target, count)
         if count >= target:
             return count
             
-        count = self._generate_buildings_recursive_center(mid_row, max_row, min_col, mid_col, target, count)
+        count = self._generate_buildings_recursive_center(heights, mid_row, max_row, min_col, mid_col, target, count)
         if count >= target:
             return count
             
-        count = self._generate_buildings_recursive_center(mid_row, max_row, mid_col, max_col, target, count)
-        count = self._generate_buildings_recursive_center(mid_row, max_row, mid_col, max_col, target, count)
+        count = self._generate_buildings_recursive_center(heights, mid_row, max_row, mid_col, max_col, target, count)
+        count = self._generate_buildings_recursive_center(heights, mid_row, max_row, mid_col, max_col, target, count)
         
         return count
-    def _build_column_recursive(self, row, col, current_z, target_height):
-        if current_z >= target_height:
-            return
-        
-        if (current_z, row, col) != self.start and (current_z, row, col) != self.goal:
-            self.add_obstacle(current_z, row, col)
-        
-        self._build_column_recursive(row, col, current_z + 1, target_height)
-    
     
     def clear_path_visualization(self):
-        for z in range(self.height):
-            for row in range(self.rows):
-                for col in range(self.cols):
-                    if self.grid[z, row, col] in [self.PATH, self.EXPLORED]:
-                        self.grid[z, row, col] = self.EMPTY
-        
-        if self.start:
-            self.grid[self.start[0], self.start[1], self.start[2]] = self.START
-        if self.goal:
-            self.grid[self.goal[0], self.goal[1], self.goal[2]] = self.GOAL
+        if self._overlay_dirty:
+            self.overlay.fill(self.EMPTY)
+            self._overlay_dirty = False
+    
+    def _overlay_index(self, nodes: List[Tuple[int, int, int]]):
+        coords = np.asarray(nodes, dtype=np.intp).reshape(-1, 3)
+        return coords[:, 0], coords[:, 1], coords[:, 2]
     
     def mark_explored(self, nodes: List[Tuple[int, int, int]]):
-        marked = 0
-        for z, row, col in nodes:
-            if self.grid[z, row, col] == self.EMPTY:
-                self.grid[z, row, col] = self.EXPLORED
-                marked += 1
+        if len(nodes) == 0:
+            print("  Marked 0 out of 0 cells as explored")
+            return
+        z, row, col = self._overlay_index(nodes)
+        free = (self.grid[z, row, col] == self.EMPTY) & (self.overlay[z, row, col] == self.EMPTY)
+        flat = np.ravel_multi_index((z[free], row[free], col[free]), self.overlay.shape)
+        marked = len(np.unique(flat))
+        self.overlay[np.unravel_index(flat, self.overlay.shape)] = self.EXPLORED
+        self._overlay_dirty = True
         print(f"  Marked {marked} out of {len(nodes)} cells as explored")
     
     def mark_path(self, path: List[Tuple[int, int, int]]):
-        for z, row, col in path:
-            if (z, row, col) != self.start and (z, row, col) != self.goal:
-                self.grid[z, row, col] = self.PATH
+        if len(path) == 0:
+            return
+        z, row, col = self._overlay_index(path)
+        keep = (self.grid[z, row, col] != self.START) & (self.grid[z, row, col] != self.GOAL)
+        self.overlay[z[keep], row[keep], col[keep]] = self.PATH
+        self._overlay_dirty = True
@@ -0,0 +1,113 @@
+import json
+import os
+import numpy as np
+from typing import Dict, Tuple
+from .grid_environment_3d import Grid3DEnvironment
+
+# Bump when the on-disk layout changes and add an upgrade step below
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ARRAYS = ('grid', 'terrain_costs', 'elevation')
+META_FILE = 'meta.json'
+
+
+def _upgrade_v0(meta: Dict, arrays: Dict) -> Tuple[Dict, Dict]:
+    # v0 snapshots predate the uint8 cell grid and the version header
+    arrays['grid'] = np.asarray(arrays['grid']).astype(Grid3DEnvironment.CELL_DTYPE)
+    height, rows, cols = arrays['grid'].shape
+    if 'terrain_costs' not in arrays:
+        arrays['terrain_costs'] = np.ones((height, rows, cols), dtype=float)
+    if 'elevation' not in arrays:
+        arrays['elevation'] = np.zeros((rows, cols), dtype=float)
+    meta.pop('content_hash', None)
+    meta['version'] = 1
+    return meta, arrays
+
+
+_UPGRADES = {
+    0: _upgrade_v0,
+}
+
+
+def _snapshot_meta(grid: Grid3DEnvironment) -> Dict:
+    return {
+        'version': SNAPSHOT_VERSION,
+        'rows': grid.rows,
+        'cols': grid.cols,
+        'height': grid.height,
+        'start': list(grid.start) if grid.start else None,
+        'goal': list(grid.goal) if grid.goal else None,
+        'content_hash': grid.content_hash,
+    }
+
+
+def _replace_file(path: str, write):
+    """Call write(file) on a temporary file next to path, then rename it over path."""
+    tmp_path = f'{path}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_snapshot(grid: Grid3DEnvironment, path: str, mode: str = 'compressed') -> str:
+    """Write cell types, terrain costs, elevation and endpoints.
+
+    mode='compressed' writes a single .npz archive; mode='mmap' writes a directory of
+    raw .npy files that load_snapshot can memory-map without reading them.
+    Returns the path written.
+    """
+    meta = _snapshot_meta(grid)
+    arrays = {name: getattr(grid, name) for name in SNAPSHOT_ARRAYS}
+
+    if mode == 'compressed':
+        if not path.endswith('.npz'):
+            path += '.npz'
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+    elif mode == 'mmap':
+        os.makedirs(path, exist_ok=True)
+        # The grid may be memory-mapping this very snapshot, so each file is written
+        # beside the old one and swapped in; existing mappings keep the old inode
+        for name, array in arrays.items():
+            _replace_file(os.path.join(path, f'{name}.npy'), lambda f: np.save(f, array))
+        # Written last so an interrupted save is never mistaken for a complete snapshot
+        _replace_file(os.path.join(path, META_FILE), lambda f: f.write(json.dumps(meta).encode()))
+    else:
+        raise ValueError(f"Unknown snapshot mode: {mode}")
+    return path
+
+
+def read_snapshot(path: str, mmap_mode: str = 'c') -> Tuple[Dict, Dict]:
+    """Read (meta, arrays), upgraded to the current version. Directory snapshots are
+    memory-mapped with mmap_mode ('c' keeps edits in memory, 'r+' writes them back)."""
+    if os.path.isdir(path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in SNAPSHOT_ARRAYS:
+            array_path = os.path.join(path, f'{name}.npy')
+            if os.path.exists(array_path):
+                arrays[name] = np.load(array_path, mmap_mode=mmap_mode)
+    else:
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta'])) if 'meta' in data.files else {}
+            arrays = {name: data[name] for name in SNAPSHOT_ARRAYS if name in data.files}
+
+    version = meta.get('version', 0)
+    if version > SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {version} is newer than supported version {SNAPSHOT_VERSION}")
+    while version < SNAPSHOT_VERSION:
+        meta, arrays = _UPGRADES[version](meta, arrays)
+        version = meta['version']
+    return meta, arrays
+
+
+def load_snapshot(path: str, mmap_mode: str = 'c') -> Grid3DEnvironment:
+    meta, arrays = read_snapshot(path, mmap_mode)
+    height, rows, cols = arrays['grid'].shape
+    grid = Grid3DEnvironment(rows, cols, height)
+    grid.load_state(arrays, meta)
+    return grid
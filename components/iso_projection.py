@@ -0,0 +1,79 @@
+import math
+from typing import Dict, Tuple
+import numpy as np
+
+
+class IsoProjection:
+    """Screen positions for one camera state, computed a whole level at a time.
+
+    project() is the visualizer's cart_to_iso applied to arrays, with the same
+    operation order, so a point projects to exactly the same floats either way.
+    corners(z) holds every lattice point of level z, indexed [row, col] for
+    cart (col, row, z); centres(z) holds every cell centre. Levels are projected
+    on first use and kept until the camera changes (a new IsoProjection).
+    """
+
+    def __init__(self, rows: int, cols: int, levels: int, yaw: float, pitch: float, distance: float,
+                 tile_width: float, tile_height: float, offset_x: float, offset_y: float):
+        self.rows, self.cols, self.levels = rows, cols, levels
+        self.distance = distance
+        self.tile_width, self.tile_height = tile_width, tile_height
+        self.offset_x, self.offset_y = offset_x, offset_y
+        yaw_rad = math.radians(yaw)
+        self.cos_yaw, self.sin_yaw = math.cos(yaw_rad), math.sin(yaw_rad)
+        pitch_rad = math.radians(pitch)
+        self.cos_pitch, self.sin_pitch = math.cos(pitch_rad), math.sin(pitch_rad)
+        self._corners: Dict[int, np.ndarray] = {}
+        self._centres: Dict[int, np.ndarray] = {}
+
+    def project(self, x, y, z) -> Tuple[np.ndarray, np.ndarray]:
+        """Screen (iso_x, iso_y) for cart coordinates; scalars or broadcastable arrays."""
+        cx, cy, cz = self.cols / 2, self.rows / 2, self.levels / 2
+        x_rel = x - cx
+        y_rel = y - cy
+        z_rel = z - cz
+
+        x_yaw = x_rel * self.cos_yaw - y_rel * self.sin_yaw
+        y_yaw = x_rel * self.sin_yaw + y_rel * self.cos_yaw
+        z_yaw = z_rel
+
+        x_final = x_yaw
+        y_final = y_yaw * self.cos_pitch - z_yaw * self.sin_pitch
+        z_final = y_yaw * self.sin_pitch + z_yaw * self.cos_pitch
+
+        scale = self.tile_width / 2 * self.distance
+        iso_x = (x_final - y_final) * scale + self.offset_x
+        iso_y = (x_final + y_final) * self.tile_height / 2 * self.distance \
+            - z_final * self.tile_height * 2 * self.distance + self.offset_y
+        return iso_x, iso_y
+
+    def _level(self, z: int, rows: int, cols: int, inset: float) -> np.ndarray:
+        row = np.arange(rows, dtype=float)[:, None] + inset
+        col = np.arange(cols, dtype=float)[None, :] + inset
+        iso_x, iso_y = self.project(col, row, z)
+        return np.stack(np.broadcast_arrays(iso_x, iso_y), axis=-1)
+
+    def corners(self, z: int = 0) -> np.ndarray:
+        """(rows + 1, cols + 1, 2) screen positions of the lattice points of level z."""
+        points = self._corners.get(z)
+        if points is None:
+            points = self._corners[z] = self._level(z, self.rows + 1, self.cols + 1, 0.0)
+        return points
+
+    def centres(self, z: int = 0) -> np.ndarray:
+        """(rows, cols, 2) screen positions of the cell centres of level z."""
+        points = self._centres.get(z)
+        if points is None:
+            points = self._centres[z] = self._level(z, self.rows, self.cols, 0.5)
+        return points
+
+    def quads(self, cells: np.ndarray) -> np.ndarray:
+        """(n, 4, 2) screen corners of (z, row, col) cells, in cart_to_iso's winding."""
+        quads = np.empty((len(cells), 4, 2))
+        for z in np.unique(cells[:, 0]):
+            on_level = cells[:, 0] == z
+            row, col = cells[on_level, 1], cells[on_level, 2]
+            points = self.corners(int(z))
+            quads[on_level] = np.stack([points[row, col], points[row, col + 1],
+                                        points[row + 1, col + 1], points[row + 1, col]], axis=1)
+        return quads
@@ -0,0 +1,261 @@
+import csv
+import json
+import math
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_CIRCUMFERENCE = 40075016.686
+POINTS_PER_BUCKET = 4
+# Moves the solvers make: 4-way and diagonal on a level, straight up and down
+MOVES = ((0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1), (-1, 0, 0), (1, 0, 0),
+         (0, -1, -1), (0, -1, 1), (0, 1, -1), (0, 1, 1))
+
+
+def web_mercator(lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator (x, y) of lat/lon arrays on the unit square, y growing southwards;
+    multiply by TILE_SIZE * 2 ** zoom for global tile pixels."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2.0
+    return x, y
+
+
+class GridProjection:
+    """Maps lat/lon onto a rows x cols grid spanning a Web Mercator box (x0, y0)-(x1, y1)."""
+
+    def __init__(self, x0: float, y0: float, x1: float, y1: float, rows: int, cols: int):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.rows, self.cols = rows, cols
+
+    @classmethod
+    def from_view(cls, view, rows: int, cols: int, tile_size: int = 256) -> 'GridProjection':
+        """From a (zoom, left, top, width, height) crop in global tile pixels."""
+        zoom, left, top, width, height = view
+        scale = tile_size * 2 ** zoom
+        return cls(left / scale, top / scale, (left + width) / scale, (top + height) / scale, rows, cols)
+
+    @classmethod
+    def from_bounds(cls, bounds, rows: int, cols: int) -> 'GridProjection':
+        """From (min_lat, min_lon, max_lat, max_lon), row 0 along the northern edge."""
+        min_lat, min_lon, max_lat, max_lon = bounds
+        (x0, x1), (y0, y1) = web_mercator([max_lat, min_lat], [min_lon, max_lon])
+        return cls(x0, y0, x1, y1, rows, cols)
+
+    def project(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        """Fractional (row, col) of lat/lon arrays; may fall outside the grid."""
+        x, y = web_mercator(lat, lon)
+        return ((y - self.y0) / (self.y1 - self.y0) * self.rows,
+                (x - self.x0) / (self.x1 - self.x0) * self.cols)
+
+    def cells(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        """Integer (row, col) of lat/lon arrays, clamped onto the grid."""
+        row, col = self.project(lat, lon)
+        return (np.clip(np.floor(row), 0, self.rows - 1).astype(np.intp),
+                np.clip(np.floor(col), 0, self.cols - 1).astype(np.intp))
+
+
+class LocationRegistry:
+    """Named points of interest with batch projection and a bucketed spatial index.
+
+    Behaves like a read-only {name: (lat, lon)} mapping in insertion order. The index
+    hashes points into a uniform Web Mercator bucket grid sized for a few points per
+    bucket, so radius and nearest queries only look at nearby buckets.
+    """
+
+    def __init__(self, names: Sequence[str], lat, lon):
+        self.names = list(names)
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        if not (len(self.names) == len(self.lat) == len(self.lon)):
+            raise ValueError("names, lat and lon must have the same length")
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._build_index()
+
+    @classmethod
+    def from_dict(cls, locations: Dict[str, Tuple[float, float]]) -> 'LocationRegistry':
+        names = list(locations)
+        coords = np.array([locations[name] for name in names], dtype=float).reshape(-1, 2)
+        return cls(names, coords[:, 0], coords[:, 1])
+
+    @classmethod
+    def load(cls, path: str) -> 'LocationRegistry':
+        """Read a CSV with name/lat/lon columns (latitude/longitude also accepted), a
+        JSON {name: [lat, lon]} object or list of {name, lat, lon}, or GeoJSON points.
+        Later duplicates of a name are ignored."""
+        locations = {}
+        if os.path.splitext(path)[1].lower() == '.csv':
+            with open(path, newline='', encoding='utf-8') as f:
+                for record in csv.DictReader(f):
+                    record = {key.strip().lower(): value for key, value in record.items() if key}
+                    lat = record.get('lat', record.get('latitude'))
+                    lon = record.get('lon', record.get('longitude'))
+                    locations.setdefault(record['name'], (float(lat), float(lon)))
+        else:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('type') == 'FeatureCollection':
+                for feature in data['features']:
+                    if feature.get('geometry', {}).get('type') == 'Point':
+                        lon, lat = feature['geometry']['coordinates'][:2]
+                        name = feature.get('properties', {}).get('name')
+                        if name:
+                            locations.setdefault(name, (float(lat), float(lon)))
+            elif isinstance(data, dict):
+                for name, (lat, lon) in data.items():
+                    locations.setdefault(name, (float(lat), float(lon)))
+            else:
+                for record in data:
+                    locations.setdefault(record['name'], (float(record['lat']), float(record['lon'])))
+        if not locations:
+            raise ValueError(f"No locations in {path}")
+        return cls.from_dict(locations)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __getitem__(self, name: str) -> Tuple[float, float]:
+        i = self._index[name]
+        return float(self.lat[i]), float(self.lon[i])
+
+    def keys(self) -> List[str]:
+        return list(self.names)
+
+    def items(self):
+        return ((name, self[name]) for name in self.names)
+
+    def cells(self, projection: GridProjection, names: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(row, col) arrays of the given names (default all) on a grid, in one batch."""
+        index = slice(None) if names is None else np.array([self._index[name] for name in names], dtype=np.intp)
+        return projection.cells(self.lat[index], self.lon[index])
+
+    def _build_index(self):
+        self._x, self._y = web_mercator(self.lat, self.lon)
+        buckets = max(1, int(math.sqrt(len(self.names) / POINTS_PER_BUCKET)))
+        if len(self.names):
+            self._origin = (float(self._x.min()), float(self._y.min()))
+            extent = max(float(self._x.max()) - self._origin[0], float(self._y.max()) - self._origin[1], 1e-12)
+        else:
+            self._origin, extent = (0.0, 0.0), 1.0
+        self._bucket_size = extent / buckets
+        self._buckets = buckets
+        bucket_x, bucket_y = self._bucket_of(self._x, self._y)
+        keys = bucket_y * buckets + bucket_x
+        self._order = np.argsort(keys, kind='stable')
+        # Points of bucket k are _order[_starts[k]:_starts[k + 1]]
+        self._starts = np.searchsorted(keys[self._order], np.arange(buckets * buckets + 1))
+
+    def _bucket_of(self, x, y):
+        bx = np.clip(((x - self._origin[0]) / self._bucket_size).astype(np.intp), 0, self._buckets - 1)
+        by = np.clip(((y - self._origin[1]) / self._bucket_size).astype(np.intp), 0, self._buckets - 1)
+        return bx, by
+
+    def _candidates(self, x: float, y: float, reach: int) -> np.ndarray:
+        bx, by = self._bucket_of(np.array([x]), np.array([y]))
+        x0, x1 = max(bx[0] - reach, 0), min(bx[0] + reach, self._buckets - 1)
+        y0, y1 = max(by[0] - reach, 0), min(by[0] + reach, self._buckets - 1)
+        rows = np.arange(y0, y1 + 1) * self._buckets
+        starts, ends = self._starts[rows + x0], self._starts[rows + x1 + 1]
+        return np.concatenate([self._order[s:e] for s, e in zip(starts, ends)])
+
+    def _metres(self, lat: float, x: float, y: float, points: np.ndarray) -> np.ndarray:
+        # Web Mercator stretches by 1 / cos(lat); fine at city scale
+        scale = EARTH_CIRCUMFERENCE * math.cos(math.radians(lat))
+        return np.hypot(self._x[points] - x, self._y[points] - y) * scale
+
+    def within(self, lat: float, lon: float, radius: float) -> List[Tuple[str, float]]:
+        """(name, distance in metres) of every location within radius, nearest first."""
+        if not self.names:
+            return []
+        x, y = (float(v) for v in web_mercator(lat, lon))
+        radius_units = radius / (EARTH_CIRCUMFERENCE * math.cos(math.radians(lat)))
+        points = self._candidates(x, y, int(math.ceil(radius_units / self._bucket_size)))
+        distances = self._metres(lat, x, y, points)
+        inside = distances <= radius
+        order = np.argsort(distances[inside], kind='stable')
+        return [(self.names[i], float(d)) for i, d in zip(points[inside][order], distances[inside][order])]
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[str, float]]:
+        """The k closest locations as (name, distance in metres), nearest first."""
+        k = min(k, len(self.names))
+        if k == 0:
+            return []
+        x, y = (float(v) for v in web_mercator(lat, lon))
+        reach = 1
+        while True:
+            points = self._candidates(x, y, reach)
+            covers_all = reach >= self._buckets
+            if len(points) >= k or covers_all:
+                distances = self._metres(lat, x, y, points)
+                order = np.argsort(distances, kind='stable')[:k]
+                # Buckets beyond the searched ring are at least reach buckets away
+                safe = (reach - 1) * self._bucket_size * EARTH_CIRCUMFERENCE * math.cos(math.radians(lat))
+                if covers_all or distances[order[-1]] <= safe:
+                    return [(self.names[points[i]], float(distances[i])) for i in order]
+            reach *= 2
+
+
+def flood_fill(open_cells: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """Cells of a 3D open mask connected over MOVES to the (n, 3) seed cells, by a
+    frontier flood fill. Seeds on closed cells are ignored."""
+    padded = np.zeros(tuple(n + 2 for n in open_cells.shape), dtype=bool)
+    padded[1:-1, 1:-1, 1:-1] = open_cells
+    # The closed border keeps every neighbour index inside the padded array
+    flat_open = padded.ravel()
+    strides = np.array(padded.strides) // padded.itemsize
+    offsets = np.array(MOVES) @ strides
+    visited = np.zeros(flat_open.size, dtype=bool)
+    frontier = np.unique(np.ravel_multi_index(tuple(np.asarray(seeds).reshape(-1, 3).T + 1), padded.shape))
+    frontier = frontier[flat_open[frontier]]
+    visited[frontier] = True
+    while len(frontier):
+        neighbours = (frontier[:, None] + offsets).ravel()
+        neighbours = np.unique(neighbours[flat_open[neighbours] & ~visited[neighbours]])
+        visited[neighbours] = True
+        frontier = neighbours
+    return visited.reshape(padded.shape)[1:-1, 1:-1, 1:-1]
+
+
+def reachable_mask(grid, start: Tuple[int, int, int]) -> np.ndarray:
+    """Cells the solvers can reach from start on a dense grid."""
+    return flood_fill(~grid.blocked_mask(), np.array([start]))
+
+
+def nearest_cell(mask: np.ndarray, row: int, col: int) -> Optional[Tuple[int, int]]:
+    """Closest True cell of a 2D mask to (row, col), searching windows that double in size."""
+    rows, cols = mask.shape
+    row, col = min(max(int(row), 0), rows - 1), min(max(int(col), 0), cols - 1)
+    radius = 1
+    while True:
+        r0, r1 = max(row - radius, 0), min(row + radius + 1, rows)
+        c0, c1 = max(col - radius, 0), min(col + radius + 1, cols)
+        found_r, found_c = np.nonzero(mask[r0:r1, c0:c1])
+        whole_grid = r0 == 0 and c0 == 0 and r1 == rows and c1 == cols
+        if len(found_r):
+            distances = (found_r + r0 - row) ** 2 + (found_c + c0 - col) ** 2
+            best = distances.argmin()
+            # Any closer cell would lie inside the window already searched
+            if distances[best] <= radius * radius or whole_grid:
+                return int(found_r[best] + r0), int(found_c[best] + c0)
+        elif whole_grid:
+            return None
+        radius *= 2
+
+
+def snap_route(grid, start: Tuple[int, int], goal: Tuple[int, int], z: int = 0
+               ) -> Optional[Tuple[Tuple[int, int, int], Tuple[int, int, int]]]:
+    """Move (row, col) endpoints onto level z: start to the nearest open cell, goal to
+    the nearest cell reachable from there. None if the level has no open cell."""
+    blocked = grid.blocked_mask((z, 0, 0, z + 1, grid.rows, grid.cols))[0]
+    start_cell = nearest_cell(~blocked, *start)
+    if start_cell is None:
+        return None
+    reachable = grid.reachable_mask((z,) + start_cell)[z]
+    goal_cell = nearest_cell(reachable, *goal)
+    return (z,) + start_cell, (z,) + goal_cell
@@ -0,0 +1,92 @@
+import threading
+from typing import Optional
+from .map_loader import OSMMapLoader
+
+
+class MapLoadJob:
+    """Handle for one background map load. surface is usable as soon as the first
+    progress report arrives and fills in tile by tile."""
+
+    def __init__(self, kind: str, start_location: Optional[str] = None, dest_location: Optional[str] = None):
+        self.kind = kind
+        self.start_location = start_location
+        self.dest_location = dest_location
+        self.surface = None
+        self.tiles_done = 0
+        self.tiles_total = 0
+        self.result = None
+        self.terrain = None
+        self.error = None
+        self._cancel_event = threading.Event()
+        self._finished_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished_event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished_event.wait(timeout)
+
+    def _progress(self, done: int, total: int, surface):
+        self.surface = surface
+        self.tiles_total = total
+        self.tiles_done = done
+
+
+class MapLoadWorker:
+    """Loads OSM maps on a daemon thread; submitting cancels the load in flight."""
+
+    def __init__(self):
+        self.current_job = None
+
+    def submit_dubai_map(self, rows: int = 35, cols: int = 35) -> MapLoadJob:
+        return self.submit_bbox_map(OSMMapLoader.DUBAI_BBOX, rows, cols)
+
+    def submit_bbox_map(self, bbox, rows: int = 35, cols: int = 35) -> MapLoadJob:
+        job = MapLoadJob('map')
+
+        def load():
+            surface = OSMMapLoader.load_bbox_map(bbox, rows, cols, job._progress, lambda: job.cancelled)
+            if surface is not None:
+                job.terrain = OSMMapLoader.rasterize_bbox_map(bbox, rows, cols, lambda: job.cancelled)
+            return surface
+        return self._start(job, load)
+
+    def submit_locations_map(self, start_location: str, dest_location: str, grid_size: int = 35) -> MapLoadJob:
+        job = MapLoadJob('locations', start_location, dest_location)
+
+        def load():
+            result = OSMMapLoader.load_map_for_locations(
+                start_location, dest_location, grid_size, job._progress, lambda: job.cancelled)
+            if result[0] is not None:
+                job.terrain = OSMMapLoader.rasterize_locations_map(
+                    start_location, dest_location, grid_size, lambda: job.cancelled)
+            return result
+        return self._start(job, load)
+
+    def cancel(self):
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
+
+    def _start(self, job: MapLoadJob, load) -> MapLoadJob:
+        self.cancel()
+        self.current_job = job
+        thread = threading.Thread(target=self._run, args=(job, load), daemon=True)
+        thread.start()
+        return job
+
+    def _run(self, job: MapLoadJob, load):
+        try:
+            job.result = load()
+        except Exception as e:
+            job.error = e
+        finally:
+            job._finished_event.set()
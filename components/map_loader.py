@@ -1,10 +1,10 @@
 
-import pygame
 import math
-import time
-import requests
-from io import BytesIO
-from PIL import Image, ImageEnhance
+import numpy as np
+from .tile_fetcher import TileFetcher, TILE_SIZE
+from .tile_mosaic import TileMosaic
+from .map_rasterizer import MapRasterizer
+from .location_registry import LocationRegistry, GridProjection, web_mercator, snap_route
 
 class OSMMapLoader:    
     DUBAI_LOCATIONS = {
@@ -14,199 +14,197 @@ class OSMMapLoader:
         'Dubai Creek': (25.2631, 55.3297),
         'Mall of Emirates': (25.1183, 55.2007)
     }
+    # Name -> (lat, lon) offered for routes; a locations file or OSM extract replaces it
+    locations = LocationRegistry.from_dict(DUBAI_LOCATIONS)
+    # The dropdowns list this many; the rest are reachable through the registry's queries
+    MENU_LOCATIONS = 12
+    
+    # (min_lat, min_lon, max_lat, max_lon) of the default city view
+    DUBAI_BBOX = (25.1117, 55.1802, 25.2981, 55.3862)
+    # Largest on-screen cell at full camera zoom; fetching more detail would not show
+    MIN_PIXELS_PER_CELL = 32
+    MAX_ZOOM = 19
+    ROUTE_MARGIN = 0.25
+    MIN_ROUTE_MARGIN = 0.005
+    
+    # Shared so every map load reuses the pooled connections and finished mosaics
+    tile_fetcher = None
+    mosaic = None
+    rasterizer = None
     
     @staticmethod
-    def get_location_names():
-        return list(OSMMapLoader.DUBAI_LOCATIONS.keys())
+    def get_tile_fetcher():
+        if OSMMapLoader.tile_fetcher is None:
+            OSMMapLoader.tile_fetcher = TileFetcher()
+        return OSMMapLoader.tile_fetcher
     
     @staticmethod
-    def load_map_for_locations(start_location, end_location, grid_size=35):
-        if start_location not in OSMMapLoader.DUBAI_LOCATIONS or end_location not in OSMMapLoader.DUBAI_LOCATIONS:
-            print(f"✗ Invalid locations: {start_location}, {end_location}")
-            return None, None, None
-        
-        start_lat, start_lon = OSMMapLoader.DUBAI_LOCATIONS[start_location]
-        end_lat, end_lon = OSMMapLoader.DUBAI_LOCATIONS[end_location]
-        
-        # center point between the two locations
-        center_lat = (start_lat + end_lat) / 2
-        center_lon = (start_lon + end_lon) / 2
+    def configure_tiles(**options):
+        """Replace the shared fetcher, e.g. url_template for a local stand-in server,
+        offline=True to serve only cached tiles or cache_dir=None to skip the disk cache."""
+        if OSMMapLoader.tile_fetcher is not None:
+            OSMMapLoader.tile_fetcher.close()
+        OSMMapLoader.tile_fetcher = TileFetcher(**options)
+        OSMMapLoader.mosaic = None
+        OSMMapLoader.rasterizer = None
+    
+    @staticmethod
+    def get_mosaic():
+        if OSMMapLoader.mosaic is None:
+            OSMMapLoader.mosaic = TileMosaic(OSMMapLoader.get_tile_fetcher())
+        return OSMMapLoader.mosaic
+    
+    @staticmethod
+    def get_rasterizer():
+        if OSMMapLoader.rasterizer is None:
+            OSMMapLoader.rasterizer = MapRasterizer(OSMMapLoader.get_mosaic())
+        return OSMMapLoader.rasterizer
+    
+    @staticmethod
+    def _global_pixel(lat, lon, zoom):
+        """Web Mercator pixel coordinates of a point on the whole map at a zoom level."""
+        x, y = web_mercator(lat, lon)
+        n = 2.0 ** zoom * TILE_SIZE
+        return float(x) * n, float(y) * n
+    
+    @staticmethod
+    def bbox_view(bbox, rows, cols, min_pixels_per_cell=None, max_zoom=None):
+        """(zoom, left, top, width, height) crop showing bbox on a rows x cols grid.
         
-        # distance to determine appropriate zoom level
-        lat_diff = abs(end_lat - start_lat)
-        lon_diff = abs(end_lon - start_lon)
-        max_diff = max(lat_diff, lon_diff)
+        bbox is (min_lat, min_lon, max_lat, max_lon). It is widened around its centre to
+        the grid's aspect so cells stay square, and the zoom is the lowest that still
+        gives min_pixels_per_cell, so no more tiles are fetched than the grid can show.
+        """
+        min_pixels_per_cell = min_pixels_per_cell or OSMMapLoader.MIN_PIXELS_PER_CELL
+        max_zoom = OSMMapLoader.MAX_ZOOM if max_zoom is None else max_zoom
+        min_lat, min_lon, max_lat, max_lon = bbox
+        x0, y0 = OSMMapLoader._global_pixel(max_lat, min_lon, 0)
+        x1, y1 = OSMMapLoader._global_pixel(min_lat, max_lon, 0)
+        cell = max((x1 - x0) / cols, (y1 - y0) / rows, 1e-9)
         
-        # Adjust zoom based on distance
-        if max_diff < 0.01:
-            zoom = 15
-        elif max_diff < 0.05:
-            zoom = 14
-        else:
-            zoom = 13
+        zoom = min(max(math.ceil(math.log2(min_pixels_per_cell / cell)), 0), max_zoom)
+        scale = 2 ** zoom
+        width, height = math.ceil(cell * cols * scale), math.ceil(cell * rows * scale)
+        left = int(round((x0 + x1) / 2 * scale - width / 2))
+        top = int(round((y0 + y1) / 2 * scale - height / 2))
+        return zoom, left, top, width, height
+    
+    @staticmethod
+    def view_cell(view, lat, lon, rows, cols):
+        """Grid (row, col) of a point on a bbox_view crop, clamped onto the grid."""
+        row, col = GridProjection.from_view(view, rows, cols, TILE_SIZE).cells(lat, lon)
+        return int(row), int(col)
+    
+    @staticmethod
+    def _route_bbox(start_location, end_location):
+        """Box around both locations with a margin, so neither sits on the map edge."""
+        start_lat, start_lon = OSMMapLoader.locations[start_location]
+        end_lat, end_lon = OSMMapLoader.locations[end_location]
+        margin = max(abs(end_lat - start_lat), abs(end_lon - start_lon)) * OSMMapLoader.ROUTE_MARGIN
+        margin = max(margin, OSMMapLoader.MIN_ROUTE_MARGIN)
+        return (min(start_lat, end_lat) - margin, min(start_lon, end_lon) - margin,
+                max(start_lat, end_lat) + margin, max(start_lon, end_lon) + margin)
+    
+    @staticmethod
+    def set_locations(locations):
+        """Replace the location table with a LocationRegistry or a {name: (lat, lon)} dict."""
+        if not isinstance(locations, LocationRegistry):
+            locations = LocationRegistry.from_dict(locations)
+        OSMMapLoader.locations = locations
+    
+    @staticmethod
+    def load_locations(path):
+        OSMMapLoader.locations = LocationRegistry.load(path)
+        print(f"✓ Loaded {len(OSMMapLoader.locations)} locations from {path}")
+    
+    @staticmethod
+    def get_location_names(limit=None):
+        limit = OSMMapLoader.MENU_LOCATIONS if limit is None else limit
+        return OSMMapLoader.locations.keys()[:limit]
+    
+    @staticmethod
+    def load_map_for_locations(start_location, end_location, grid_size=35, progress=None, cancelled=None):
+        if start_location not in OSMMapLoader.locations or end_location not in OSMMapLoader.locations:
+            print(f"✗ Invalid locations: {start_location}, {end_location}")
+            return None, None, None
         
+        view = OSMMapLoader.bbox_view(OSMMapLoader._route_bbox(start_location, end_location), grid_size, grid_size)
         print(f"   Loading map: {start_location} → {end_location}")
-        print(f"   Zoom level: {zoom}, Center: ({center_lat:.4f}, {center_lon:.4f})")
+        print(f"   Zoom level: {view[0]}, {view[3]}x{view[4]} px")
         
         try:
-            # Convert center coordinates to tile numbers
-            n = 2.0 ** zoom
-            center_xtile = int((center_lon + 180.0) / 360.0 * n)
-            center_ytile = int((1.0 - math.log(math.tan(math.radians(center_lat)) + (1 / math.cos(math.radians(center_lat)))) / math.pi) / 2.0 * n)
-            
-            # Fetch a 6x6 grid of tiles
-            tiles = []
             print("   Downloading map tiles...", end="", flush=True)
-            for dy in [-3, -2, -1, 0, 1, 2]:
-                row_tiles = []
-                for dx in [-3, -2, -1, 0, 1, 2]:
-                    tile_url = f"https://tile.openstreetmap.org/{zoom}/{center_xtile + dx}/{center_ytile + dy}.png"
-                    try:
-                        response = requests.get(tile_url, timeout=10, headers={'User-Agent': 'PathfindingVisualizer/1.0'})
-                        if response.status_code == 200:
-                            tile_img = Image.open(BytesIO(response.content))
-                            row_tiles.append(tile_img)
-                        else:
-                            row_tiles.append(Image.new('RGB', (256, 256), (220, 220, 220)))
-                    except:
-                        row_tiles.append(Image.new('RGB', (256, 256), (220, 220, 220)))
-                    time.sleep(0.05)
-                tiles.append(row_tiles)
+            osm_surface = OSMMapLoader.get_mosaic().build(*view, progress=progress, cancelled=cancelled)
+            if osm_surface is None:
+                print(" cancelled")
+                return None, None, None
             print(" ✓")
             
-            full_width = 256 * 6
-            full_height = 256 * 6
-            combined_image = Image.new('RGB', (full_width, full_height))
-            
-            for row_idx, row in enumerate(tiles):
-                for col_idx, tile in enumerate(row):
-                    combined_image.paste(tile, (col_idx * 256, row_idx * 256))
-            
-            # pixel positions of start and end on the full image
-            def lat_lon_to_pixel(lat, lon, zoom, ref_tile_x, ref_tile_y):
-                n = 2.0 ** zoom
-                x_tile = (lon + 180.0) / 360.0 * n
-                y_tile = (1.0 - math.log(math.tan(math.radians(lat)) + (1 / math.cos(math.radians(lat)))) / math.pi) / 2.0 * n
-
-                rel_x = (x_tile - (ref_tile_x - 3)) * 256
-                rel_y = (y_tile - (ref_tile_y - 3)) * 256
-                return int(rel_x), int(rel_y)
-            
-            start_px, start_py = lat_lon_to_pixel(start_lat, start_lon, zoom, center_xtile, center_ytile)
-            end_px, end_py = lat_lon_to_pixel(end_lat, end_lon, zoom, center_xtile, center_ytile)
-            
-            # Cropping to center portion
-            crop_size = 1200
-            left = (full_width - crop_size) // 2
-            top = (full_height - crop_size) // 2
-            combined_image = combined_image.crop((left, top, left + crop_size, top + crop_size))
-            
-            # Adjusting pixel positions after crop
-            start_px -= left
-            start_py -= top
-            end_px -= left
-            end_py -= top
-            
-            # Applying enhancements
-            enhancer = ImageEnhance.Contrast(combined_image)
-            combined_image = enhancer.enhance(1.4)
-            enhancer = ImageEnhance.Sharpness(combined_image)
-            combined_image = enhancer.enhance(2.0)
-            
-            # Converting to pygame surface
-            mode = combined_image.mode
-            size = combined_image.size
-            data = combined_image.tobytes()
-            osm_surface = pygame.image.fromstring(data, size, mode)
-            
-            # Converting pixel positions to grid positions
-            start_grid_col = int((start_px / crop_size) * grid_size)
-            start_grid_row = int((start_py / crop_size) * grid_size)
-            end_grid_col = int((end_px / crop_size) * grid_size)
-            end_grid_row = int((end_py / crop_size) * grid_size)
-            
-            start_grid_col = max(0, min(grid_size - 1, start_grid_col))
-            start_grid_row = max(0, min(grid_size - 1, start_grid_row))
-            end_grid_col = max(0, min(grid_size - 1, end_grid_col))
-            end_grid_row = max(0, min(grid_size - 1, end_grid_row))
+            start_row, start_col = OSMMapLoader.view_cell(view, *OSMMapLoader.locations[start_location], grid_size, grid_size)
+            end_row, end_col = OSMMapLoader.view_cell(view, *OSMMapLoader.locations[end_location], grid_size, grid_size)
             
             print(f"✓ Map loaded successfully!")
-            print(f"   {start_location}: grid position ({start_grid_row}, {start_grid_col})")
-            print(f"   {end_location}: grid position ({end_grid_row}, {end_grid_col})")
+            print(f"   {start_location}: grid position ({start_row}, {start_col})")
+            print(f"   {end_location}: grid position ({end_row}, {end_col})")
             
-            return osm_surface, (0, start_grid_row, start_grid_col), (0, end_grid_row, end_grid_col)
+            return osm_surface, (0, start_row, start_col), (0, end_row, end_col)
                 
         except Exception as e:
             print(f"✗ Error loading map: {e}")
             return None, None, None
     
     @staticmethod
-    def load_dubai_map():
-        lat, lon = 25.170174, 55.287915
-        zoom = 13 
-        
-        print(f"Loading Dubai map at coordinates: ({lat}, {lon}), zoom: {zoom}")
+    def load_bbox_map(bbox, rows=35, cols=35, progress=None, cancelled=None):
+        """Map surface for an arbitrary (min_lat, min_lon, max_lat, max_lon) box."""
+        view = OSMMapLoader.bbox_view(bbox, rows, cols)
+        zoom, _, _, width, height = view
+        print(f"Loading map for {bbox} at zoom {zoom} ({width}x{height} px)")
         
         try:
-            print(f"Fetching map tiles from OpenStreetMap...")
-            
-            # Converting coordinates to tile numbers
-            n = 2.0 ** zoom
-            xtile = int((lon + 180.0) / 360.0 * n)
-            ytile = int((1.0 - math.log(math.tan(math.radians(lat)) + (1 / math.cos(math.radians(lat)))) / math.pi) / 2.0 * n)
-            
-            print(f"Center tile: ({xtile}, {ytile}) at zoom {zoom}")
-            
-            # Fetching a 6x6 grid of tiles for ultra-high resolution
-            tiles = []
-            for dy in [-3, -2, -1, 0, 1, 2]:
-                row_tiles = []
-                for dx in [-3, -2, -1, 0, 1, 2]:
-                    tile_url = f"https://tile.openstreetmap.org/{zoom}/{xtile + dx}/{ytile + dy}.png"
-                    try:
-                        response = requests.get(tile_url, timeout=10, headers={'User-Agent': 'PathfindingVisualizer/1.0'})
-                        if response.status_code == 200:
-                            tile_img = Image.open(BytesIO(response.content))
-                            row_tiles.append(tile_img)
-                        else:
-                            row_tiles.append(Image.new('RGB', (256, 256), (220, 220, 220)))
-                    except:
-                        row_tiles.append(Image.new('RGB', (256, 256), (220, 220, 220)))
-                    time.sleep(0.05)  
-                tiles.append(row_tiles)
-            
-            full_width = 256 * 6
-            full_height = 256 * 6
-            combined_image = Image.new('RGB', (full_width, full_height))
-            
-            for row_idx, row in enumerate(tiles):
-                for col_idx, tile in enumerate(row):
-                    combined_image.paste(tile, (col_idx * 256, row_idx * 256))
-
-            crop_size = 1200  
-            left = (full_width - crop_size) // 2
-            top = (full_height - crop_size) // 2
-            combined_image = combined_image.crop((left, top, left + crop_size, top + crop_size))
-            
-            enhancer = ImageEnhance.Contrast(combined_image)
-            combined_image = enhancer.enhance(1.4)
-            enhancer = ImageEnhance.Sharpness(combined_image)
-            combined_image = enhancer.enhance(2.0)
-            
-            # Converting PIL image to pygame surface
-            mode = combined_image.mode
-            size = combined_image.size
-            data = combined_image.tobytes()
-            
-            osm_surface = pygame.image.fromstring(data, size, mode)
-            print("✓ Dubai map loaded successfully!")
-            
+            osm_surface = OSMMapLoader.get_mosaic().build(*view, progress=progress, cancelled=cancelled)
+            if osm_surface is None:
+                print("✗ Map load cancelled")
+                return None
+            print("✓ Map loaded successfully!")
             return osm_surface
                 
         except Exception as e:
             print(f"✗ Error loading map: {e}")
             return None
     
+    @staticmethod
+    def load_dubai_map(progress=None, cancelled=None, rows=35, cols=35):
+        return OSMMapLoader.load_bbox_map(OSMMapLoader.DUBAI_BBOX, rows, cols, progress, cancelled)
+    
+    @staticmethod
+    def rasterize_view(view, rows, cols, cancelled=None):
+        """MapTerrain for a bbox_view crop, or None if cancelled or failed. Reuses the
+        tiles of the matching map load, so call it after one."""
+        try:
+            terrain = OSMMapLoader.get_rasterizer().rasterize(*view, rows, cols, cancelled)
+        except Exception as e:
+            print(f"✗ Error rasterizing map: {e}")
+            return None
+        if terrain is not None:
+            counts = ", ".join(f"{count} {name}" for name, count in terrain.summary().items())
+            print(f"✓ Map terrain: {counts}")
+        return terrain
+    
+    @staticmethod
+    def rasterize_bbox_map(bbox, rows=35, cols=35, cancelled=None):
+        return OSMMapLoader.rasterize_view(OSMMapLoader.bbox_view(bbox, rows, cols), rows, cols, cancelled)
+    
+    @staticmethod
+    def rasterize_dubai_map(rows, cols, cancelled=None):
+        return OSMMapLoader.rasterize_bbox_map(OSMMapLoader.DUBAI_BBOX, rows, cols, cancelled)
+    
+    @staticmethod
+    def rasterize_locations_map(start_location, end_location, grid_size=35, cancelled=None):
+        if start_location not in OSMMapLoader.locations or end_location not in OSMMapLoader.locations:
+            return None
+        bbox = OSMMapLoader._route_bbox(start_location, end_location)
+        return OSMMapLoader.rasterize_bbox_map(bbox, grid_size, grid_size, cancelled)
+    
     @staticmethod
     def create_fallback_map(grid):
         print("Creating fallback street grid...")
@@ -216,28 +214,34 @@ class OSMMapLoader:
         rows = grid.grid.shape[1]
         cols = grid.grid.shape[2]
         
-        # Horizontal streets
-        for i in range(0, rows, street_spacing):
-            for row in range(i, min(i + street_width, rows)):
-                for col in range(cols):
-                    grid.terrain_costs[0, row, col] = 0.3
-        
-        # Vertical streets
-        for i in range(0, cols, street_spacing):
-            for col in range(i, min(i + street_width, cols)):
-                for row in range(rows):
-                    grid.terrain_costs[0, row, col] = 0.3
+        # Horizontal and vertical streets as one (rows, cols) mask on the ground level
+        street_rows = (np.arange(rows) % street_spacing) < street_width
+        street_cols = (np.arange(cols) % street_spacing) < street_width
+        grid.paint_terrain_cost(street_rows[:, None] | street_cols[None, :], 0.3)
     
     @staticmethod
     def initialize_map(grid, rows, cols):
         grid.reset()
         osm_background = OSMMapLoader.load_dubai_map()
-        
+        terrain = OSMMapLoader.rasterize_dubai_map(rows, cols) if osm_background is not None else None
+        return OSMMapLoader.finish_map(grid, rows, cols, osm_background, terrain)
+    
+    @staticmethod
+    def finish_map(grid, rows, cols, osm_background, terrain=None):
+        """Grid setup once the Dubai map is in: streets and buildings from its terrain,
+        or a fallback street grid without a map."""
         if osm_background is None:
             OSMMapLoader.create_fallback_map(grid)
+        elif terrain is not None:
+            terrain.apply(grid)
         
-        grid.set_start(0, 2, 2)
-        grid.set_goal(0, rows - 3, cols - 3)
+        start, goal = (0, 2, 2), (0, rows - 3, cols - 3)
+        # Buildings from the map can cover the default corners; move onto reachable streets
+        snapped = snap_route(grid, start[1:], goal[1:])
+        if snapped is not None:
+            start, goal = snapped
+        grid.set_start(*start)
+        grid.set_goal(*goal)
         
         print("✓ Map reloaded successfully!")
         return osm_background
@@ -250,9 +254,21 @@ class OSMMapLoader:
         
         grid.reset()
         vehicle.reset()       
-        osm_map, start_pos, end_pos = OSMMapLoader.load_map_for_locations(start_loc, dest_loc, rows)
-        
+        result = OSMMapLoader.load_map_for_locations(start_loc, dest_loc, rows)
+        terrain = OSMMapLoader.rasterize_locations_map(start_loc, dest_loc, rows) if result[0] else None
+        return OSMMapLoader.finish_locations_map(grid, vehicle, start_loc, dest_loc, result, terrain)
+    
+    @staticmethod
+    def finish_locations_map(grid, vehicle, start_loc, dest_loc, result, terrain=None):
+        """Apply the route's terrain and place start/goal from a load_map_for_locations result."""
+        osm_map, start_pos, end_pos = result
         if osm_map and start_pos and end_pos:
+            if terrain is not None:
+                terrain.apply(grid)
+                # Landmarks often sit inside a building footprint; move onto a reachable street
+                snapped = snap_route(grid, start_pos[1:], end_pos[1:], start_pos[0])
+                if snapped is not None:
+                    start_pos, end_pos = snapped
             start_z, start_row, start_col = start_pos
             end_z, end_row, end_col = end_pos
             
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import numpy as np
+
+# Map classes, in the order of the last axis of MapTerrain.fractions
+LAND, ROAD, BUILDING, WATER, PARK = range(5)
+CLASS_NAMES = ('land', 'road', 'building', 'water', 'park')
+
+# Representative OSM Carto colours (un-enhanced tiles) for each class
+PALETTE = (
+    (LAND, (242, 239, 233)),       # background land
+    (LAND, (220, 220, 220)),       # missing-tile placeholder
+    (LAND, (224, 223, 223)),       # residential
+    (ROAD, (255, 255, 255)),       # residential / service roads
+    (ROAD, (247, 250, 191)),       # secondary
+    (ROAD, (252, 214, 164)),       # primary
+    (ROAD, (249, 178, 156)),       # trunk
+    (ROAD, (232, 146, 162)),       # motorway
+    (ROAD, (221, 221, 232)),       # pedestrian
+    (BUILDING, (217, 208, 201)),   # building fill
+    (BUILDING, (196, 182, 171)),   # building outline
+    (WATER, (170, 211, 223)),      # water
+    (PARK, (200, 250, 204)),       # park
+    (PARK, (173, 209, 158)),       # forest
+    (PARK, (205, 235, 176)),       # grass
+)
+MAX_COLOR_DISTANCE = 24
+
+CLASS_COSTS = np.array([1.0, 0.3, 1.0, 10.0, 1.2])
+ROAD_MIN_FRACTION = 0.15
+BUILDING_MIN_FRACTION = 0.5
+BUILDING_LEVELS = 2
+RASTER_CACHE_SIZE = 8
+
+
+def classify_pixels(pixels: np.ndarray) -> np.ndarray:
+    """(h, w) class ids for an (h, w, 3) RGB array: nearest palette colour, or LAND
+    when nothing is within MAX_COLOR_DISTANCE (labels, icons, anti-aliasing)."""
+    # Map tiles use few distinct colours, so classify each colour once
+    packed = (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | pixels[..., 2]
+    unique, inverse = np.unique(packed, return_inverse=True)
+    rgb = np.stack([unique >> 16, (unique >> 8) & 0xFF, unique & 0xFF], axis=-1).astype(np.int32)
+
+    colors = np.array([color for _, color in PALETTE], dtype=np.int32)
+    classes = np.array([cls for cls, _ in PALETTE], dtype=np.uint8)
+    distance = ((rgb[:, None, :] - colors[None, :, :]) ** 2).sum(axis=-1)
+    nearest = distance.argmin(axis=-1)
+    labels = classes[nearest]
+    labels[distance[np.arange(len(unique)), nearest] > MAX_COLOR_DISTANCE ** 2] = LAND
+    return labels[inverse].reshape(pixels.shape[:2])
+
+
+def class_fractions(labels: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """(rows, cols, classes) share of each class among the pixels under every cell."""
+    height, width = labels.shape
+    row_of_pixel = np.minimum(np.arange(height) * rows // height, rows - 1)
+    col_of_pixel = np.minimum(np.arange(width) * cols // width, cols - 1)
+    cell = (row_of_pixel[:, None] * cols + col_of_pixel[None, :]) * len(CLASS_NAMES) + labels
+    counts = np.bincount(cell.ravel(), minlength=rows * cols * len(CLASS_NAMES))
+    counts = counts.reshape(rows, cols, len(CLASS_NAMES)).astype(float)
+    return counts / counts.sum(axis=-1, keepdims=True)
+
+
+class MapTerrain:
+    """Per-cell terrain derived from map data: costs and building footprints.
+
+    heights optionally gives building heights in grid levels per cell; without it every
+    building is BUILDING_LEVELS tall.
+    """
+
+    def __init__(self, fractions: np.ndarray, heights: Optional[np.ndarray] = None):
+        self.fractions = fractions
+        road = fractions[..., ROAD] >= ROAD_MIN_FRACTION
+        # Cost is the class mix, except that a visible strip of road makes the cell a road
+        self.costs = np.where(road, CLASS_COSTS[ROAD], fractions @ CLASS_COSTS)
+        self.buildings = (fractions[..., BUILDING] >= BUILDING_MIN_FRACTION) & ~road
+        self.heights = heights
+
+    def summary(self) -> Dict[str, int]:
+        dominant = self.fractions.argmax(axis=-1)
+        return {name: int(np.count_nonzero(dominant == cls)) for cls, name in enumerate(CLASS_NAMES)}
+
+    def apply(self, grid, building_levels: int = BUILDING_LEVELS):
+        """Paint ground-level costs and extrude building footprints onto the grid."""
+        rows, cols = self.costs.shape
+        if (rows, cols) != (grid.rows, grid.cols):
+            raise ValueError(f"Terrain is {rows}x{cols}, grid is {grid.rows}x{grid.cols}")
+        grid.paint_terrain_cost(np.ones((rows, cols), dtype=bool), self.costs, z=0)
+        heights = building_levels if self.heights is None else self.heights
+        grid.extrude_columns(self.buildings * np.minimum(heights, grid.height))
+
+
+class MapRasterizer:
+    """Classifies map crops into MapTerrain, cached per (server, zoom, crop, grid size)."""
+
+    def __init__(self, mosaic, cache_size: int = RASTER_CACHE_SIZE):
+        self.mosaic = mosaic
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rasterize(self, zoom: int, left: int, top: int, width: int, height: int,
+                  rows: int, cols: int, cancelled: Optional[Callable[[], bool]] = None) -> Optional[MapTerrain]:
+        """Terrain for a mosaic crop on a rows x cols grid, or None if cancelled."""
+        key = (self.mosaic.fetcher.url_template, zoom, left, top, width, height, rows, cols)
+        with self._lock:
+            terrain = self._cache.get(key)
+            if terrain is not None:
+                self._cache.move_to_end(key)
+                return terrain
+
+        # Raw colours: the display enhancement would shift them off the palette
+        pixels = self.mosaic.build_array(zoom, left, top, width, height, contrast=1.0, sharpness=1.0,
+                                          cancelled=cancelled)
+        if pixels is None:
+            return None
+        terrain = MapTerrain(class_fractions(classify_pixels(pixels), rows, cols))
+        with self._lock:
+            self._cache[key] = terrain
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return terrain
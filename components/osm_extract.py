@@ -0,0 +1,338 @@
+import bz2
+import gzip
+import hashlib
+import json
+import math
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+from .map_rasterizer import MapTerrain, CLASS_NAMES, LAND, ROAD, BUILDING, WATER, PARK, BUILDING_LEVELS
+from .location_registry import GridProjection
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pathfinding_visualizer', 'osm')
+# Bump when rasterization changes so stale cached grids are rebuilt
+EXTRACT_CACHE_VERSION = 1
+NODE_BATCH = 65536
+MAX_LOCATIONS = 10000
+LANDMARK_KEYS = ('place', 'tourism', 'amenity', 'shop', 'leisure', 'historic', 'building')
+STOREYS_PER_LEVEL = 3
+STOREY_HEIGHT = 3.0
+
+WATER_TAGS = {('natural', 'water'), ('waterway', 'riverbank'), ('landuse', 'reservoir'), ('landuse', 'basin')}
+PARK_TAGS = {('leisure', 'park'), ('leisure', 'garden'), ('landuse', 'grass'), ('landuse', 'forest'),
+             ('landuse', 'meadow'), ('natural', 'wood')}
+
+
+def _open(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _iter_elements(path: str, tags: Tuple[str, ...]) -> Iterator[ET.Element]:
+    """Top-level elements with the given tags, each discarded once the caller is done
+    with it so memory stays flat however large the file is."""
+    with _open(path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end' or elem.tag not in ('bounds', 'node', 'way', 'relation'):
+                continue
+            if elem.tag in tags:
+                yield elem
+            elem.clear()
+            root.clear()
+
+
+def _tags(elem: ET.Element) -> Dict[str, str]:
+    return {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+
+
+def _way_class(tags: Dict[str, str]) -> Optional[int]:
+    if 'highway' in tags:
+        return ROAD
+    if 'building' in tags:
+        return BUILDING
+    pairs = set(tags.items())
+    if pairs & WATER_TAGS:
+        return WATER
+    if pairs & PARK_TAGS:
+        return PARK
+    return None
+
+
+def _building_levels(tags: Dict[str, str]) -> int:
+    """Height in grid levels from building:levels or height (metres); 0 if unknown."""
+    try:
+        if 'building:levels' in tags:
+            storeys = float(tags['building:levels'])
+        elif 'height' in tags:
+            storeys = float(tags['height'].split()[0]) / STOREY_HEIGHT
+        else:
+            return 0
+    except ValueError:
+        return 0
+    return max(1, math.ceil(storeys / STOREYS_PER_LEVEL))
+
+
+class ExtractMap:
+    """Bounds and named places of an OSM extract, and their mapping onto a grid.
+
+    bounds is (min_lat, min_lon, max_lat, max_lon); the grid spans it in Web Mercator,
+    like the tile map, with row 0 at the northern edge.
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float], locations: Dict[str, Tuple[float, float]]):
+        self.bounds = tuple(bounds)
+        self.locations = dict(locations)
+
+    def projection(self, rows: int, cols: int) -> GridProjection:
+        return GridProjection.from_bounds(self.bounds, rows, cols)
+
+    def project(self, lat, lon, rows: int, cols: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Fractional (row, col) grid coordinates of lat/lon arrays."""
+        return self.projection(rows, cols).project(lat, lon)
+
+
+class OSMExtract(ExtractMap):
+    """Road, building, water and park ways of an extract as flat arrays.
+
+    Way i has class way_classes[i] and vertices way_lat/way_lon[way_offsets[i]:way_offsets[i + 1]];
+    way_levels[i] is its building height in grid levels (0 when untagged).
+    """
+
+    def __init__(self, bounds, locations, way_classes, way_levels, way_offsets, way_lat, way_lon):
+        super().__init__(bounds, locations)
+        self.way_classes = way_classes
+        self.way_levels = way_levels
+        self.way_offsets = way_offsets
+        self.way_lat = way_lat
+        self.way_lon = way_lon
+
+    def __len__(self) -> int:
+        return len(self.way_classes)
+
+    def terrain(self, rows: int, cols: int) -> MapTerrain:
+        """Rasterize onto a rows x cols grid: areas are filled, roads traced over them."""
+        row, col = self.project(self.way_lat, self.way_lon, rows, cols)
+        classes = np.full((rows, cols), LAND, dtype=np.uint8)
+        heights = np.zeros((rows, cols), dtype=np.int64)
+
+        for cls in (PARK, WATER, BUILDING):
+            cell_row, cell_col, way = _fill_polygons(row, col, self.way_offsets, self.way_classes == cls, rows, cols)
+            classes[cell_row, cell_col] = cls
+            if cls == BUILDING:
+                levels = np.where(self.way_levels[way] > 0, self.way_levels[way], BUILDING_LEVELS)
+                np.maximum.at(heights, (cell_row, cell_col), levels)
+
+        classes[_trace_ways(row, col, self.way_offsets, self.way_classes == ROAD, rows, cols)] = ROAD
+        fractions = np.eye(len(CLASS_NAMES))[classes]
+        return MapTerrain(fractions, heights)
+
+
+def _fill_polygons(row: np.ndarray, col: np.ndarray, offsets: np.ndarray, selected: np.ndarray,
+                   rows: int, cols: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(row, col, way) of the cells whose centre lies inside each selected ring.
+
+    One even-odd scanline over every edge of every ring at once: each edge yields a
+    crossing per cell-centre row it spans, crossings are sorted per (way, row) and the
+    cells between consecutive pairs are filled. Rings smaller than a cell get the cell
+    under their centroid instead.
+    """
+    ways = np.flatnonzero(selected)
+    starts, ends = offsets[:-1][ways], offsets[1:][ways]
+    lengths = ends - starts
+    vertex_way = np.repeat(np.arange(len(ways)), lengths)
+    v0 = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    v1 = v0 + 1
+    v1[np.cumsum(lengths) - 1] = starts  # close each ring
+    y0, y1, x0, x1 = row[v0], row[v1], col[v0], col[v1]
+
+    # Edge crosses the centre line r + 0.5 when low <= r + 0.5 < high
+    first = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), 0, rows).astype(np.intp)
+    last = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), 0, rows).astype(np.intp)
+    spans = last - first
+    edge = np.repeat(np.arange(len(v0)), spans)
+    r = np.repeat(first, spans) + np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    y = r + 0.5
+    x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+    way = vertex_way[edge]
+    order = np.lexsort((x, r, way))
+    r, x, way = r[order], x[order], way[order]
+
+    # Closed rings cross every centre line an even number of times
+    left = np.clip(np.ceil(x[0::2] - 0.5), 0, cols).astype(np.intp)
+    right = np.clip(np.ceil(x[1::2] - 0.5), 0, cols).astype(np.intp)
+    widths = np.maximum(right - left, 0)
+    fill_r = np.repeat(r[0::2], widths)
+    fill_c = np.repeat(left, widths) + np.arange(widths.sum()) - np.repeat(np.cumsum(widths) - widths, widths)
+    fill_way = np.repeat(way[0::2], widths)
+
+    empty = np.ones(len(ways), dtype=bool)
+    empty[fill_way] = False
+    centre_r = (np.add.reduceat(row[v0], np.cumsum(lengths) - lengths) / lengths)[empty] if len(ways) else row[:0]
+    centre_c = (np.add.reduceat(col[v0], np.cumsum(lengths) - lengths) / lengths)[empty] if len(ways) else col[:0]
+    inside = (centre_r >= 0) & (centre_r < rows) & (centre_c >= 0) & (centre_c < cols)
+    return (np.concatenate([fill_r, centre_r[inside].astype(np.intp)]),
+            np.concatenate([fill_c, centre_c[inside].astype(np.intp)]),
+            ways[np.concatenate([fill_way, np.flatnonzero(empty)[inside]])])
+
+
+def _trace_ways(row: np.ndarray, col: np.ndarray, offsets: np.ndarray, selected: np.ndarray,
+                rows: int, cols: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Cells touched by the polylines of the selected ways, sampled at half-cell steps."""
+    starts = offsets[:-1][selected]
+    ends = offsets[1:][selected]
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    # Segment k runs from vertex k to k + 1 within one way
+    lengths = ends - starts - 1
+    seg = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    d_row, d_col = row[seg + 1] - row[seg], col[seg + 1] - col[seg]
+    samples = np.ceil(2 * np.maximum(np.abs(d_row), np.abs(d_col))).astype(np.intp) + 1
+    which = np.repeat(np.arange(len(seg)), samples)
+    t = (np.arange(samples.sum()) - np.repeat(np.cumsum(samples) - samples, samples)) / np.repeat(
+        np.maximum(samples - 1, 1), samples)
+    r = np.floor(row[seg][which] + t * d_row[which]).astype(np.intp)
+    c = np.floor(col[seg][which] + t * d_col[which]).astype(np.intp)
+    keep = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+    return r[keep], c[keep]
+
+
+def read_osm_extract(path: str, bbox: Optional[Tuple[float, float, float, float]] = None,
+                     max_locations: int = MAX_LOCATIONS) -> OSMExtract:
+    """Stream an .osm XML extract (optionally .gz/.bz2) in two passes.
+
+    The first pass keeps the tags and node references of road, building, water and
+    park ways; the second keeps coordinates only for the nodes those ways use, plus up
+    to max_locations named landmark nodes. Peak memory follows the kept geometry, not
+    the file. bbox (min_lat, min_lon, max_lat, max_lon) overrides the file's bounds.
+    """
+    bounds = bbox
+    way_classes, way_levels = array('B'), array('l')
+    way_ends, way_refs = array('q'), array('q')
+    for elem in _iter_elements(path, ('bounds', 'way')):
+        if elem.tag == 'bounds':
+            if bounds is None:
+                bounds = tuple(float(elem.get(key)) for key in ('minlat', 'minlon', 'maxlat', 'maxlon'))
+            continue
+        tags = _tags(elem)
+        cls = _way_class(tags)
+        if cls is None:
+            continue
+        refs = [int(nd.get('ref')) for nd in elem.iter('nd')]
+        if len(refs) < 2:
+            continue
+        way_refs.extend(refs)
+        way_ends.append(len(way_refs))
+        way_classes.append(cls)
+        way_levels.append(_building_levels(tags) if cls == BUILDING else 0)
+
+    refs = np.frombuffer(way_refs, dtype=np.int64) if way_refs else np.empty(0, dtype=np.int64)
+    needed = np.unique(refs)
+    node_ids, node_lat, node_lon = [], [], []
+    batch_ids, batch_lat, batch_lon = array('q'), array('d'), array('d')
+    locations = {}
+
+    def flush():
+        ids = np.array(batch_ids, dtype=np.int64)
+        found = np.searchsorted(needed, ids)
+        keep = needed[np.minimum(found, len(needed) - 1)] == ids if len(needed) else np.zeros(len(ids), dtype=bool)
+        node_ids.append(ids[keep])
+        node_lat.append(np.array(batch_lat)[keep])
+        node_lon.append(np.array(batch_lon)[keep])
+        del batch_ids[:], batch_lat[:], batch_lon[:]
+
+    for elem in _iter_elements(path, ('node',)):
+        lat, lon = float(elem.get('lat')), float(elem.get('lon'))
+        batch_ids.append(int(elem.get('id')))
+        batch_lat.append(lat)
+        batch_lon.append(lon)
+        if len(batch_ids) >= NODE_BATCH:
+            flush()
+        if len(locations) < max_locations and len(elem):
+            tags = _tags(elem)
+            name = tags.get('name')
+            inside = bounds is None or (bounds[0] <= lat <= bounds[2] and bounds[1] <= lon <= bounds[3])
+            if name and name not in locations and inside and any(key in tags for key in LANDMARK_KEYS):
+                locations[name] = (lat, lon)
+    flush()
+
+    ids = np.concatenate(node_ids)
+    order = np.argsort(ids)
+    ids, lat, lon = ids[order], np.concatenate(node_lat)[order], np.concatenate(node_lon)[order]
+
+    # Drop references to nodes the extract clipped away, then the ways left too short
+    found = np.searchsorted(ids, refs)
+    present = ids[np.minimum(found, len(ids) - 1)] == refs if len(ids) else np.zeros(len(refs), dtype=bool)
+    ends = np.frombuffer(way_ends, dtype=np.int64) if way_ends else np.empty(0, dtype=np.int64)
+    kept_ends = np.cumsum(present)[ends - 1] if len(ends) else ends
+    kept_offsets = np.concatenate([[0], kept_ends])
+    long_enough = np.diff(kept_offsets) >= 2
+    vertex_way = np.repeat(np.arange(len(ends)), np.diff(kept_offsets))
+    vertex_keep = long_enough[vertex_way]
+    vertex_index = found[present][vertex_keep]
+    offsets = np.concatenate([[0], np.cumsum(np.diff(kept_offsets)[long_enough])])
+
+    if bounds is None:
+        if len(vertex_index) == 0:
+            raise ValueError(f"{path} has no bounds and no road, building, water or park geometry")
+        bounds = (lat[vertex_index].min(), lon[vertex_index].min(), lat[vertex_index].max(), lon[vertex_index].max())
+
+    return OSMExtract(bounds, locations,
+                      np.frombuffer(way_classes, dtype=np.uint8)[long_enough] if way_classes else np.empty(0, dtype=np.uint8),
+                      np.asarray(way_levels, dtype=np.int64)[long_enough],
+                      offsets, lat[vertex_index], lon[vertex_index])
+
+
+def _cache_key(path: str, grid, bbox, max_locations: int) -> str:
+    stat = os.stat(path)
+    identity = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+                grid.rows, grid.cols, grid.height, bbox, max_locations, EXTRACT_CACHE_VERSION]
+    return hashlib.sha1(json.dumps(identity).encode()).hexdigest()[:16]
+
+
+def import_osm_extract(grid, path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                       bbox: Optional[Tuple[float, float, float, float]] = None,
+                       max_locations: int = MAX_LOCATIONS) -> ExtractMap:
+    """Reset the grid to the extract's roads, buildings, water and parks.
+
+    The rasterized grid is kept as a snapshot under cache_dir (None disables it), keyed
+    by the file, its size and mtime and the grid shape, so reloading skips parsing.
+    Returns the extract's bounds and named locations.
+    """
+    key = _cache_key(path, grid, bbox, max_locations) if cache_dir is not None else None
+    if key is not None:
+        snapshot_path = os.path.join(cache_dir, f'{key}.npz')
+        info_path = os.path.join(cache_dir, f'{key}.json')
+        if os.path.exists(snapshot_path) and os.path.exists(info_path):
+            try:
+                with open(info_path) as f:
+                    info = json.load(f)
+                grid.restore_snapshot(snapshot_path)
+                print(f"✓ Loaded {path} from the extract cache")
+                return ExtractMap(info['bounds'], {name: tuple(pos) for name, pos in info['locations'].items()})
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠ Ignoring unreadable extract cache entry: {e}")
+
+    extract = read_osm_extract(path, bbox, max_locations)
+    grid.reset()
+    terrain = extract.terrain(grid.rows, grid.cols)
+    terrain.apply(grid)
+    counts = ", ".join(f"{count} {name}" for name, count in terrain.summary().items())
+    print(f"✓ Imported {len(extract)} ways and {len(extract.locations)} places from {path} ({counts})")
+
+    if key is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            grid.save_snapshot(snapshot_path)
+            # Written after the snapshot so a cache hit always finds both
+            with open(info_path, 'w') as f:
+                json.dump({'bounds': list(extract.bounds), 'locations': extract.locations}, f)
+        except OSError as e:
+            print(f"✗ Could not cache extract grid: {e}")
+    return ExtractMap(extract.bounds, extract.locations)
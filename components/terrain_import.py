@@ -0,0 +1,129 @@
+import os
+import numpy as np
+from typing import Iterator, Optional, Tuple
+
+RAW_EXTENSIONS = ('.raw', '.bin', '.dem')
+BLOCK_ROWS = 256
+
+
+def open_raster(path: str, shape: Optional[Tuple[int, int]] = None, dtype='<i2',
+                header_bytes: int = 0) -> np.ndarray:
+    """Open a heightmap as a 2D array without reading it all where the format allows.
+
+    .npy files and raw DEM rasters (.raw/.bin/.dem, which need shape and dtype; 16-bit
+    little-endian by default) are memory-mapped. Anything else is read as a grayscale
+    image through Pillow.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        raster = np.load(path, mmap_mode='r')
+    elif extension in RAW_EXTENSIONS:
+        if shape is None:
+            raise ValueError(f"Raw raster {path} needs an explicit (rows, cols) shape")
+        raster = np.memmap(path, dtype=dtype, mode='r', offset=header_bytes, shape=tuple(shape))
+    else:
+        from PIL import Image
+        with Image.open(path) as image:
+            if image.mode not in ('L', 'I', 'I;16', 'F'):
+                image = image.convert('L')
+            raster = np.asarray(image)
+    if raster.ndim != 2:
+        raise ValueError(f"Expected a 2D raster, got shape {raster.shape}")
+    return raster
+
+
+def raster_range(raster: np.ndarray, nodata: Optional[float] = None,
+                 block_rows: int = BLOCK_ROWS) -> Tuple[float, float]:
+    """Min and max over the valid samples, read in row blocks."""
+    low, high = np.inf, -np.inf
+    for r0 in range(0, raster.shape[0], block_rows):
+        block = np.asarray(raster[r0:r0 + block_rows], dtype=float)
+        if nodata is not None:
+            block = block[block != nodata]
+        if block.size:
+            low, high = min(low, float(block.min())), max(high, float(block.max()))
+    if low > high:
+        raise ValueError("Raster holds no valid samples")
+    return low, high
+
+
+def resample_blocks(raster: np.ndarray, rows: int, cols: int, nodata: Optional[float] = None,
+                    fill_value: float = 0.0, block_rows: int = 64) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (row0, block) pieces of the raster resampled to (rows, cols).
+
+    Each output block only reads the source rows it covers. Shrinking averages every
+    source sample inside a cell (so peaks are not aliased away); enlarging interpolates
+    bilinearly between sample centres. nodata samples are replaced with fill_value.
+    """
+    src_rows, src_cols = raster.shape
+    downsample = src_rows >= rows and src_cols >= cols
+
+    if downsample:
+        row_edges = np.linspace(0, src_rows, rows + 1).astype(np.intp)
+        col_edges = np.linspace(0, src_cols, cols + 1).astype(np.intp)[:-1]
+        col_counts = np.diff(np.append(col_edges, src_cols))
+    else:
+        col_pos = np.clip((np.arange(cols) + 0.5) * src_cols / cols - 0.5, 0, src_cols - 1)
+        c_lo = np.floor(col_pos).astype(np.intp)
+        c_hi = np.minimum(c_lo + 1, src_cols - 1)
+        c_t = col_pos - c_lo
+
+    for out0 in range(0, rows, block_rows):
+        out1 = min(out0 + block_rows, rows)
+        if downsample:
+            s0, s1 = row_edges[out0], row_edges[out1]
+            source = _valid(raster[s0:s1], nodata, fill_value)
+            summed = np.add.reduceat(np.add.reduceat(source, row_edges[out0:out1] - s0, axis=0), col_edges, axis=1)
+            counts = np.diff(row_edges[out0:out1 + 1])[:, None] * col_counts[None, :]
+            yield out0, summed / counts
+        else:
+            row_pos = np.clip((np.arange(out0, out1) + 0.5) * src_rows / rows - 0.5, 0, src_rows - 1)
+            r_lo = np.floor(row_pos).astype(np.intp)
+            r_hi = np.minimum(r_lo + 1, src_rows - 1)
+            r_t = (row_pos - r_lo)[:, None]
+            s0, s1 = int(r_lo.min()), int(r_hi.max()) + 1
+            source = _valid(raster[s0:s1], nodata, fill_value)
+            top = source[r_lo - s0]
+            bottom = source[r_hi - s0]
+            top = top[:, c_lo] * (1 - c_t) + top[:, c_hi] * c_t
+            bottom = bottom[:, c_lo] * (1 - c_t) + bottom[:, c_hi] * c_t
+            yield out0, top * (1 - r_t) + bottom * r_t
+
+
+def _valid(block: np.ndarray, nodata: Optional[float], fill_value: float) -> np.ndarray:
+    block = np.array(block, dtype=float)
+    if nodata is not None:
+        block[block == nodata] = fill_value
+    return block
+
+
+def slope_costs(elevation: np.ndarray, weight: float = 1.0, cell_size: float = 1.0) -> np.ndarray:
+    """Terrain cost 1 + weight * slope, with slope the elevation gradient magnitude
+    in levels per cell."""
+    d_row, d_col = np.gradient(elevation, cell_size)
+    return 1.0 + weight * np.hypot(d_row, d_col)
+
+
+def import_heightmap(grid, path: str, max_level: Optional[float] = None, vertical_scale: Optional[float] = None,
+                     nodata: Optional[float] = None, slope_weight: Optional[float] = None,
+                     shape: Optional[Tuple[int, int]] = None, dtype='<i2', header_bytes: int = 0):
+    """Fill grid.elevation from a heightmap image or raw DEM raster.
+
+    Heights are mapped to levels either by vertical_scale (levels per raster unit above
+    the raster minimum) or by stretching the raster range onto 0..max_level (default
+    grid.height - 1). With slope_weight set, terrain costs on every level become
+    1 + slope_weight * slope of the imported surface; obstacles keep their costs.
+    """
+    raster = open_raster(path, shape, dtype, header_bytes)
+    low, high = raster_range(raster, nodata)
+    if vertical_scale is None:
+        top = grid.height - 1 if max_level is None else max_level
+        vertical_scale = top / (high - low) if high > low else 0.0
+
+    for row, block in resample_blocks(raster, grid.rows, grid.cols, nodata, fill_value=low):
+        grid.set_elevation((block - low) * vertical_scale, row, 0)
+
+    if slope_weight is not None:
+        grid.paint_terrain_cost((slice(None), slice(None), slice(None)), slope_costs(grid.elevation, slope_weight))
+    print(f"✓ Imported {raster.shape[1]}x{raster.shape[0]} heightmap from {path} "
+          f"(range {low:g}..{high:g}) onto {grid.rows}x{grid.cols}")
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pathfinding_visualizer', 'tiles')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+# Eviction frees down to this fraction of max_bytes, so a full cache rescans rarely
+EVICT_TO_FRACTION = 0.9
+
+
+class TileCache:
+    """On-disk tile store laid out as {directory}/{z}/{x}/{y}.tile with a .json sidecar.
+
+    The sidecar keeps the server's ETag/Last-Modified and when the tile was fetched, so
+    tiles older than max_age can be revalidated instead of downloaded again. A tile
+    file's mtime records its last use; once the cache (tiles and sidecars) grows past
+    max_bytes the least recently used tiles are evicted down to EVICT_TO_FRACTION of it.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _path(self, zoom: int, x: int, y: int) -> str:
+        return os.path.join(self.directory, str(zoom), str(x), f'{y}.tile')
+
+    def get(self, zoom: int, x: int, y: int) -> Optional[Tuple[bytes, Dict]]:
+        """(tile bytes, metadata) or None; marks the tile as recently used."""
+        path = self._path(zoom, x, y)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return data, meta
+
+    def is_fresh(self, meta: Dict) -> bool:
+        return time.time() - meta.get('fetched_at', 0) < self.max_age
+
+    def put(self, zoom: int, x: int, y: int, data: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        path = self._path(zoom, x, y)
+        meta = json.dumps({'fetched_at': time.time(), 'etag': etag, 'last_modified': last_modified}).encode()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            old_size = self._entry_size(path)
+            # Write-then-rename so a concurrent reader never sees a half-written tile
+            self._write_atomic(path, data)
+            self._write_atomic(path + '.json', meta)
+        except OSError as e:
+            print(f"✗ Could not cache tile {zoom}/{x}/{y}: {e}")
+            return
+        self._grow(len(data) + len(meta) - old_size)
+        self.evict()
+
+    def refresh(self, zoom: int, x: int, y: int, meta: Dict):
+        """Record a successful revalidation (HTTP 304) without rewriting the tile."""
+        meta_path = self._path(zoom, x, y) + '.json'
+        data = json.dumps(dict(meta, fetched_at=time.time())).encode()
+        try:
+            old_size = os.path.getsize(meta_path)
+            self._write_atomic(meta_path, data)
+        except OSError:
+            return
+        self._grow(len(data) - old_size)
+
+    def _grow(self, delta: int):
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += delta
+
+    @staticmethod
+    def _entry_size(path: str) -> int:
+        # A tile and its sidecar are stored, counted and evicted together
+        size = 0
+        for part in (path, path + '.json'):
+            try:
+                size += os.path.getsize(part)
+            except OSError:
+                pass
+        return size
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _scan(self):
+        tiles = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tile'):
+                    path = os.path.join(root, name)
+                    try:
+                        mtime = os.stat(path).st_mtime
+                    except OSError:
+                        continue
+                    tiles.append((mtime, self._entry_size(path), path))
+        return tiles
+
+    def size(self) -> int:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            return self._total_bytes
+
+    def evict(self):
+        if self.size() <= self.max_bytes:
+            return
+        with self._lock:
+            tiles = sorted(self._scan())
+            total = sum(size for _, size, _ in tiles)
+            target = self.max_bytes * EVICT_TO_FRACTION
+            for _, size, path in tiles:
+                if total <= target:
+                    break
+                for stale in (path, path + '.json'):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                total -= size
+            self._total_bytes = total
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._scan():
+                for stale in (path, path + '.json'):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+            self._total_bytes = 0
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from typing import Callable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+from .tile_cache import TileCache, DEFAULT_CACHE_DIR
+
+DEFAULT_TILE_URL = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'
+TILE_SIZE = 256
+PLACEHOLDER_COLOR = (220, 220, 220)
+MEMORY_CACHE_TILES = 256
+
+
+class TokenBucket:
+    """Thread-safe rate limiter: up to capacity requests at once, refilled at rate per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TileFetcher:
+    """Concurrent slippy-map tile downloads over one pooled HTTP session.
+
+    url_template takes {z}, {x} and {y}; it defaults to the OSM_TILE_URL environment
+    variable, then to the public OpenStreetMap server. Requests are spread over
+    max_workers threads and throttled by a token bucket (rate per second, burst).
+
+    Tiles are kept in a per-server TileCache under cache_dir (None disables it) and
+    revalidated once older than max_age; decoded images of recent tiles stay in memory.
+    offline=True never touches the network and serves whatever the disk cache holds.
+    """
+
+    def __init__(self, url_template: Optional[str] = None, max_workers: int = 6, rate: float = 20.0,
+                 burst: Optional[float] = None, timeout: float = 10.0, user_agent: str = 'PathfindingVisualizer/1.0',
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR, offline: bool = False, **cache_options):
+        self.url_template = url_template or os.environ.get('OSM_TILE_URL', DEFAULT_TILE_URL)
+        self.offline = offline
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = TileCache(os.path.join(cache_dir, self._server_key(self.url_template)), **cache_options)
+        self._images = OrderedDict()
+        self._images_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @staticmethod
+    def _server_key(url_template: str) -> str:
+        # Tiles from different servers must not share cache entries
+        host = urlsplit(url_template).netloc.replace(':', '_') or 'local'
+        return f"{host}-{hashlib.sha1(url_template.encode()).hexdigest()[:8]}"
+
+    def tile_url(self, zoom: int, x: int, y: int) -> str:
+        return self.url_template.format(z=zoom, x=x, y=y)
+
+    def fetch(self, zoom: int, x: int, y: int) -> Optional[bytes]:
+        """Raw tile bytes from the cache or the server, or None when neither has it."""
+        cached = self.cache.get(zoom, x, y) if self.cache else None
+        if cached is not None and (self.offline or self.cache.is_fresh(cached[1])):
+            return cached[0]
+        if self.offline:
+            return None
+
+        headers = {}
+        if cached is not None:
+            if cached[1].get('etag'):
+                headers['If-None-Match'] = cached[1]['etag']
+            if cached[1].get('last_modified'):
+                headers['If-Modified-Since'] = cached[1]['last_modified']
+        self.rate_limiter.acquire()
+        try:
+            response = self.session.get(self.tile_url(zoom, x, y), timeout=self.timeout, headers=headers)
+        except requests.RequestException:
+            # A stale tile beats a grey one when the network is down
+            return cached[0] if cached is not None else None
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.refresh(zoom, x, y, cached[1])
+            return cached[0]
+        if response.status_code != 200:
+            return cached[0] if cached is not None else None
+        if self.cache:
+            self.cache.put(zoom, x, y, response.content,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.content
+
+    def fetch_image(self, zoom: int, x: int, y: int) -> Optional[Image.Image]:
+        """Decoded tile, or None if it is unavailable."""
+        key = (self.url_template, zoom, x, y)
+        with self._images_lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+
+        data = self.fetch(zoom, x, y)
+        if data is None:
+            return None
+        try:
+            image = Image.open(BytesIO(data))
+            image.load()
+        except OSError:
+            return None
+        with self._images_lock:
+            self._images[key] = image
+            while len(self._images) > MEMORY_CACHE_TILES:
+                self._images.popitem(last=False)
+        return image
+
+    def iter_tiles(self, zoom: int, coords: List[Tuple[int, int]],
+                   cancelled: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[int, int, Optional[Image.Image]]]:
+        """Yield (x, y, image or None) in completion order. Once cancelled() is true the
+        tiles not yet started are dropped and iteration stops."""
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {pool.submit(self.fetch_image, zoom, x, y): (x, y) for x, y in coords}
+            for future in as_completed(futures):
+                if cancelled is not None and cancelled():
+                    return
+                x, y = futures[future]
+                yield x, y, future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def report_missing(self, missing: int, total: int):
+        if missing:
+            reason = "not in the offline cache" if self.offline else "could not be downloaded"
+            print(f"\n⚠ {missing} of {total} tiles {reason}; showing them as blank")
+
+    def fetch_grid(self, zoom: int, x0: int, y0: int, width: int, height: int) -> List[List[Image.Image]]:
+        """height rows of width tiles starting at tile (x0, y0); missing tiles are grey."""
+        coords = [(x0 + dx, y0 + dy) for dy in range(height) for dx in range(width)]
+        images = {(x, y): image for x, y, image in self.iter_tiles(zoom, coords)}
+        self.report_missing(sum(image is None for image in images.values()), len(coords))
+        placeholder = Image.new('RGB', (TILE_SIZE, TILE_SIZE), PLACEHOLDER_COLOR)
+        return [[images[(x0 + dx, y0 + dy)] or placeholder for dx in range(width)] for dy in range(height)]
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+import numpy as np
+import pygame
+from .tile_fetcher import TileFetcher, TILE_SIZE, PLACEHOLDER_COLOR
+
+MOSAIC_CACHE_SIZE = 6
+
+
+def enhance(pixels: np.ndarray, contrast: float = 1.4, sharpness: float = 2.0) -> np.ndarray:
+    """In-place equivalent of ImageEnhance.Contrast then ImageEnhance.Sharpness on an
+    (h, w, 3) uint8 array, using the same grey mean, smoothing kernel and truncation."""
+    work = pixels.astype(np.float32)
+    if contrast != 1.0:
+        # Same integer luma as PIL's RGB -> L conversion
+        luma = (pixels[..., 0].astype(np.uint32) * 19595 + pixels[..., 1].astype(np.uint32) * 38470
+                + pixels[..., 2].astype(np.uint32) * 7471 + 0x8000) >> 16
+        mean = int(luma.mean() + 0.5)
+        work -= mean
+        work *= contrast
+        work += mean
+        np.clip(work, 0, 255, out=work)
+        np.trunc(work, out=work)
+
+    if sharpness != 1.0 and min(pixels.shape[:2]) > 2:
+        # ImageFilter.SMOOTH: 3x3 ones with 5 in the centre over 13; PIL leaves the border as is
+        inner = work[1:-1, 1:-1]
+        rows = work[:, :-2] + work[:, 1:-1]
+        rows += work[:, 2:]
+        smooth = rows[:-2] + rows[1:-1]
+        smooth += rows[2:]
+        smooth += 4 * inner
+        smooth /= 13
+        smooth += 0.5
+        np.floor(smooth, out=smooth)
+        # smooth + sharpness * (inner - smooth), computed in place
+        smooth *= 1 - sharpness
+        smooth += sharpness * inner
+        np.clip(smooth, 0, 255, out=smooth)
+        np.trunc(smooth, out=inner)
+
+    pixels[...] = work
+    return pixels
+
+
+class TileMosaic:
+    """Crops of the slippy map assembled straight into one pixel buffer.
+
+    A crop is a box in global pixel coordinates at a zoom level. Only the tiles that
+    intersect it are fetched and decoded, each is written once into a preallocated
+    array, enhanced in place, and wrapped as a pygame surface that shares the array's
+    memory. Finished surfaces are kept per (server, zoom, box).
+    """
+
+    def __init__(self, fetcher: TileFetcher, cache_size: int = MOSAIC_CACHE_SIZE):
+        self.fetcher = fetcher
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tile_range(left: int, top: int, width: int, height: int) -> Tuple[int, int, int, int]:
+        """(x0, y0, x1, y1) tile indices, end-exclusive, covering the pixel box."""
+        return (left // TILE_SIZE, top // TILE_SIZE,
+                -(-(left + width) // TILE_SIZE), -(-(top + height) // TILE_SIZE))
+
+    def build(self, zoom: int, left: int, top: int, width: int, height: int,
+              contrast: float = 1.4, sharpness: float = 2.0,
+              progress: Optional[Callable[[int, int, pygame.Surface], None]] = None,
+              cancelled: Optional[Callable[[], bool]] = None) -> Optional[pygame.Surface]:
+        """Surface for the crop, or None if cancelled() turned true first.
+
+        progress(done, total, surface) is called once up front and after every tile.
+        The surface already shares the buffer the tiles land in, so a caller on another
+        thread can draw it while it fills in.
+        """
+        built = self._build(zoom, left, top, width, height, contrast, sharpness, progress, cancelled)
+        return None if built is None else built[1]
+
+    def build_array(self, zoom: int, left: int, top: int, width: int, height: int,
+                    contrast: float = 1.4, sharpness: float = 2.0,
+                    cancelled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """(height, width, 3) pixels of the crop, shared with its cached surface; treat
+        as read-only."""
+        built = self._build(zoom, left, top, width, height, contrast, sharpness, None, cancelled)
+        return None if built is None else built[0]
+
+    def _build(self, zoom, left, top, width, height, contrast, sharpness, progress, cancelled):
+        key = (self.fetcher.url_template, zoom, left, top, width, height, contrast, sharpness)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        x0, y0, x1, y1 = self.tile_range(left, top, width, height)
+        coords = [(x, y) for y in range(y0, y1) for x in range(x0, x1)]
+        pixels = np.empty((height, width, 3), dtype=np.uint8)
+        pixels[...] = PLACEHOLDER_COLOR
+        # The surface reads the array in place; keeping both in the cache keeps it alive
+        surface = pygame.image.frombuffer(pixels, (width, height), 'RGB')
+        if progress is not None:
+            progress(0, len(coords), surface)
+
+        done = missing = 0
+        for x, y, tile in self.fetcher.iter_tiles(zoom, coords, cancelled):
+            if tile is None:
+                missing += 1
+            else:
+                self._paste(pixels, tile, x * TILE_SIZE - left, y * TILE_SIZE - top)
+            done += 1
+            if progress is not None:
+                progress(done, len(coords), surface)
+        if done < len(coords):
+            return None
+        self.fetcher.report_missing(missing, len(coords))
+        enhance(pixels, contrast, sharpness)
+
+        with self._lock:
+            self._cache[key] = (pixels, surface)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return pixels, surface
+
+    @staticmethod
+    def _paste(pixels: np.ndarray, tile, x: int, y: int):
+        tile_pixels = np.asarray(tile if tile.mode == 'RGB' else tile.convert('RGB'))
+        src_x0, src_y0 = max(0, -x), max(0, -y)
+        dst_x0, dst_y0 = max(0, x), max(0, y)
+        w = min(tile_pixels.shape[1] - src_x0, pixels.shape[1] - dst_x0)
+        h = min(tile_pixels.shape[0] - src_y0, pixels.shape[0] - dst_y0)
+        if w > 0 and h > 0:
+            pixels[dst_y0:dst_y0 + h, dst_x0:dst_x0 + w] = tile_pixels[src_y0:src_y0 + h, src_x0:src_x0 + w]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class MapPyramid:
+    """A finished map surface and successively halved copies of it.
+
+    Halving a web-map crop approximates the next zoom level out, so drawing the map
+    smaller (camera zoomed out) scales down from the nearest level instead of the full
+    crop, and needs no tiles from the server.
+    """
+
+    def __init__(self, surface: pygame.Surface, min_size: int = 64):
+        self.levels = [surface]
+        # surfarray is (width, height, 3)
+        pixels = pygame.surfarray.array3d(surface).astype(np.uint16)
+        while min(pixels.shape[:2]) // 2 >= min_size:
+            w, h = pixels.shape[0] // 2, pixels.shape[1] // 2
+            quads = pixels[:2 * w, :2 * h].reshape(w, 2, h, 2, 3)
+            pixels = (quads.sum(axis=(1, 3)) + 2) >> 2
+            self.levels.append(pygame.surfarray.make_surface(pixels.astype(np.uint8)))
+
+    def surface_for(self, width: int, height: int) -> pygame.Surface:
+        """Smallest level still at least width x height (the full crop if none is)."""
+        for surface in reversed(self.levels):
+            if surface.get_width() >= width and surface.get_height() >= height:
+                return surface
+        return self.levels[0]
@@ -1,6 +1,5 @@
 
 import pygame
-import random
 
 #Button style
 class Button:
@@ -346,19 +345,23 @@ class ButtonManager:
             selected_loc = self.start_location_dropdown.get_selected_location()
             print(f"Start location selected: {selected_loc}")
             visualizer.selected_start_location = selected_loc
-            start_row = random.randint(5, 18)
-            start_col = random.randint(15, 27)  
-            visualizer.grid.set_start(0, start_row, start_col)
-            visualizer.vehicle.position = [0, start_row, start_col]
+            if visualizer.osm_loaded or visualizer.map_job is not None or visualizer.osm_extract is not None:
+                # On the map a new selection reloads the route, replacing any load in flight
+                visualizer.load_locations_map()
+                return True
+            visualizer.cancel_search()
+            visualizer.place_endpoints(selected_loc, visualizer.selected_end_location)
             return True
         
         if self.dest_location_dropdown.handle_click(pos):
             selected_loc = self.dest_location_dropdown.get_selected_location()
             print(f"Destination selected: {selected_loc}")
             visualizer.selected_end_location = selected_loc
-            end_row = random.randint(15, 30)
-            end_col = random.randint(15, 27)  
-            visualizer.grid.set_goal(0, end_row, end_col)
+            if visualizer.osm_loaded or visualizer.map_job is not None or visualizer.osm_extract is not None:
+                visualizer.load_locations_map()
+                return True
+            visualizer.cancel_search()
+            visualizer.place_endpoints(visualizer.selected_start_location, selected_loc)
             return True
         
         if self.obstacle_dropdown.handle_click(pos):
@@ -373,6 +376,8 @@ class ButtonManager:
             return True
 
         if self.building_dropdown.handle_click(pos):
+            visualizer.cancel_search()
+            visualizer.cancel_map_load()
             visualizer.grid.reset()
             use_recursive = (self.building_dropdown.selected == 1)
             visualizer.grid.generate_buildings(use_recursive=use_recursive)
@@ -401,6 +406,8 @@ class ButtonManager:
                 elif name == 'run':
                     visualizer.run_pathfinding()
                 elif name == 'clear':
+                    visualizer.cancel_search()
+                    visualizer.cancel_map_load()
                     visualizer.grid.reset()
                     visualizer.vehicle.reset()
                     visualizer.metrics = {}
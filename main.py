@@ -1,9 +1,23 @@
 
+import argparse
 import sys
 
-def run_3d_gui():
+def bbox_arg(value):
+    try:
+        bbox = tuple(float(part) for part in value.split(','))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        raise argparse.ArgumentTypeError("expected MIN_LAT,MIN_LON,MAX_LAT,MAX_LON")
+    return bbox
+
+def run_3d_gui(snapshot_path='scenario.npz', seed=None, heightmap_path=None, tile_options=None, osm_extract_path=None,
+               map_bbox=None, locations_path=None):
     try:
         from visualizer_3d import Pathfinding3DVisualizer
+        if tile_options:
+            from components.map_loader import OSMMapLoader
+            OSMMapLoader.configure_tiles(**tile_options)
         print("Starting 3D pathfinding visualizer with vehicle navigation...")
         print("\n✓ Features:")
         print("  - 3D Isometric view")
@@ -14,7 +28,9 @@ def run_3d_gui():
         print("  - Full 3D camera rotation")
         print("\nStarting 3D GUI...")
         
-        visualizer = Pathfinding3DVisualizer(rows=35, cols=35, height=5)
+        visualizer = Pathfinding3DVisualizer(rows=35, cols=35, height=5, snapshot_path=snapshot_path, seed=seed,
+                                             heightmap_path=heightmap_path, osm_extract_path=osm_extract_path,
+                                             map_bbox=map_bbox, locations_path=locations_path)
         visualizer.run()
     except ImportError as e:
         print(f"Error: {e}")
@@ -24,7 +40,33 @@ def run_3d_gui():
 
 def main():
     """Main entry point"""
-    run_3d_gui()
+    parser = argparse.ArgumentParser(description="3D pathfinding visualizer")
+    parser.add_argument('--3d', dest='gui_3d', action='store_true', help="launch the 3D GUI (default)")
+    parser.add_argument('--snapshot', default='scenario.npz',
+                        help="scenario snapshot (.npz archive or memory-mapped directory) to load at startup "
+                             "(unless --seed/--heightmap is given) and save with F5")
+    parser.add_argument('--seed', type=int, help="generate a reproducible city from this seed instead of a random layout")
+    parser.add_argument('--heightmap', help="grayscale image, .npy or raw DEM raster to use as terrain elevation")
+    parser.add_argument('--osm', dest='osm_extract', help="local .osm XML extract (optionally .gz/.bz2) to build the city from")
+    parser.add_argument('--bbox', type=bbox_arg, help="MIN_LAT,MIN_LON,MAX_LAT,MAX_LON area for Load Map (default: central Dubai)")
+    parser.add_argument('--locations', help="points of interest as CSV (name,lat,lon), JSON or GeoJSON points")
+    parser.add_argument('--tile-url', help="tile server URL template with {z}/{x}/{y} (defaults to $OSM_TILE_URL or OpenStreetMap)")
+    parser.add_argument('--offline', action='store_true', help="serve map tiles only from the on-disk cache")
+    parser.add_argument('--tile-cache', help="tile cache directory (default ~/.cache/pathfinding_visualizer/tiles)")
+    parser.add_argument('--no-tile-cache', action='store_true', help="do not read or write the tile cache")
+    args = parser.parse_args()
+    
+    tile_options = {}
+    if args.tile_url:
+        tile_options['url_template'] = args.tile_url
+    if args.offline:
+        tile_options['offline'] = True
+    if args.no_tile_cache:
+        tile_options['cache_dir'] = None
+    elif args.tile_cache:
+        tile_options['cache_dir'] = args.tile_cache
+    run_3d_gui(args.snapshot, args.seed, args.heightmap, tile_options, args.osm_extract, args.bbox,
+               args.locations)
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,19 @@
 
 import heapq
 import time
-from typing import List, Tuple, Dict
+import tracemalloc
+from typing import List, Tuple, Dict, Iterator, Optional, Callable
 from components.grid_environment_3d import Grid3DEnvironment
 
 class Pathfinding3DAlgorithms:    
-    def __init__(self, grid: Grid3DEnvironment):
+    HOOK_EVENTS = ('expand', 'relax')
+    
+    def __init__(self, grid: Grid3DEnvironment, instrument: bool = False, trace_memory: bool = False):
         self.grid = grid
+        # Fine-grained counters and tracemalloc peak are opt-in; they cost a little per node
+        self.instrument = instrument
+        self.trace_memory = trace_memory
+        self.hooks = {event: [] for event in self.HOOK_EVENTS}
         self.reset_metrics()
     
     def reset_metrics(self):
@@ -14,31 +21,46 @@ class Pathfinding3DAlgorithms:
         self.path_length = 0
         self.execution_time = 0
         self.explored_nodes = []
+        self.counters = {}
+    
+    def add_hook(self, event: str, callback: Callable):
+        """Register callback for 'expand' (node, g) or 'relax' (node, parent, g)."""
+        if event not in self.hooks:
+            raise ValueError(f"Unknown hook event: {event}")
+        self.hooks[event].append(callback)
+    
+    def remove_hook(self, event: str, callback: Callable):
+        if callback in self.hooks.get(event, []):
+            self.hooks[event].remove(callback)
     
-    def get_neighbors(self, node: Tuple[int, int, int]) -> List[Tuple[int, int, int]]:
+    # 6-directional movement: up, down, left, right, forward, backward
+    DIRECTIONS = (
+        (0, -1, 0),   # up
+        (0, 1, 0),    # down
+        (0, 0, -1),   # left
+        (0, 0, 1),    # right
+        (-1, 0, 0),   # lower level
+        (1, 0, 0),    # upper level
+        # Diagonals on same level
+        (0, -1, -1), (0, -1, 1),
+        (0, 1, -1), (0, 1, 1),
+    )
+    
+    def get_neighbors(self, node: Tuple[int, int, int],
+                      is_blocked: Optional[Callable[[int, int, int], int]] = None) -> List[Tuple[int, int, int]]:
         z, row, col = node
         neighbors = []
+        if is_blocked is None:
+            is_blocked = self.grid.blocked_lookup()
+        height, rows, cols = self.grid.height, self.grid.rows, self.grid.cols
         
-        # 6-directional movement: up, down, left, right, forward, backward
-        directions = [
-            (0, -1, 0),   # up
-            (0, 1, 0),    # down
-            (0, 0, -1),   # left
-            (0, 0, 1),    # right
-            (-1, 0, 0),   # lower level
-            (1, 0, 0),    # upper level
-            # Diagonals on same level
-            (0, -1, -1), (0, -1, 1),
-            (0, 1, -1), (0, 1, 1),
-        ]
-        
-        for dz, dr, dc in directions:
+        for dz, dr, dc in self.DIRECTIONS:
             new_z, new_row, new_col = z + dz, row + dr, col + dc
             # Check if within bounds and not an obstacle
-            if (0 <= new_z < self.grid.height and
-                0 <= new_row < self.grid.rows and 
-                0 <= new_col < self.grid.cols and 
-                not self.grid.is_obstacle(new_z, new_row, new_col)):
+            if (0 <= new_z < height and
+                0 <= new_row < rows and 
+                0 <= new_col < cols and
+                not is_blocked(new_z, new_row, new_col)):
                 neighbors.append((new_z, new_row, new_col))
         
         return neighbors
@@ -54,85 +76,233 @@ class Pathfinding3DAlgorithms:
         path.reverse()
         return path
     
-    def dijkstra(self, start: Tuple[int, int, int], goal: Tuple[int, int, int]) -> Tuple[List[Tuple[int, int, int]], Dict]:
-        self.reset_metrics()
-        start_time = time.time()      
-        pq = [(0, start)]
-        came_from = {}
-        cost_so_far = {start: 0}
-        visited = set()
-        
-        while pq:
-            current_cost, current = heapq.heappop(pq)
-            
-            if current not in visited:
-                self.nodes_explored += 1
-                self.explored_nodes.append(current)
-                visited.add(current)
-            
-            if current == goal:
-                path = self.reconstruct_path(came_from, current)
-                self.path_length = len(path)
-                self.execution_time = time.time() - start_time
-                return path, self._get_metrics()
-            
-            if current_cost > cost_so_far.get(current, float('inf')):
-                continue
-            
-            for neighbor in self.get_neighbors(current):
-                new_cost = current_cost + self.grid.get_cost(neighbor[0], neighbor[1], neighbor[2])
-                
-                if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
-                    cost_so_far[neighbor] = new_cost
-                    heapq.heappush(pq, (new_cost, neighbor))
-                    came_from[neighbor] = current
-        
-        self.execution_time = time.time() - start_time
-        return [], self._get_metrics()
+    def dijkstra(self, start: Tuple[int, int, int], goal: Tuple[int, int, int],
+                 min_clearance: int = 0) -> Tuple[List[Tuple[int, int, int]], Dict]:
+        return self._run_to_completion(self.dijkstra_steps(start, goal, batch_size=None, min_clearance=min_clearance))
     
-    def a_star(self, start: Tuple[int, int, int], goal: Tuple[int, int, int]) -> Tuple[List[Tuple[int, int, int]], Dict]:
-        self.reset_metrics()
-        start_time = time.time()
+    def a_star(self, start: Tuple[int, int, int], goal: Tuple[int, int, int],
+               min_clearance: int = 0) -> Tuple[List[Tuple[int, int, int]], Dict]:
+        return self._run_to_completion(self.a_star_steps(start, goal, batch_size=None, min_clearance=min_clearance))
+    
+    def dijkstra_steps(self, start: Tuple[int, int, int], goal: Tuple[int, int, int],
+                       batch_size: Optional[int] = 100, min_clearance: int = 0) -> Iterator[Dict]:
+        return self.search_steps(start, goal, 'dijkstra', batch_size, min_clearance)
+    
+    def a_star_steps(self, start: Tuple[int, int, int], goal: Tuple[int, int, int],
+                     batch_size: Optional[int] = 100, min_clearance: int = 0) -> Iterator[Dict]:
+        return self.search_steps(start, goal, 'a_star', batch_size, min_clearance)
+    
+    def stepper(self, start: Tuple[int, int, int], goal: Tuple[int, int, int], algorithm: str = 'a_star',
+                min_clearance: int = 0) -> 'SearchStepper':
+        return SearchStepper(self, start, goal, algorithm, min_clearance)
+    
+    def search_steps(self, start: Tuple[int, int, int], goal: Tuple[int, int, int],
+                     algorithm: str = 'a_star', batch_size: Optional[int] = 100,
+                     min_clearance: int = 0) -> Iterator[Dict]:
+        """Resumable search: each next() expands up to batch_size nodes and yields progress.
+
+        send(n) changes the budget for the following slice; batch_size=None runs to
+        completion in one slice. The last progress dict has done=True, the path and
+        the final metrics. All state is local, so several searches can be time-sliced
+        on the same instance. min_clearance > 1 keeps the search that many cells away
+        from obstacles (see ClearanceMap) for vehicles wider than one cell.
         
-        pq = [(0, start)]
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: self.heuristic(start, goal)}
-        visited = set()
+        With trace_memory, tracemalloc runs for the search's lifetime (started here
+        unless it was already tracing, in which case its peak is reset) and
+        counters['peak_memory_bytes'] is the peak traced since the search started.
+        """
+        use_heuristic = algorithm == 'a_star'
+        budget = batch_size
+        elapsed = 0.0
+        explored = []
         
-        while pq:
-            current_f, current = heapq.heappop(pq)
-            
-            if current not in visited:
-                self.nodes_explored += 1
-                self.explored_nodes.append(current)
-                visited.add(current)
-            
-            if current == goal:
-                path = self.reconstruct_path(came_from, current)
-                self.path_length = len(path)
-                self.execution_time = time.time() - start_time
-                return path, self._get_metrics()
-            
-            if current_f > f_score.get(current, float('inf')):
-                continue
+        instrument = self.instrument
+        expand_hooks = self.hooks['expand']
+        relax_hooks = self.hooks['relax']
+        heap_pushes = heap_pops = stale_pops = relaxations = neighbor_checks = 0
+        peak_open_set = 1
+        owns_tracemalloc = self.trace_memory and not tracemalloc.is_tracing()
+        if owns_tracemalloc:
+            tracemalloc.start()
+        elif self.trace_memory:
+            # Tracing was already on: measure this search's peak, not the process's
+            tracemalloc.reset_peak()
+        
+        try:
+            pq = [(self.heuristic(start, goal) if use_heuristic else 0, start)]
+            came_from = {}
+            g_score = {start: 0}
+            # Without a heuristic f == g, so Dijkstra checks stale entries against g directly
+            f_score = {start: pq[0][0]} if use_heuristic else g_score
+            visited = set()
+            path = []
             
-            for neighbor in self.get_neighbors(current):
-                tentative_g = g_score[current] + self.grid.get_cost(neighbor[0], neighbor[1], neighbor[2])
+            while True:
+                slice_start = time.perf_counter()
+                # Occupancy accessor for the current revision; edits made mid-search show up on the next slice
+                is_blocked = self.grid.blocked_lookup(min_clearance)
+                new_nodes = []
+                found = False
                 
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + self.heuristic(neighbor, goal)
-                    heapq.heappush(pq, (f_score[neighbor], neighbor))
-        
-        self.execution_time = time.time() - start_time
-        return [], self._get_metrics()
+                while pq and (budget is None or len(new_nodes) < budget):
+                    current_f, current = heapq.heappop(pq)
+                    if instrument:
+                        heap_pops += 1
+                    
+                    if current not in visited:
+                        new_nodes.append(current)
+                        visited.add(current)
+                    
+                    if current == goal:
+                        path = self.reconstruct_path(came_from, current)
+                        found = True
+                        break
+                    
+                    if current_f > f_score.get(current, float('inf')):
+                        if instrument:
+                            stale_pops += 1
+                        continue
+                    
+                    current_g = g_score[current]
+                    for hook in expand_hooks:
+                        hook(current, current_g)
+                    
+                    for neighbor in self.get_neighbors(current, is_blocked):
+                        tentative_g = current_g + self.grid.get_cost(neighbor[0], neighbor[1], neighbor[2])
+                        if instrument:
+                            neighbor_checks += 1
+                        
+                        if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                            came_from[neighbor] = current
+                            g_score[neighbor] = tentative_g
+                            if use_heuristic:
+                                f_score[neighbor] = tentative_g + self.heuristic(neighbor, goal)
+                            heapq.heappush(pq, (f_score[neighbor], neighbor))
+                            for hook in relax_hooks:
+                                hook(neighbor, current, tentative_g)
+                            if instrument:
+                                relaxations += 1
+                                heap_pushes += 1
+                                if len(pq) > peak_open_set:
+                                    peak_open_set = len(pq)
+                
+                elapsed += time.perf_counter() - slice_start
+                explored.extend(new_nodes)
+                done = found or not pq
+                
+                progress = {
+                    'done': done,
+                    'found': found,
+                    'new_nodes': new_nodes,
+                    'nodes_explored': len(explored),
+                    'frontier_size': len(pq),
+                    'best_f': pq[0][0] if pq else None,
+                    'elapsed': elapsed,
+                }
+                if done:
+                    progress['path'] = path
+                    progress['metrics'] = {
+                        'nodes_explored': len(explored),
+                        'path_length': len(path),
+                        'execution_time': elapsed,
+                        'explored_nodes': explored
+                    }
+                    counters = {}
+                    if instrument:
+                        counters.update({
+                            'heap_pushes': heap_pushes,
+                            'heap_pops': heap_pops,
+                            'stale_pops': stale_pops,
+                            'relaxations': relaxations,
+                            'neighbor_checks': neighbor_checks,
+                            'peak_open_set': peak_open_set,
+                        })
+                    if self.trace_memory and tracemalloc.is_tracing():
+                        counters['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+                    if owns_tracemalloc:
+                        # Stopped before the last yield: a finished stepper may be kept around
+                        tracemalloc.stop()
+                        owns_tracemalloc = False
+                    if counters:
+                        progress['metrics']['counters'] = counters
+                    yield progress
+                    return
+                
+                requested = yield progress
+                if requested is not None:
+                    budget = requested
+        finally:
+            # Also reached when a cancelled or dropped search's generator is closed
+            if owns_tracemalloc:
+                tracemalloc.stop()
+    
+    def _run_to_completion(self, steps: Iterator[Dict]) -> Tuple[List[Tuple[int, int, int]], Dict]:
+        self.reset_metrics()
+        for progress in steps:
+            pass
+        metrics = progress['metrics']
+        self.nodes_explored = metrics['nodes_explored']
+        self.path_length = metrics['path_length']
+        self.execution_time = metrics['execution_time']
+        self.explored_nodes = metrics['explored_nodes']
+        self.counters = metrics.get('counters', {})
+        return progress['path'], self._get_metrics()
     
     def _get_metrics(self) -> Dict:
-        return {
+        metrics = {
             'nodes_explored': self.nodes_explored,
             'path_length': self.path_length,
             'execution_time': self.execution_time,
             'explored_nodes': self.explored_nodes.copy()
         }
+        if self.counters:
+            metrics['counters'] = dict(self.counters)
+        return metrics
+
+
+class SearchStepper:
+    """Handle for a time-sliced search; step(n) expands up to n more nodes."""
+    
+    def __init__(self, pathfinder: Pathfinding3DAlgorithms, start: Tuple[int, int, int],
+                 goal: Tuple[int, int, int], algorithm: str = 'a_star', min_clearance: int = 0):
+        self.pathfinder = pathfinder
+        self.start = start
+        self.goal = goal
+        self.algorithm = algorithm
+        self.min_clearance = min_clearance
+        self.progress = None
+        self.done = False
+        self._steps = None
+    
+    def step(self, n: int = 100) -> Dict:
+        if self.done:
+            return self.progress
+        if self._steps is None:
+            self._steps = self.pathfinder.search_steps(self.start, self.goal, self.algorithm, n, self.min_clearance)
+            self.progress = next(self._steps)
+        else:
+            self.progress = self._steps.send(n)
+        self.done = self.progress['done']
+        return self.progress
+    
+    def close(self):
+        """Abandon an unfinished search, releasing its state (and tracemalloc, if it started it)."""
+        if self._steps is not None:
+            self._steps.close()
+            self._steps = None
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> Dict:
+        if self.done:
+            raise StopIteration
+        return self.step()
+    
+    @property
+    def path(self) -> List[Tuple[int, int, int]]:
+        return self.progress['path'] if self.done else []
+    
+    @property
+    def metrics(self) -> Dict:
+        return self.progress['metrics'] if self.done else {}
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import deque
+from typing import List, Tuple, Dict, Optional
+from pathfinding_algorithms_3d import Pathfinding3DAlgorithms
+
+
+class SearchJob:
+    """Handle for one background search; explored nodes stream in as it runs."""
+
+    def __init__(self, start: Tuple[int, int, int], goal: Tuple[int, int, int], algorithm: str,
+                 min_clearance: int = 0):
+        self.start = start
+        self.goal = goal
+        self.algorithm = algorithm
+        self.min_clearance = min_clearance
+        self.progress = {}
+        self.path = []
+        self.metrics = {}
+        self.error = None
+        self._explored = deque()
+        self._cancel_event = threading.Event()
+        self._finished_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished_event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished_event.wait(timeout)
+
+    def drain_explored(self) -> List[Tuple[int, int, int]]:
+        nodes = []
+        while self._explored:
+            nodes.append(self._explored.popleft())
+        return nodes
+
+
+class PathfindingWorker:
+    """Runs one search at a time on a daemon thread; submitting cancels the previous job."""
+
+    def __init__(self, pathfinder: Pathfinding3DAlgorithms, batch_size: int = 200):
+        self.pathfinder = pathfinder
+        self.batch_size = batch_size
+        self.current_job = None
+
+    def submit(self, start: Tuple[int, int, int], goal: Tuple[int, int, int], algorithm: str = 'a_star',
+               min_clearance: int = 0) -> SearchJob:
+        self.cancel()
+        job = SearchJob(start, goal, algorithm, min_clearance)
+        self.current_job = job
+        thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+        thread.start()
+        return job
+
+    def cancel(self):
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
+
+    def _run(self, job: SearchJob):
+        stepper = self.pathfinder.stepper(job.start, job.goal, job.algorithm, job.min_clearance)
+        try:
+            while not stepper.done:
+                if job.cancelled:
+                    return
+                progress = stepper.step(self.batch_size)
+                job._explored.extend(progress['new_nodes'])
+                job.progress = {
+                    'nodes_explored': progress['nodes_explored'],
+                    'frontier_size': progress['frontier_size'],
+                    'best_f': progress['best_f'],
+                    'elapsed': progress['elapsed'],
+                }
+                # Give the UI thread the GIL between slices
+                time.sleep(0)
+            job.path = stepper.path
+            job.metrics = stepper.metrics
+        except Exception as e:
+            job.error = e
+        finally:
+            stepper.close()
+            job._finished_event.set()
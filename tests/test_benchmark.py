@@ -0,0 +1,40 @@
+import numpy as np
+from benchmark import build_map, compare_reports, make_queries, run_case
+
+
+def case(storage, p50, cost=10.0):
+    return {'size': 'demo', 'map_type': 'random', 'algorithm': 'a_star', 'storage': storage,
+            'latency_ms': {'p50': p50}, 'total_path_cost': cost}
+
+
+def test_mixed_storage_report_compares_each_backend():
+    baseline = {'results': [case('dense', 1.0), case('chunked', 4.0)]}
+    current = {'results': [case('dense', 1.05), case('chunked', 6.0)]}
+
+    assert compare_reports(baseline, current, 0.10) == ['demo/random/a_star/chunked: p50 4.00 ms -> 6.00 ms']
+    # The dense case is not measured against the slower chunked baseline
+    assert compare_reports(baseline, {'results': [case('dense', 3.0)]}, 0.10) == \
+        ['demo/random/a_star/dense: p50 1.00 ms -> 3.00 ms']
+
+
+def test_reports_without_case_storage_use_report_storage():
+    legacy_case = case('chunked', 4.0)
+    del legacy_case['storage']
+    legacy = {'storage': 'chunked', 'results': [legacy_case]}
+    current = {'results': [case('dense', 1.0), case('chunked', 4.0, cost=11.0)]}
+
+    assert compare_reports(legacy, current, 0.10) == ['demo/random/a_star/chunked: path cost 10.000 -> 11.000']
+
+
+def test_seeded_cases_are_reproducible_across_storage():
+    dense = build_map(35, 35, 5, 'buildings', seed=7)
+    chunked = build_map(35, 35, 5, 'buildings', seed=7, storage='chunked')
+    assert np.array_equal(dense.grid, np.asarray(chunked.grid))
+    queries = make_queries(dense, 3, seed=7)
+    assert queries == make_queries(chunked, 3, seed=7)
+
+    first = run_case(dense, 'a_star', queries, measure_memory=False)
+    again = run_case(build_map(35, 35, 5, 'buildings', seed=7), 'a_star', queries, measure_memory=False)
+    assert first['total_path_cost'] == again['total_path_cost']
+    assert first['nodes_explored'] == again['nodes_explored']
+    assert run_case(chunked, 'a_star', queries, measure_memory=False)['total_path_cost'] == first['total_path_cost']
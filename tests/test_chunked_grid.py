@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from components.chunked_grid import ChunkedGrid3DEnvironment, ChunkedVoxelStore
+from components.grid_environment_3d import Grid3DEnvironment
+from components.location_registry import reachable_mask, snap_route
+
+
+def paired_grids(shape=(6, 40, 50), seed=3):
+    levels, rows, cols = shape
+    rng = np.random.default_rng(seed)
+    obstacles = rng.random(shape) < 0.25
+    obstacles[:, 20:26, :] = False
+    obstacles[:4, :8, :8] = True
+    cars = rng.random(shape) < 0.02
+    dense = Grid3DEnvironment(rows, cols, levels)
+    chunked = ChunkedGrid3DEnvironment(rows, cols, levels, chunk_shape=(4, 8, 8))
+    for grid in (dense, chunked):
+        grid.add_obstacles(obstacles)
+        grid.add_cars(cars)
+    return dense, chunked
+
+
+def test_blocked_queries_match_dense_grid():
+    dense, chunked = paired_grids()
+    box = (1, 3, 5, 4, 30, 41)
+    assert np.array_equal(dense.blocked_mask(), chunked.blocked_mask())
+    assert np.array_equal(dense.blocked_mask(box), chunked.blocked_mask(box))
+    assert dense.blocked_bits() == chunked.blocked_bits()
+
+    for grid in (dense, chunked):
+        grid.remove_obstacle(2, 10, 10)
+        grid.add_obstacle(2, 22, 20)
+    for min_clearance in (0, 2, 3):
+        dense_lookup, chunked_lookup = dense.blocked_lookup(min_clearance), chunked.blocked_lookup(min_clearance)
+        for cell in np.ndindex(*dense.grid.shape):
+            assert bool(dense_lookup(*cell)) == bool(chunked_lookup(*cell)), (min_clearance, cell)
+
+
+def test_reachable_mask_and_snap_route_match_dense_grid():
+    dense, chunked = paired_grids()
+    for start in ((0, 22, 3), (3, 21, 40), (0, 1, 1)):
+        assert np.array_equal(reachable_mask(dense, start), np.asarray(chunked.reachable_mask(start)))
+    assert snap_route(dense, (0, 0), (39, 49)) == snap_route(chunked, (0, 0), (39, 49))
+
+
+def test_strided_reads():
+    dense, chunked = paired_grids()
+    for key in (np.s_[2, ::-1], np.s_[::-2, 5:40:3, ::7], np.s_[:, 10:2:-3]):
+        assert np.array_equal(dense.grid[key], chunked.grid[key])
+
+
+def test_voxel_store_keeps_only_mixed_chunks():
+    store = ChunkedVoxelStore((5, 20, 30), np.uint8, 0, chunk_shape=(2, 8, 8))
+    reference = np.zeros(store.shape, dtype=np.uint8)
+    assert store.nbytes == 0 and not store.chunks
+
+    for key, value in ((np.s_[0:2, 0:8, 0:8], 3), (np.s_[4, 19, 29], 1), (np.s_[1:5, 3:17, 2:30], 2)):
+        store[key] = value
+        reference[key] = value
+    mask = reference == 2
+    store[mask] = 6
+    reference[mask] = 6
+    store[np.array([0, 4]), np.array([0, 19]), np.array([0, 29])] = 0
+    reference[[0, 4], [0, 19], [0, 29]] = 0
+
+    assert np.array_equal(store.to_dense(), reference)
+    assert np.array_equal(store[1:4, ::3, 29], reference[1:4, ::3, 29])
+    # Chunks filled with one value collapse to scalars; fill-valued ones are dropped
+    assert store.chunk_value(store.chunk_id(2, 8, 8)) == 6
+    assert store.allocated_chunks() < store.chunk_count
+    assert ChunkedVoxelStore.from_array(reference, 0, (2, 8, 8)).chunks.keys() == store.chunks.keys()
+    with pytest.raises(IndexError):
+        store[::2, 0, 0] = 1
@@ -0,0 +1,23 @@
+import numpy as np
+from components.city_generator import CityGenerator, _generate_tile
+from components.grid_environment_3d import Grid3DEnvironment
+
+
+def test_same_seed_same_city_serial_or_parallel():
+    generator = CityGenerator(seed=11, tile_size=16)
+    serial = generator.height_map(50, 40, 6)
+    assert np.array_equal(serial, generator.height_map(50, 40, 6, workers=2))
+    assert not np.array_equal(serial, CityGenerator(seed=12, tile_size=16).height_map(50, 40, 6))
+    assert serial.max() <= 6 and np.all(serial[::16, :] == 0) and np.all(serial[:, ::16] == 0)
+
+    # Any tile can be regenerated on its own
+    tile_row, tile_col, tile = _generate_tile((11, 2, 1, 16, 16, 6, 1, generator.density))
+    assert np.array_equal(tile, serial[32:48, 16:32])
+
+
+def test_generate_city_is_reproducible():
+    first, second = Grid3DEnvironment(40, 40, 5), Grid3DEnvironment(40, 40, 5)
+    first.generate_city(3)
+    second.generate_city(3)
+    assert np.array_equal(first.grid, second.grid)
+    assert first.content_hash == second.content_hash != 0
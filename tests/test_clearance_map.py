@@ -0,0 +1,58 @@
+import numpy as np
+from components.chunked_grid import ChunkedGrid3DEnvironment
+from components.clearance_map import MAX_CLEARANCE
+from components.grid_environment_3d import Grid3DEnvironment
+from pathfinding_algorithms_3d import Pathfinding3DAlgorithms
+
+
+def brute_force_clearance(blocked):
+    # Chessboard distance to the nearest blocked cell on the same level
+    distance = np.full(blocked.shape, np.inf)
+    for z, row, col in np.argwhere(blocked):
+        rows, cols = np.indices(blocked.shape[1:])
+        distance[z] = np.minimum(distance[z], np.maximum(abs(rows - row), abs(cols - col)))
+    return distance
+
+
+def corridor_grids(width):
+    # Two levels split by a wall with a gap `width` cells wide
+    grids = (Grid3DEnvironment(40, 45, 2), ChunkedGrid3DEnvironment(40, 45, 2, chunk_shape=(1, 8, 8)))
+    wall = np.zeros((2, 40, 45), dtype=bool)
+    wall[:, 20, :] = True
+    wall[:, 20, 5:5 + width] = False
+    wall[1, 5:9, 30:33] = True
+    for grid in grids:
+        grid.add_obstacles(wall)
+    return grids
+
+
+def test_lookups_match_brute_force_beyond_default_cap():
+    grids = corridor_grids(23)
+    distance = brute_force_clearance(grids[0].blocked_mask())
+    for min_clearance in (2, 5, MAX_CLEARANCE, MAX_CLEARANCE + 4):
+        expected = distance < min_clearance
+        for grid in grids:
+            is_blocked = grid.blocked_lookup(min_clearance)
+            found = np.array([bool(is_blocked(*cell)) for cell in np.ndindex(*expected.shape)])
+            assert np.array_equal(found.reshape(expected.shape), expected), (type(grid).__name__, min_clearance)
+
+
+def test_clearance_follows_edits():
+    for grid in corridor_grids(23):
+        grid.blocked_lookup(3)
+        grid.add_obstacle(0, 10, 10)
+        grid.remove_obstacle(1, 6, 31)
+        distance = brute_force_clearance(grid.blocked_mask())
+        is_blocked = grid.blocked_lookup(3)
+        found = np.array([bool(is_blocked(*cell)) for cell in np.ndindex(*distance.shape)])
+        assert np.array_equal(found.reshape(distance.shape), distance < 3)
+
+
+def test_wide_vehicle_does_not_fit_a_narrow_gap():
+    # A gap of 2r + 1 cells fits a vehicle with min_clearance r + 1, but not r + 2
+    radius = MAX_CLEARANCE + 1
+    for grid in corridor_grids(2 * radius + 1):
+        pathfinder = Pathfinding3DAlgorithms(grid)
+        start, goal = (0, 5, 5 + radius), (0, 35, 5 + radius)
+        assert pathfinder.a_star(start, goal, min_clearance=radius + 1)[0]
+        assert pathfinder.a_star(start, goal, min_clearance=radius + 2)[0] == []
@@ -0,0 +1,126 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+import pytest
+from components.frame_layers import FrameLayers, GroundPlaneCache, vertical_gradient
+from components.tile_mosaic import MapPyramid
+
+SIZE = (120, 90)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def display():
+    pygame.display.init()
+    pygame.display.set_mode(SIZE)
+    yield
+    pygame.display.quit()
+
+
+def test_vertical_gradient_matches_per_row_lines():
+    top, bottom = (20, 30, 60), (200, 120, 40)
+    expected = pygame.Surface(SIZE)
+    for y in range(SIZE[1]):
+        ratio = y / SIZE[1]
+        color = tuple(int(t + (b - t) * ratio) for t, b in zip(top, bottom))
+        pygame.draw.line(expected, color, (0, y), (SIZE[0], y))
+    gradient = vertical_gradient(SIZE, top, bottom)
+    assert gradient.get_size() == SIZE
+    assert pygame.image.tobytes(gradient, 'RGB') == pygame.image.tobytes(expected, 'RGB')
+
+
+class Renderer:
+    def __init__(self, color=(30, 200, 30)):
+        self.color = color
+        self.calls = 0
+
+    def __call__(self, surface):
+        self.calls += 1
+        pygame.draw.circle(surface, self.color, (40, 30), 12)
+
+
+def frame(layers, key, render):
+    screen = pygame.Surface(SIZE)
+    screen.fill((10, 10, 80))
+    layers.blit(screen, 'scenery', key, render)
+    return pygame.image.tobytes(screen, 'RGB')
+
+
+def test_layer_renders_once_per_key_and_blits_like_direct_drawing():
+    layers, render = FrameLayers(SIZE), Renderer()
+    direct = pygame.Surface(SIZE)
+    direct.fill((10, 10, 80))
+    render(direct)
+    direct = pygame.image.tobytes(direct, 'RGB')
+    render.calls = 0
+
+    assert all(frame(layers, 'camera 1', render) == direct for _ in range(5))
+    assert render.calls == 1
+    surface, rect = layers.layer('scenery', 'camera 1', render)
+    # Blitted through the circle's bounding box only
+    assert rect.size == (24, 24) and render.calls == 1
+
+    layers.invalidate('scenery')
+    assert frame(layers, 'camera 1', render) == direct and render.calls == 2
+
+
+def test_changing_key_draws_straight_to_screen_until_it_settles():
+    layers, render = FrameLayers(SIZE), Renderer()
+    frame(layers, 'camera 1', render)
+    # Dragging: every frame has a new key, nothing is cached
+    for key in ('camera 2', 'camera 3', 'camera 4'):
+        frame(layers, key, render)
+    assert render.calls == 4
+    assert layers.layer('scenery', 'camera 1', render) and render.calls == 4
+
+    # The camera stops: the second request for camera 4 caches it, the third reuses it
+    frame(layers, 'camera 4', render)
+    frame(layers, 'camera 4', render)
+    assert render.calls == 5
+
+
+def map_surface(size=(256, 256)):
+    pixels = np.random.default_rng(0).integers(0, 256, size=size + (3,), dtype=np.uint8)
+    return pygame.surfarray.make_surface(pixels)
+
+
+def quad(shift=0):
+    return [(100 + shift, 20), (180 + shift, 60), (100 + shift, 100), (20 + shift, 60)]
+
+
+def test_ground_plane_is_cached_per_camera_and_map():
+    cache, background = GroundPlaneCache(cache_size=2), map_surface()
+    texture, origin = cache.get('camera 1', quad(), background)
+    assert origin == (20, 20) and texture.get_size() == (160, 80)
+    # Outside the quad is transparent, inside is the map
+    assert texture.get_at((0, 0)).a == 0 and texture.get_at((80, 40)).a == 255
+
+    assert cache.get('camera 1', quad(), background)[0] is texture
+    cache.get('camera 2', quad(5), background)
+    cache.get('camera 3', quad(10), background)
+    # Evicted as least recently used
+    assert cache.get('camera 1', quad(), background)[0] is not texture
+
+    texture = cache.get('camera 1', quad(), background)[0]
+    assert cache.get('camera 1', quad(), background, version=2)[0] is not texture
+
+
+def test_full_quality_plane_matches_direct_masking_and_preview_is_cheap():
+    background = map_surface()
+    pyramid = MapPyramid(background, min_size=32)
+    expected = pygame.Surface((160, 80), pygame.SRCALPHA)
+    expected.blit(pygame.transform.smoothscale(pyramid.surface_for(160, 80), (160, 80)), (0, 0))
+    mask = pygame.Surface((160, 80), pygame.SRCALPHA)
+    pygame.draw.polygon(mask, (255, 255, 255, 255), [(x - 20, y - 20) for x, y in quad()])
+    expected.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+
+    cache = GroundPlaneCache()
+    texture, _ = cache.get('camera 1', quad(), background, pyramid)
+    assert pygame.image.tobytes(texture, 'RGBA') == pygame.image.tobytes(expected, 'RGBA')
+
+    preview, origin = cache.get('camera 1', quad(), background, pyramid, preview=True)
+    assert preview is not texture and preview.get_size() == (160, 80) and origin == (20, 20)
+    assert cache.get('camera 1', quad(), background, pyramid)[0] is texture
@@ -0,0 +1,144 @@
+import numpy as np
+from components.chunked_grid import ChunkedGrid3DEnvironment
+from components.grid_environment_3d import Grid3DEnvironment
+
+
+def test_numpy_integer_coordinates():
+    grid = Grid3DEnvironment(10, 12, 3)
+    reference = Grid3DEnvironment(10, 12, 3)
+    mask = np.zeros(grid.grid.shape, dtype=bool)
+    mask[1, 4, 5] = mask[0, 6, 7] = True
+    car, obstacle = np.argwhere(mask)
+
+    grid.set_start(*np.array([0, 1, 2]))
+    grid.set_goal(*np.array([0, 8, 9]))
+    grid.add_obstacle(*obstacle)
+    grid.add_car(*car)
+    grid.set_terrain_cost(*np.array([0, 3, 3]), 2.5)
+    grid.remove_obstacle(*obstacle)
+
+    reference.set_start(0, 1, 2)
+    reference.set_goal(0, 8, 9)
+    reference.add_obstacle(1, 4, 5)
+    reference.add_car(0, 6, 7)
+    reference.set_terrain_cost(0, 3, 3, 2.5)
+    reference.remove_obstacle(1, 4, 5)
+
+    assert np.array_equal(grid.grid, reference.grid)
+    assert grid.content_hash == reference.content_hash == grid.compute_content_hash()
+    assert grid.start == (0, 1, 2) and all(type(v) is int for v in grid.start + grid.goal)
+
+
+def test_uint8_cells_and_packed_occupancy():
+    grid = Grid3DEnvironment(9, 11, 3)
+    assert grid.grid.dtype == np.uint8 and grid.grid.nbytes == 3 * 9 * 11
+    grid.add_obstacle(0, 2, 3)
+    grid.add_car(0, 8, 10)
+    grid.set_start(1, 0, 0)
+
+    bits = np.unpackbits(np.frombuffer(grid.blocked_bits(), dtype=np.uint8), count=grid.grid.size)
+    assert np.array_equal(bits.reshape(grid.grid.shape).astype(bool), grid.blocked_mask())
+    is_blocked = grid.blocked_lookup()
+    assert [cell for cell in np.ndindex(*grid.grid.shape) if is_blocked(*cell)] == [(0, 2, 3), (0, 8, 10)]
+
+    # The lookup is bound to its revision; edits show up in the next one
+    grid.remove_obstacle(0, 2, 3)
+    assert is_blocked(0, 2, 3) and not grid.blocked_lookup()(0, 2, 3)
+
+
+def test_path_overlay_leaves_occupancy_untouched():
+    grid = Grid3DEnvironment(8, 8, 2)
+    grid.set_start(0, 0, 0)
+    grid.set_goal(0, 0, 3)
+    grid.add_obstacle(0, 1, 1)
+    cells, revision, digest = grid.grid.copy(), grid.revision, grid.content_hash
+
+    grid.mark_explored([(0, 0, 1), (0, 1, 1), (0, 2, 2), (0, 2, 2)])
+    grid.mark_path([(0, 0, 0), (0, 0, 1), (0, 0, 2), (0, 0, 3)])
+    assert np.array_equal(grid.grid, cells)
+    assert grid.revision == revision and grid.content_hash == digest
+    # Path wins over explored; endpoints and obstacles stay unmarked
+    assert np.argwhere(grid.overlay == grid.PATH).tolist() == [[0, 0, 1], [0, 0, 2]]
+    assert np.argwhere(grid.overlay == grid.EXPLORED).tolist() == [[0, 2, 2]]
+
+    grid.clear_path_visualization()
+    assert not grid.overlay.any()
+
+
+def test_paint_terrain_cost_with_region_shaped_costs():
+    for grid in (Grid3DEnvironment(6, 7, 3), ChunkedGrid3DEnvironment(6, 7, 3, chunk_shape=(2, 4, 4))):
+        grid.add_obstacle(0, 3, 3)
+        expected = np.ones(grid.grid.shape)
+
+        block = np.arange(9, dtype=float).reshape(1, 3, 3) + 2
+        grid.paint_terrain_cost((slice(0, 1), slice(2, 5), slice(2, 5)), block)
+        expected[0:1, 2:5, 2:5] = block
+        expected[0, 3, 3] = 1.0
+
+        strided = np.full((2, 3, 2), 7.0)
+        grid.paint_terrain_cost((slice(None, None, 2), slice(0, 6, 2), slice(5, 7)), strided)
+        expected[::2, 0:6:2, 5:7] = strided
+
+        level = np.zeros((6, 7), dtype=bool)
+        level[5] = True
+        whole = np.random.default_rng(1).random(grid.grid.shape)
+        grid.paint_terrain_cost(level, whole, z=1)
+        expected[1, 5] = whole[1, 5]
+
+        assert np.array_equal(np.asarray(grid.terrain_costs), expected)
+        assert grid.content_hash == grid.compute_content_hash()
+
+
+def test_bulk_edits_match_single_cell_edits():
+    rng = np.random.default_rng(4)
+    bulk, single = Grid3DEnvironment(12, 10, 4), Grid3DEnvironment(12, 10, 4)
+    for grid in (bulk, single):
+        grid.set_start(0, 0, 0)
+        grid.set_goal(3, 11, 9)
+    obstacles = rng.random(bulk.grid.shape) < 0.3
+    obstacles[0, 0, 0] = obstacles[3, 11, 9] = True
+    cars = np.argwhere(rng.random(bulk.grid.shape) < 0.1)
+    removed = np.argwhere(obstacles)[::3]
+    heights = rng.integers(0, 6, size=(12, 10))
+
+    bulk.add_obstacles(obstacles)
+    bulk.add_cars(cars)
+    bulk.remove_obstacles(removed)
+    bulk.extrude_columns(heights, base_z=1)
+    for cell in np.argwhere(obstacles):
+        single.add_obstacle(*cell)
+    for cell in cars:
+        single.add_car(*cell)
+    for cell in removed:
+        single.remove_obstacle(*cell)
+    for row, col in np.argwhere(heights > 0):
+        for z in range(1, min(1 + heights[row, col], 4)):
+            single.add_obstacle(z, row, col)
+
+    assert np.array_equal(bulk.grid, single.grid)
+    assert bulk.grid[0, 0, 0] == bulk.START and bulk.grid[3, 11, 9] == bulk.GOAL
+    assert bulk.content_hash == single.content_hash == bulk.compute_content_hash()
+
+
+def test_revision_journal_and_content_hash():
+    grid = Grid3DEnvironment(10, 10, 2)
+    revision = grid.revision
+    grid.add_obstacle(1, 2, 3)
+    mask = np.zeros(grid.grid.shape, dtype=bool)
+    mask[0, 4:6, 7] = True
+    grid.add_obstacles(mask)
+    assert grid.revision == revision + 2
+    assert grid.changes_since(revision) == [(1, 2, 3, 2, 3, 4), (0, 4, 7, 1, 6, 8)]
+    assert grid.changes_since(grid.revision) == []
+
+    # Same content reached in another order hashes the same; undoing it returns to zero
+    other = Grid3DEnvironment(10, 10, 2)
+    other.add_obstacles(mask)
+    other.add_obstacle(1, 2, 3)
+    assert grid.content_hash == other.content_hash == grid.compute_content_hash() != 0
+    grid.remove_obstacles(np.argwhere(grid.grid == grid.OBSTACLE))
+    assert grid.content_hash == 0
+
+    for _ in range(Grid3DEnvironment.JOURNAL_SIZE):
+        grid.set_terrain_cost(0, 0, 0, 2.0)
+    assert grid.changes_since(revision) is None
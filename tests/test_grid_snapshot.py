@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from components.grid_environment_3d import Grid3DEnvironment
+from components.grid_snapshot import SNAPSHOT_VERSION, load_snapshot
+
+
+def scenario():
+    grid = Grid3DEnvironment(20, 30, 3)
+    rng = np.random.default_rng(2)
+    grid.add_obstacles(rng.random(grid.grid.shape) < 0.2)
+    grid.paint_terrain_cost(np.ones((20, 30), dtype=bool), rng.random((20, 30)) + 1)
+    grid.set_elevation(rng.integers(0, 3, size=(20, 30)).astype(float))
+    grid.set_start(0, 0, 0)
+    grid.set_goal(2, 19, 29)
+    return grid
+
+
+@pytest.mark.parametrize('mode', ['compressed', 'mmap'])
+def test_snapshot_round_trip(tmp_path, mode):
+    grid = scenario()
+    path = grid.save_snapshot(str(tmp_path / 'scenario'), mode=mode)
+    loaded = load_snapshot(path)
+
+    for name in ('grid', 'terrain_costs', 'elevation'):
+        assert np.array_equal(getattr(loaded, name), getattr(grid, name)), name
+    assert loaded.grid.dtype == np.uint8
+    assert (loaded.start, loaded.goal) == (grid.start, grid.goal)
+    assert loaded.content_hash == grid.content_hash == loaded.compute_content_hash()
+    if mode == 'mmap':
+        assert isinstance(loaded.grid, np.memmap)
+
+
+def test_legacy_and_future_snapshots(tmp_path):
+    # A v0 snapshot: an int grid without version, costs or elevation
+    cells = np.zeros((2, 4, 5), dtype=np.int64)
+    cells[1, 2, 3] = Grid3DEnvironment.OBSTACLE
+    np.savez_compressed(tmp_path / 'v0.npz', grid=cells)
+    loaded = load_snapshot(str(tmp_path / 'v0.npz'))
+    assert loaded.grid.dtype == np.uint8 and loaded.grid[1, 2, 3] == Grid3DEnvironment.OBSTACLE
+    assert np.all(loaded.terrain_costs == 1.0) and loaded.content_hash == loaded.compute_content_hash()
+
+    np.savez_compressed(tmp_path / 'future.npz', grid=cells.astype(np.uint8),
+                        meta=np.array('{"version": %d}' % (SNAPSHOT_VERSION + 1)))
+    with pytest.raises(ValueError):
+        load_snapshot(str(tmp_path / 'future.npz'))
+
+
+def test_mmap_snapshot_saved_over_itself(tmp_path):
+    path = str(tmp_path / 'scenario')
+    grid = Grid3DEnvironment(40, 50, 4)
+    grid.add_obstacles(np.random.default_rng(0).random(grid.grid.shape) < 0.2)
+    grid.set_start(0, 1, 1)
+    grid.save_snapshot(path, mode='mmap')
+
+    # F9 then F5: the live grid memory-maps the files it is saved back over
+    grid.restore_snapshot(path)
+    grid.set_goal(0, 38, 48)
+    expected = np.array(grid.grid)
+    grid.save_snapshot(path, mode='mmap')
+
+    assert np.array_equal(grid.grid, expected)
+    loaded = load_snapshot(path)
+    assert np.array_equal(loaded.grid, expected)
+    assert loaded.goal == (0, 38, 48)
+    assert loaded.content_hash == grid.content_hash
@@ -0,0 +1,59 @@
+import math
+import numpy as np
+import pytest
+from components.iso_projection import IsoProjection
+
+ROWS, COLS, LEVELS = 7, 9, 4
+CAMERAS = [(45, 30, 1.0), (-120.5, 62, 2.5), (0, 0, 0.4)]
+
+
+def scalar_cart_to_iso(x, y, z, yaw, pitch, distance, tile_width=40, tile_height=20, offset_x=300, offset_y=150):
+    """The visualizer's per-point cart_to_iso the projection replaced."""
+    cx, cy, cz = COLS / 2, ROWS / 2, LEVELS / 2
+    x_rel = x - cx
+    y_rel = y - cy
+    z_rel = z - cz
+    yaw_rad = math.radians(yaw)
+    cos_yaw = math.cos(yaw_rad)
+    sin_yaw = math.sin(yaw_rad)
+    x_yaw = x_rel * cos_yaw - y_rel * sin_yaw
+    y_yaw = x_rel * sin_yaw + y_rel * cos_yaw
+    z_yaw = z_rel
+    pitch_rad = math.radians(pitch)
+    cos_pitch = math.cos(pitch_rad)
+    sin_pitch = math.sin(pitch_rad)
+    x_final = x_yaw
+    y_final = y_yaw * cos_pitch - z_yaw * sin_pitch
+    z_final = y_yaw * sin_pitch + z_yaw * cos_pitch
+    scale = tile_width / 2 * distance
+    iso_x = (x_final - y_final) * scale + offset_x
+    iso_y = (x_final + y_final) * tile_height / 2 * distance - z_final * tile_height * 2 * distance + offset_y
+    return iso_x, iso_y
+
+
+@pytest.mark.parametrize('yaw, pitch, distance', CAMERAS)
+def test_lattice_matches_scalar_projection_exactly(yaw, pitch, distance):
+    projection = IsoProjection(ROWS, COLS, LEVELS, yaw, pitch, distance, 40, 20, 300, 150)
+    for z in range(LEVELS):
+        corners, centres = projection.corners(z), projection.centres(z)
+        assert corners.shape == (ROWS + 1, COLS + 1, 2) and centres.shape == (ROWS, COLS, 2)
+        for row in range(ROWS + 1):
+            for col in range(COLS + 1):
+                assert tuple(corners[row, col]) == scalar_cart_to_iso(col, row, z, yaw, pitch, distance)
+                if row < ROWS and col < COLS:
+                    assert tuple(centres[row, col]) == scalar_cart_to_iso(col + 0.5, row + 0.5, z, yaw, pitch, distance)
+    assert projection.project(2.25, 3.5, 1.75) == scalar_cart_to_iso(2.25, 3.5, 1.75, yaw, pitch, distance)
+    # Levels are projected once per camera
+    assert projection.corners(1) is projection.corners(1)
+
+
+def test_quads_follow_cart_to_iso_winding():
+    yaw, pitch, distance = CAMERAS[1]
+    projection = IsoProjection(ROWS, COLS, LEVELS, yaw, pitch, distance, 40, 20, 300, 150)
+    cells = np.array([[0, 0, 0], [3, 6, 8], [1, 2, 5], [0, 4, 1]])
+    quads = projection.quads(cells)
+    assert quads.shape == (4, 4, 2)
+    for (z, row, col), quad in zip(cells, quads):
+        expected = [scalar_cart_to_iso(c, r, z, yaw, pitch, distance)
+                    for c, r in ((col, row), (col + 1, row), (col + 1, row + 1), (col, row + 1))]
+        assert [tuple(point) for point in quad] == expected
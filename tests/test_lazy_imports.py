@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+from benchmark import DISPLAY_MODULES
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modules_loaded_by(code):
+    # A fresh interpreter, so modules imported by other tests don't count
+    snippet = f"import sys, json\n{code}\nprint(json.dumps([m for m in {DISPLAY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, '-c', snippet], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_solver_imports_without_display_modules():
+    assert modules_loaded_by(
+        "from pathfinding_algorithms_3d import Pathfinding3DAlgorithms\n"
+        "from components import Grid3DEnvironment, ChunkedGrid3DEnvironment\n"
+        "grid = Grid3DEnvironment(10, 10, 2)\n"
+        "Pathfinding3DAlgorithms(grid).a_star((0, 0, 0), (1, 9, 9))"
+    ) == []
+
+
+def test_package_attributes_load_on_first_access():
+    assert 'pygame' in modules_loaded_by("import components\ncomponents.Button")
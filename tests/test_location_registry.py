@@ -0,0 +1,95 @@
+import json
+import math
+import numpy as np
+import pytest
+from components.chunked_grid import ChunkedGrid3DEnvironment
+from components.grid_environment_3d import Grid3DEnvironment
+from components.location_registry import (EARTH_CIRCUMFERENCE, GridProjection, LocationRegistry,
+                                          nearest_cell, reachable_mask, snap_route, web_mercator)
+
+
+def random_registry(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    return LocationRegistry([f'poi {i}' for i in range(n)],
+                            25.0 + rng.random(n) * 0.3, 55.0 + rng.random(n) * 0.4)
+
+
+def brute_force_metres(registry, lat, lon):
+    x, y = web_mercator(registry.lat, registry.lon)
+    qx, qy = web_mercator(lat, lon)
+    return np.hypot(x - qx, y - qy) * EARTH_CIRCUMFERENCE * math.cos(math.radians(lat))
+
+
+def test_nearest_and_within_match_brute_force():
+    registry = random_registry()
+    rng = np.random.default_rng(1)
+    # Some queries fall outside the points' extent
+    for lat, lon in zip(24.9 + rng.random(20) * 0.5, 54.9 + rng.random(20) * 0.6):
+        distances = brute_force_metres(registry, lat, lon)
+        order = np.argsort(distances, kind='stable')
+        nearest = registry.nearest(lat, lon, k=5)
+        assert [name for name, _ in nearest] == [registry.names[i] for i in order[:5]]
+        assert [d for _, d in nearest] == pytest.approx(distances[order[:5]].tolist())
+
+        # Halfway between two points, so rounding cannot move one across the edge
+        radius = float(distances[order[30]] + distances[order[31]]) / 2
+        within = registry.within(lat, lon, radius)
+        assert sorted(name for name, _ in within) == sorted(registry.names[i] for i in np.flatnonzero(distances <= radius))
+        assert [d for _, d in within] == sorted(d for _, d in within)
+
+
+def test_load_formats_and_batch_cells(tmp_path):
+    expected = {'Souk': (25.26, 55.30), 'Marina': (25.08, 55.14)}
+    (tmp_path / 'places.csv').write_text('Name,Latitude,Longitude\nSouk,25.26,55.30\nMarina,25.08,55.14\nSouk,0,0\n')
+    (tmp_path / 'places.json').write_text(json.dumps({name: list(pos) for name, pos in expected.items()}))
+    (tmp_path / 'list.json').write_text(json.dumps([{'name': n, 'lat': a, 'lon': o} for n, (a, o) in expected.items()]))
+    (tmp_path / 'places.geojson').write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]}, 'properties': {'name': name}}
+        for name, (lat, lon) in expected.items()]}))
+    for name in ('places.csv', 'places.json', 'list.json', 'places.geojson'):
+        registry = LocationRegistry.load(str(tmp_path / name))
+        assert dict(registry.items()) == expected, name
+
+    (tmp_path / 'empty.json').write_text('{}')
+    with pytest.raises(ValueError):
+        LocationRegistry.load(str(tmp_path / 'empty.json'))
+
+    projection = GridProjection.from_bounds((25.0, 55.0, 25.3, 55.4), 30, 40)
+    rows, cols = registry.cells(projection)
+    assert list(zip(rows.tolist(), cols.tolist())) == \
+        [tuple(int(v) for v in projection.cells(*registry[name])) for name in registry]
+
+
+def test_nearest_cell_matches_brute_force():
+    rng = np.random.default_rng(3)
+    mask = rng.random((40, 60)) < 0.02
+    cells = np.argwhere(mask)
+    for row, col in rng.integers(-5, 65, size=(50, 2)):
+        found = nearest_cell(mask, row, col)
+        clamped = np.array([min(max(row, 0), 39), min(max(col, 0), 59)])
+        best = ((cells - clamped) ** 2).sum(axis=1).min()
+        assert mask[found] and ((np.array(found) - clamped) ** 2).sum() == best
+    assert nearest_cell(np.zeros((5, 5), dtype=bool), 2, 2) is None
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_snap_route_lands_on_reachable_open_cells(chunked):
+    grid = ChunkedGrid3DEnvironment(30, 30, 2, chunk_shape=(1, 8, 8)) if chunked else Grid3DEnvironment(30, 30, 2)
+    blocked = np.zeros(grid.grid.shape, dtype=bool)
+    # A building over the start and a walled courtyard around the goal, closed on every level
+    blocked[0, 3:8, 3:8] = True
+    blocked[:, 18:27, 18] = blocked[:, 18:27, 26] = True
+    blocked[:, 18, 18:27] = blocked[:, 26, 18:27] = True
+    grid.add_obstacles(blocked)
+
+    start, goal = snap_route(grid, (5, 5), (22, 22))
+    # Nearest open cell to the start, then the nearest cell outside the courtyard
+    assert start[0] == 0 and not blocked[start] and (start[1] - 5) ** 2 + (start[2] - 5) ** 2 == 9
+    assert goal[0] == 0 and (goal[1] - 22) ** 2 + (goal[2] - 22) ** 2 == 25
+    dense = Grid3DEnvironment(30, 30, 2)
+    dense.add_obstacles(blocked)
+    assert reachable_mask(dense, start)[goal]
+
+    blocked[0] = True
+    grid.add_obstacles(blocked)
+    assert snap_route(grid, (5, 5), (22, 22)) is None
@@ -0,0 +1,42 @@
+import pytest
+from components.map_load_worker import MapLoadWorker
+from components.map_loader import OSMMapLoader
+from components.tile_fetcher import TileFetcher
+from components.tile_mosaic import TileMosaic
+from tests.test_tile_fetcher import TileServer
+
+MARINA = (25.07, 55.13, 25.09, 55.15)
+DOWNTOWN = (25.18, 55.26, 25.20, 55.28)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fetcher = TileFetcher('http://tiles.test/{z}/{x}/{y}', max_workers=4, rate=1000, cache_dir=None)
+    fetcher.session = server = TileServer(delay=0.01)
+    # Restored afterwards, so other tests get the real shared fetcher back
+    monkeypatch.setattr(OSMMapLoader, 'tile_fetcher', fetcher)
+    monkeypatch.setattr(OSMMapLoader, 'mosaic', TileMosaic(fetcher))
+    monkeypatch.setattr(OSMMapLoader, 'rasterizer', None)
+    return server
+
+
+def test_map_loads_in_background_with_progress(server):
+    job = MapLoadWorker().submit_bbox_map(MARINA, 20, 20)
+    assert job.wait(10)
+    assert job.error is None and not job.cancelled
+    assert job.result is job.surface
+    assert job.tiles_total > 1 and job.tiles_done == job.tiles_total == len(server.requests)
+    assert job.terrain is not None and job.terrain.fractions.shape[:2] == (20, 20)
+
+
+def test_new_selection_cancels_the_load_in_flight(server):
+    server.delay = 0.05
+    worker = MapLoadWorker()
+    first = worker.submit_bbox_map(MARINA, 35, 35)
+    second = worker.submit_bbox_map(DOWNTOWN, 20, 20)
+
+    assert first.cancelled and first.wait(10)
+    assert first.result is None and first.terrain is None
+    assert first.tiles_done < first.tiles_total
+    assert second.wait(10) and second.result is not None
+    assert worker.current_job is second
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from components.grid_environment_3d import Grid3DEnvironment
+from components.location_registry import reachable_mask
+from components.map_loader import OSMMapLoader
+from components.location_registry import web_mercator
+from components.map_rasterizer import BUILDING, CLASS_NAMES, LAND, MapTerrain
+
+
+def test_finish_map_snaps_endpoints_off_buildings():
+    rows = cols = 20
+    fractions = np.zeros((rows, cols, len(CLASS_NAMES)))
+    fractions[..., LAND] = 1.0
+    # Building blocks over both default endpoints, (2, 2) and (17, 17)
+    buildings = np.zeros((rows, cols), dtype=bool)
+    buildings[:5, :5] = True
+    buildings[12:, 12:] = True
+    fractions[buildings] = 0.0
+    fractions[buildings, BUILDING] = 1.0
+    grid = Grid3DEnvironment(rows, cols, 4)
+
+    OSMMapLoader.finish_map(grid, rows, cols, object(), MapTerrain(fractions))
+
+    assert not buildings[grid.start[1:]] and not buildings[grid.goal[1:]]
+    assert reachable_mask(grid, grid.start)[grid.goal]
+    assert grid.grid[grid.start] == Grid3DEnvironment.START
+    assert grid.grid[grid.goal] == Grid3DEnvironment.GOAL
+
+
+@pytest.mark.parametrize('bbox, rows, cols', [
+    (OSMMapLoader.DUBAI_BBOX, 35, 35),
+    # Taller than the grid's aspect, so it is widened
+    ((25.10, 55.20, 25.20, 55.22), 20, 40),
+    ((25.00, 55.00, 25.90, 56.50), 60, 60),
+])
+def test_bbox_view_fits_the_lowest_sufficient_zoom(bbox, rows, cols):
+    zoom, left, top, width, height = OSMMapLoader.bbox_view(bbox, rows, cols)
+    # Square cells of at least MIN_PIXELS_PER_CELL, which one zoom level less would miss
+    assert width / cols == pytest.approx(height / rows, rel=0.02)
+    assert OSMMapLoader.MIN_PIXELS_PER_CELL <= width / cols < 2 * OSMMapLoader.MIN_PIXELS_PER_CELL + 1
+
+    # The whole box is inside the crop
+    (x0, x1), (y0, y1) = web_mercator([bbox[2], bbox[0]], [bbox[1], bbox[3]])
+    scale = 256 * 2 ** zoom
+    assert left <= x0 * scale + 1 and x1 * scale <= left + width + 1
+    assert top <= y0 * scale + 1 and y1 * scale <= top + height + 1
+
+
+def test_bbox_view_matches_the_old_dubai_crop_and_caps_zoom():
+    zoom, _, _, width, height = OSMMapLoader.bbox_view(OSMMapLoader.DUBAI_BBOX, 35, 35)
+    assert zoom == 13 and abs(width - 1200) <= 1 and abs(height - 1200) <= 1
+    assert OSMMapLoader.bbox_view((25.0, 55.0, 25.0001, 55.0001), 35, 35)[0] == OSMMapLoader.MAX_ZOOM
+    assert OSMMapLoader.bbox_view(OSMMapLoader.DUBAI_BBOX, 35, 35, max_zoom=10)[0] == 10
+
+
+def test_view_cell_places_bbox_corners_on_the_grid():
+    bbox = OSMMapLoader.DUBAI_BBOX
+    view = OSMMapLoader.bbox_view(bbox, 35, 35)
+    assert OSMMapLoader.view_cell(view, bbox[2], bbox[1], 35, 35) == (0, 0)
+    assert OSMMapLoader.view_cell(view, bbox[0], bbox[3], 35, 35) == (34, 34)
+    # Points off the map are clamped onto its edge
+    assert OSMMapLoader.view_cell(view, 0.0, 0.0, 35, 35) == (34, 0)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from components.grid_environment_3d import Grid3DEnvironment
+from components.map_rasterizer import (BUILDING, CLASS_COSTS, CLASS_NAMES, LAND, PARK, ROAD, WATER,
+                                       MapRasterizer, MapTerrain, class_fractions, classify_pixels)
+
+COLORS = {ROAD: (255, 255, 255), BUILDING: (217, 208, 201), WATER: (170, 211, 223), PARK: (200, 250, 204)}
+
+
+def test_classify_pixels_by_nearest_palette_colour():
+    pixels = np.array([[(250, 252, 255), (215, 210, 200), (172, 209, 225)],
+                       [(201, 248, 206), (242, 239, 233), (20, 20, 20)]], dtype=np.uint8)
+    assert classify_pixels(pixels).tolist() == [[ROAD, BUILDING, WATER], [PARK, LAND, LAND]]
+
+
+def test_class_fractions_per_cell():
+    labels = np.full((4, 6), LAND, dtype=np.uint8)
+    labels[:2, :3] = ROAD
+    labels[2:, 3:5] = WATER
+    fractions = class_fractions(labels, 2, 2)
+    assert fractions.shape == (2, 2, len(CLASS_NAMES))
+    assert np.allclose(fractions.sum(axis=-1), 1.0)
+    assert fractions[0, 0, ROAD] == 1.0 and fractions[0, 1, LAND] == 1.0
+    assert fractions[1, 1, WATER] == pytest.approx(2 / 3)
+
+
+def test_terrain_paints_costs_and_extrudes_buildings():
+    fractions = np.zeros((3, 4, len(CLASS_NAMES)))
+    fractions[..., LAND] = 1.0
+    fractions[0, :, :] = 0.0
+    fractions[0, :, ROAD] = 1.0
+    fractions[1, 1] = 0.0
+    fractions[1, 1, BUILDING] = 1.0
+    # Mostly building, but the road strip wins
+    fractions[1, 2] = 0.0
+    fractions[1, 2, [ROAD, BUILDING]] = (0.2, 0.8)
+    fractions[2, 3] = 0.0
+    fractions[2, 3, WATER] = 1.0
+    terrain = MapTerrain(fractions)
+    assert terrain.summary() == {'land': 5, 'road': 4, 'building': 2, 'water': 1, 'park': 0}
+
+    grid = Grid3DEnvironment(3, 4, 4)
+    terrain.apply(grid)
+    assert np.allclose(grid.terrain_costs[0, 0], CLASS_COSTS[ROAD])
+    assert grid.terrain_costs[0, 1, 2] == CLASS_COSTS[ROAD]
+    assert grid.terrain_costs[0, 2, 3] == CLASS_COSTS[WATER]
+    column = grid.grid[:, 1, 1] == Grid3DEnvironment.OBSTACLE
+    assert column.tolist() == [True, True, False, False]
+    assert np.count_nonzero(grid.grid == Grid3DEnvironment.OBSTACLE) == 2
+
+    with pytest.raises(ValueError):
+        terrain.apply(Grid3DEnvironment(4, 4, 4))
+
+
+class StubMosaic:
+    """Serves a fixed crop and counts how often it is asked for one."""
+
+    class fetcher:
+        url_template = 'http://tiles.test/{z}/{x}/{y}'
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.builds = []
+
+    def build_array(self, zoom, left, top, width, height, contrast=1.4, sharpness=2.0, cancelled=None):
+        self.builds.append((contrast, sharpness))
+        if cancelled is not None and cancelled():
+            return None
+        return self.pixels[:height, :width]
+
+
+def test_rasterizer_uses_raw_colours_and_caches_per_grid_size():
+    pixels = np.empty((40, 40, 3), dtype=np.uint8)
+    pixels[...] = COLORS[PARK]
+    pixels[:, :20] = COLORS[ROAD]
+    mosaic = StubMosaic(pixels)
+    rasterizer = MapRasterizer(mosaic)
+
+    assert rasterizer.rasterize(15, 0, 0, 40, 40, 4, 4, cancelled=lambda: True) is None
+    terrain = rasterizer.rasterize(15, 0, 0, 40, 40, 4, 4)
+    assert mosaic.builds[-1] == (1.0, 1.0)
+    assert np.all(terrain.costs[:, :2] == CLASS_COSTS[ROAD])
+    assert np.all(terrain.costs[:, 2:] == CLASS_COSTS[PARK])
+
+    assert rasterizer.rasterize(15, 0, 0, 40, 40, 4, 4) is terrain
+    assert len(mosaic.builds) == 2
+    assert rasterizer.rasterize(15, 0, 0, 40, 40, 8, 8).costs.shape == (8, 8)
+    assert len(mosaic.builds) == 3
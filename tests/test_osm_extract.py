@@ -0,0 +1,76 @@
+import gzip
+import numpy as np
+import pytest
+from components.grid_environment_3d import Grid3DEnvironment
+from components.map_rasterizer import BUILDING, CLASS_COSTS, PARK, ROAD
+from components import osm_extract
+from components.osm_extract import import_osm_extract, read_osm_extract
+
+# A 0.02 degree square on the equator: on a 20x20 grid each cell is 0.001 degrees
+NODES = {
+    # Road along row 9
+    1: (0.0105, 0.0005), 2: (0.0105, 0.0195),
+    # Building over rows 13-16 and columns 3-6
+    3: (0.007, 0.003), 4: (0.007, 0.007), 5: (0.003, 0.007), 6: (0.003, 0.003),
+    # Park over rows 2-3 and columns 14-17
+    7: (0.018, 0.014), 8: (0.018, 0.018), 9: (0.016, 0.018), 10: (0.016, 0.014),
+    11: (0.0055, 0.0155),
+}
+
+
+def write_extract(path):
+    nodes = ''.join(f'<node id="{i}" lat="{lat}" lon="{lon}"/>' for i, (lat, lon) in NODES.items() if i != 11)
+    xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <bounds minlat="0" minlon="0" maxlat="0.02" maxlon="0.02"/>
+  {nodes}
+  <node id="11" lat="0.0055" lon="0.0155"><tag k="name" v="Old Souk"/><tag k="amenity" v="marketplace"/></node>
+  <node id="12" lat="0.006" lon="0.016"><tag k="name" v="Bus shelter"/></node>
+  <way id="100"><nd ref="1"/><nd ref="2"/><tag k="highway" v="primary"/></way>
+  <way id="101"><nd ref="3"/><nd ref="4"/><nd ref="5"/><nd ref="6"/><nd ref="3"/>
+    <tag k="building" v="yes"/><tag k="building:levels" v="7"/></way>
+  <way id="102"><nd ref="7"/><nd ref="8"/><nd ref="9"/><nd ref="10"/><nd ref="7"/><tag k="leisure" v="park"/></way>
+  <way id="103"><nd ref="1"/><nd ref="999"/><tag k="highway" v="service"/></way>
+  <way id="104"><nd ref="1"/><nd ref="3"/><tag k="power" v="line"/></way>
+</osm>
+"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt') as f:
+        f.write(xml)
+    return path
+
+
+@pytest.mark.parametrize('name', ['city.osm', 'city.osm.gz'])
+def test_read_extract_keeps_mapped_ways_and_named_landmarks(tmp_path, monkeypatch, name):
+    # Tiny node batches, so the streamed coordinates are merged across several flushes
+    monkeypatch.setattr(osm_extract, 'NODE_BATCH', 3)
+    extract = read_osm_extract(write_extract(str(tmp_path / name)))
+    assert extract.bounds == (0.0, 0.0, 0.02, 0.02)
+    # The untagged power line is skipped, the road clipped to one node dropped
+    assert extract.way_classes.tolist() == [ROAD, BUILDING, PARK]
+    assert extract.way_levels.tolist() == [0, 3, 0]
+    assert extract.way_offsets.tolist() == [0, 2, 7, 12]
+    assert extract.locations == {'Old Souk': (0.0055, 0.0155)}
+
+
+def test_import_rasterizes_and_caches_the_grid(tmp_path, capsys):
+    path = write_extract(str(tmp_path / 'city.osm'))
+    grid = Grid3DEnvironment(20, 20, 4)
+    places = import_osm_extract(grid, path, cache_dir=str(tmp_path / 'cache'))
+
+    assert np.all(grid.terrain_costs[0, 9, 1:19] == CLASS_COSTS[ROAD])
+    assert np.all(grid.terrain_costs[0, 2:4, 14:18] == CLASS_COSTS[PARK])
+    building = np.zeros((20, 20), dtype=bool)
+    building[13:17, 3:7] = True
+    assert np.array_equal(grid.grid[0] == Grid3DEnvironment.OBSTACLE, building)
+    assert np.all(grid.grid[:3, 15, 5] == Grid3DEnvironment.OBSTACLE) and grid.grid[3, 15, 5] == Grid3DEnvironment.EMPTY
+    row, col = places.project(*places.locations['Old Souk'], 20, 20)
+    assert (int(row), int(col)) == (14, 15)
+
+    expected = np.array(grid.grid), np.array(grid.terrain_costs)
+    cached = Grid3DEnvironment(20, 20, 4)
+    capsys.readouterr()
+    places = import_osm_extract(cached, path, cache_dir=str(tmp_path / 'cache'))
+    assert 'extract cache' in capsys.readouterr().out
+    assert np.array_equal(cached.grid, expected[0]) and np.array_equal(cached.terrain_costs, expected[1])
+    assert places.locations == {'Old Souk': (0.0055, 0.0155)}
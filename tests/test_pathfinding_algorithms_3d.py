@@ -0,0 +1,105 @@
+import gc
+import tracemalloc
+import numpy as np
+from components.grid_environment_3d import Grid3DEnvironment
+from pathfinding_algorithms_3d import Pathfinding3DAlgorithms
+from pathfinding_worker import PathfindingWorker
+
+START, GOAL = (0, 1, 1), (0, 18, 18)
+
+
+def walled_grid():
+    grid = Grid3DEnvironment(20, 20, 3)
+    # A wall across level 0 with one gap, so the search has to detour
+    wall = np.zeros(grid.grid.shape, dtype=bool)
+    wall[0, 10, :19] = True
+    grid.add_obstacles(wall)
+    return grid
+
+
+def test_stepped_search_matches_one_shot_search():
+    grid = walled_grid()
+    pathfinder = Pathfinding3DAlgorithms(grid)
+    for algorithm in ('dijkstra', 'a_star'):
+        path, metrics = getattr(pathfinder, algorithm)(START, GOAL)
+
+        stepper = pathfinder.stepper(START, GOAL, algorithm)
+        slices = []
+        while not stepper.done:
+            progress = stepper.step(10)
+            assert len(progress['new_nodes']) <= 10
+            slices.append(progress)
+        assert slices[-1]['done'] and slices[-1]['found']
+        assert len(slices) > 1 and not any(p['done'] for p in slices[:-1])
+        assert stepper.path == path
+        assert stepper.metrics['explored_nodes'] == metrics['explored_nodes']
+
+
+def test_send_changes_the_next_slice_budget():
+    steps = Pathfinding3DAlgorithms(walled_grid()).dijkstra_steps(START, GOAL, batch_size=5)
+    assert len(next(steps)['new_nodes']) == 5
+    assert len(steps.send(40)['new_nodes']) == 40
+    assert len(next(steps)['new_nodes']) == 40
+
+
+def test_interleaved_searches_on_one_instance_are_independent():
+    pathfinder = Pathfinding3DAlgorithms(walled_grid())
+    expected = [pathfinder.a_star(START, GOAL)[0], pathfinder.dijkstra(GOAL, START)[0]]
+
+    steppers = [pathfinder.stepper(START, GOAL, 'a_star'), pathfinder.stepper(GOAL, START, 'dijkstra')]
+    while not all(stepper.done for stepper in steppers):
+        for stepper in steppers:
+            stepper.step(7)
+    assert [stepper.path for stepper in steppers] == expected
+
+
+def test_unreachable_goal_finishes_without_path():
+    grid = Grid3DEnvironment(10, 10, 1)
+    wall = np.zeros(grid.grid.shape, dtype=bool)
+    wall[:, 5, :] = True
+    grid.add_obstacles(wall)
+    path, metrics = Pathfinding3DAlgorithms(grid).a_star((0, 1, 1), (0, 8, 8))
+    assert path == [] and metrics['nodes_explored'] == 50
+
+
+def test_owned_tracemalloc_stops_however_the_search_ends():
+    pathfinder = Pathfinding3DAlgorithms(walled_grid(), trace_memory=True)
+
+    stepper = pathfinder.stepper(START, GOAL, 'dijkstra')
+    stepper.step(5)
+    assert tracemalloc.is_tracing()
+    del stepper
+    gc.collect()
+    assert not tracemalloc.is_tracing()
+
+    stepper = pathfinder.stepper(START, GOAL, 'dijkstra')
+    stepper.step(5)
+    stepper.close()
+    assert not tracemalloc.is_tracing()
+
+    stepper = pathfinder.stepper(START, GOAL, 'dijkstra')
+    while not stepper.done:
+        stepper.step(50)
+    # Still referenced, but finished
+    assert not tracemalloc.is_tracing()
+    assert stepper.metrics['counters']['peak_memory_bytes'] > 0
+
+
+def test_cancelled_worker_job_stops_tracemalloc():
+    pathfinder = Pathfinding3DAlgorithms(Grid3DEnvironment(120, 120, 5), trace_memory=True)
+    job = PathfindingWorker(pathfinder, batch_size=10).submit((0, 0, 0), (4, 119, 119), 'dijkstra')
+    job.cancel()
+    assert job.wait(10)
+    assert not tracemalloc.is_tracing()
+
+
+def test_peak_memory_is_per_search_when_already_tracing():
+    tracemalloc.start()
+    try:
+        ballast = bytearray(20_000_000)
+        del ballast
+        path, metrics = Pathfinding3DAlgorithms(walled_grid(), trace_memory=True).a_star(START, GOAL)
+        assert tracemalloc.is_tracing()
+        assert 0 < metrics['counters']['peak_memory_bytes'] < 10_000_000
+    finally:
+        tracemalloc.stop()
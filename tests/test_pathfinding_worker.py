@@ -0,0 +1,28 @@
+from components.grid_environment_3d import Grid3DEnvironment
+from pathfinding_algorithms_3d import Pathfinding3DAlgorithms
+from pathfinding_worker import PathfindingWorker
+
+
+def test_job_streams_explored_nodes_and_finishes_with_path():
+    pathfinder = Pathfinding3DAlgorithms(Grid3DEnvironment(30, 30, 3))
+    expected, metrics = pathfinder.dijkstra((0, 0, 0), (2, 29, 29))
+    worker = PathfindingWorker(pathfinder, batch_size=50)
+
+    job = worker.submit((0, 0, 0), (2, 29, 29), 'dijkstra')
+    assert job.wait(10)
+    assert job.error is None and not job.cancelled
+    assert job.path == expected
+    assert job.drain_explored() == metrics['explored_nodes']
+    assert job.drain_explored() == []
+
+
+def test_submitting_cancels_the_running_job():
+    pathfinder = Pathfinding3DAlgorithms(Grid3DEnvironment(120, 120, 5))
+    worker = PathfindingWorker(pathfinder, batch_size=10)
+
+    first = worker.submit((0, 0, 0), (4, 119, 119), 'dijkstra')
+    second = worker.submit((0, 0, 0), (0, 3, 3), 'a_star')
+    assert first.cancelled and first.wait(10)
+    assert first.path == []
+    assert second.wait(10) and second.path[-1] == (0, 3, 3)
+    assert worker.current_job is second
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from components.grid_environment_3d import Grid3DEnvironment
+from components.terrain_import import resample_blocks, slope_costs
+
+
+def test_downsampling_averages_each_cell():
+    raster = np.arange(8 * 6, dtype=float).reshape(8, 6)
+    blocks = list(resample_blocks(raster, 4, 3, block_rows=3))
+    assert [row for row, _ in blocks] == [0, 3]
+    resampled = np.vstack([block for _, block in blocks])
+    assert np.allclose(resampled, raster.reshape(4, 2, 3, 2).mean(axis=(1, 3)))
+
+
+def test_upsampling_interpolates_and_fills_nodata():
+    raster = np.array([[0.0, 10.0], [-999.0, 10.0]])
+    resampled = np.vstack([block for _, block in resample_blocks(raster, 4, 4, nodata=-999.0, fill_value=0.0)])
+    assert resampled.shape == (4, 4)
+    assert np.allclose(resampled[:, 0], 0.0) and np.allclose(resampled[:, -1], 10.0)
+    assert np.all(np.diff(resampled, axis=1) >= 0)
+
+
+def test_import_heightmap_from_raw_dem(tmp_path):
+    dem = (np.add.outer(np.arange(20), np.arange(30)) * 10).astype('<i2')
+    dem[0, 0] = -32768
+    path = tmp_path / 'area.dem'
+    dem.tofile(path)
+    grid = Grid3DEnvironment(10, 15, 5)
+    grid.add_obstacle(0, 5, 5)
+
+    grid.import_heightmap(str(path), shape=dem.shape, nodata=-32768, slope_weight=2.0)
+    assert grid.elevation.min() == pytest.approx(0.0, abs=0.2)
+    assert grid.elevation.max() == pytest.approx(4.0, abs=0.2)
+    expected = np.broadcast_to(slope_costs(grid.elevation, 2.0), grid.grid.shape).copy()
+    expected[0, 5, 5] = 1.0
+    assert np.allclose(grid.terrain_costs, expected)
+    assert grid.content_hash == grid.compute_content_hash()
+
+    with pytest.raises(ValueError):
+        Grid3DEnvironment(10, 15, 5).import_heightmap(str(path))
@@ -0,0 +1,77 @@
+import os
+import time
+from components.tile_cache import EVICT_TO_FRACTION, TileCache
+from components.tile_fetcher import TileFetcher
+
+TILE = b'x' * 1000
+
+
+def disk_usage(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(directory) for name in files)
+
+
+def test_round_trip_and_freshness(tmp_path):
+    cache = TileCache(str(tmp_path), max_age=60)
+    assert cache.get(3, 1, 2) is None
+    cache.put(3, 1, 2, b'png', etag='"abc"')
+    data, meta = cache.get(3, 1, 2)
+    assert data == b'png' and meta['etag'] == '"abc"' and cache.is_fresh(meta)
+    assert not cache.is_fresh(dict(meta, fetched_at=time.time() - 61))
+
+    cache.refresh(3, 1, 2, dict(meta, fetched_at=0))
+    assert cache.is_fresh(cache.get(3, 1, 2)[1])
+    assert cache.size() == disk_usage(tmp_path) == TileCache(str(tmp_path)).size()
+
+
+def test_eviction_counts_sidecars_and_frees_below_the_cap(tmp_path):
+    cache = TileCache(str(tmp_path), max_bytes=20_000)
+    scans = []
+    scan = cache._scan
+    cache._scan = lambda: scans.append(1) or scan()
+
+    for x in range(60):
+        cache.put(5, x, 0, TILE)
+        # Distinct last-use times, oldest first
+        os.utime(cache._path(5, x, 0), (1000 + x, 1000 + x))
+        assert cache.size() == disk_usage(tmp_path) <= cache.max_bytes
+    # Each eviction frees 10% of the cap, so a rescan happens every couple of tiles at most
+    assert len(scans) <= 60 * len(TILE) / (cache.max_bytes * (1 - EVICT_TO_FRACTION)) + 1
+
+    kept = [x for x in range(60) if os.path.exists(cache._path(5, x, 0))]
+    assert kept == list(range(60 - len(kept), 60))
+    assert all(os.path.exists(cache._path(5, x, 0) + '.json') == (x in kept) for x in range(60))
+
+def test_recently_used_tiles_survive_eviction(tmp_path):
+    cache = TileCache(str(tmp_path), max_bytes=10_000)
+    for x in range(8):
+        cache.put(5, x, 0, TILE)
+        os.utime(cache._path(5, x, 0), (1000 + x, 1000 + x))
+    cache.get(5, 0, 0)
+    for x in range(8, 12):
+        cache.put(5, x, 0, TILE)
+    assert cache.get(5, 0, 0) is not None and cache.get(5, 1, 0) is None
+
+
+class Revalidating:
+    def __init__(self, status_code):
+        self.status_code, self.calls = status_code, []
+
+    def get(self, url, timeout=None, headers=None):
+        self.calls.append(headers)
+        response = type('Response', (), {})()
+        response.status_code, response.content, response.headers = self.status_code, b'new', {'ETag': '"v2"'}
+        return response
+
+
+def test_fetcher_offline_and_revalidation(tmp_path):
+    offline = TileFetcher('http://tiles.test/{z}/{x}/{y}', cache_dir=str(tmp_path), offline=True, max_age=0)
+    offline.cache.put(2, 1, 1, b'old', etag='"v1"')
+    offline.session = None
+    assert offline.fetch(2, 1, 1) == b'old' and offline.fetch(2, 0, 0) is None
+
+    online = TileFetcher('http://tiles.test/{z}/{x}/{y}', cache_dir=str(tmp_path), rate=1000, max_age=0)
+    online.session = server = Revalidating(304)
+    assert online.fetch(2, 1, 1) == b'old'
+    assert server.calls == [{'If-None-Match': '"v1"'}]
+    online.session = Revalidating(200)
+    assert online.fetch(2, 1, 1) == b'new' and online.cache.get(2, 1, 1)[1]['etag'] == '"v2"'
@@ -0,0 +1,74 @@
+import threading
+import time
+from io import BytesIO
+from PIL import Image
+from components.tile_fetcher import PLACEHOLDER_COLOR, TILE_SIZE, TileFetcher, TokenBucket
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (TILE_SIZE, TILE_SIZE), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Response:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code, self.content, self.headers = status_code, content, headers or {}
+
+
+class TileServer:
+    """Stands in for the pooled session: tile colour encodes x and y, (0, 0) is missing."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None, headers=None):
+        with self.lock:
+            self.requests.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        z, x, y = (int(part) for part in url.rsplit('/', 3)[1:])
+        if (x, y) == (0, 0):
+            return Response(404)
+        return Response(200, png((x * 40, y * 40, z)))
+
+    def close(self):
+        pass
+
+
+def test_fetch_grid_downloads_concurrently_and_fills_gaps():
+    fetcher = TileFetcher('http://tiles.test/{z}/{x}/{y}', max_workers=4, rate=1000, cache_dir=None)
+    fetcher.session = server = TileServer()
+
+    tiles = fetcher.fetch_grid(3, 0, 0, 3, 2)
+    assert len(tiles) == 2 and all(len(row) == 3 for row in tiles)
+    assert tiles[0][0].getpixel((0, 0)) == PLACEHOLDER_COLOR
+    assert tiles[1][2].getpixel((0, 0)) == (80, 40, 3)
+    assert len(server.requests) == 6 and 1 < server.max_in_flight <= 4
+
+    # Decoded tiles are kept in memory; only the missing one is asked for again
+    fetcher.fetch_grid(3, 0, 0, 3, 2)
+    assert len(server.requests) == 7
+
+
+def test_cancelled_iteration_stops_early():
+    fetcher = TileFetcher('http://tiles.test/{z}/{x}/{y}', max_workers=2, rate=1000, cache_dir=None)
+    fetcher.session = server = TileServer(delay=0.05)
+    coords = [(x, 1) for x in range(20)]
+    yielded = list(fetcher.iter_tiles(3, coords, cancelled=lambda: True))
+    assert yielded == [] and len(server.requests) < len(coords)
+
+
+def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(rate=50, capacity=5)
+    t0 = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 from the burst, 10 more at 50 per second
+    assert time.monotonic() - t0 >= 0.18
@@ -0,0 +1,62 @@
+import numpy as np
+import pygame
+from PIL import Image, ImageEnhance
+from components.tile_fetcher import PLACEHOLDER_COLOR, TILE_SIZE, TileFetcher
+from components.tile_mosaic import MapPyramid, TileMosaic, enhance
+from tests.test_tile_fetcher import TileServer
+
+
+def mosaic():
+    fetcher = TileFetcher('http://tiles.test/{z}/{x}/{y}', max_workers=4, rate=1000, cache_dir=None)
+    fetcher.session = server = TileServer(delay=0)
+    return TileMosaic(fetcher), server
+
+
+def test_enhance_matches_pil():
+    pixels = np.random.default_rng(0).integers(0, 256, size=(40, 50, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    image = ImageEnhance.Contrast(image).enhance(1.4)
+    image = ImageEnhance.Sharpness(image).enhance(2.0)
+    assert np.array_equal(enhance(pixels.copy()), np.asarray(image))
+
+
+def test_crop_fetches_only_intersecting_tiles_and_is_cached():
+    builder, server = mosaic()
+    # Straddles tile columns 1-2 and rows 1-2
+    left, top, width, height = TILE_SIZE + 200, TILE_SIZE + 100, 100, 300
+    pixels = builder.build_array(3, left, top, width, height, contrast=1.0, sharpness=1.0)
+
+    assert pixels.shape == (height, width, 3)
+    assert sorted(tuple(url.rsplit('/', 2)[1:]) for url in server.requests) == \
+        [('1', '1'), ('1', '2'), ('2', '1'), ('2', '2')]
+    # Tile colour encodes its x and y
+    assert tuple(pixels[0, 0]) == (40, 40, 3)
+    assert tuple(pixels[-1, -1]) == (80, 80, 3)
+    # Row 156 and column 56 are the first ones in tile row 2 and tile column 2
+    assert tuple(pixels[156, 55]) == (40, 80, 3)
+    assert tuple(pixels[155, 56]) == (80, 40, 3)
+
+    surface = builder.build(3, left, top, width, height, contrast=1.0, sharpness=1.0)
+    assert len(server.requests) == 4
+    # The cached surface shares the array's memory
+    assert surface.get_at((0, 0))[:3] == (40, 40, 3)
+    pixels[0, 0] = (1, 2, 3)
+    assert surface.get_at((0, 0))[:3] == (1, 2, 3)
+
+
+def test_missing_tiles_stay_placeholder_and_cancel_returns_none():
+    builder, _ = mosaic()
+    pixels = builder.build_array(3, 0, 0, 10, 10, contrast=1.0, sharpness=1.0)
+    assert tuple(pixels[5, 5]) == PLACEHOLDER_COLOR
+    assert builder.build(3, TILE_SIZE * 4, 0, 10, 10, cancelled=lambda: True) is None
+
+
+def test_map_pyramid_halves_down_to_min_size():
+    pixels = np.zeros((256, 128, 3), dtype=np.uint8)
+    pixels[::2, ::2] = 200
+    pyramid = MapPyramid(pygame.surfarray.make_surface(pixels), min_size=32)
+    assert [level.get_size() for level in pyramid.levels] == [(256, 128), (128, 64), (64, 32)]
+    assert pyramid.levels[1].get_at((3, 3))[:3] == (50, 50, 50)
+    assert pyramid.surface_for(100, 40).get_size() == (128, 64)
+    assert pyramid.surface_for(60, 30).get_size() == (64, 32)
+    assert pyramid.surface_for(500, 500).get_size() == (256, 128)
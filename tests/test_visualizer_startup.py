@@ -0,0 +1,28 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+from components.grid_environment_3d import Grid3DEnvironment
+from visualizer_3d import Pathfinding3DVisualizer
+
+
+def test_seed_takes_precedence_over_saved_scenario(tmp_path, capsys):
+    path = str(tmp_path / 'scenario.npz')
+    saved = Grid3DEnvironment(35, 35, 5)
+    saved.add_obstacle(0, 10, 10)
+    saved.set_start(0, 1, 1)
+    saved.save_snapshot(path)
+    seeded = Grid3DEnvironment(35, 35, 5)
+    seeded.generate_city(7)
+    seeded.set_start(0, 2, 2)
+    seeded.set_goal(0, 32, 32)
+
+    visualizer = Pathfinding3DVisualizer(snapshot_path=path, seed=7)
+    assert np.array_equal(visualizer.grid.grid, seeded.grid)
+    assert 'F9' in capsys.readouterr().out
+
+    visualizer = Pathfinding3DVisualizer(snapshot_path=path)
+    assert np.array_equal(visualizer.grid.grid, saved.grid)
+    assert 'Loading saved scenario' in capsys.readouterr().out
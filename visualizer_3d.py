@@ -1,12 +1,20 @@
 
 import pygame
+import os
 import sys
 import math
+import numpy as np
 from components.grid_environment_3d import Grid3DEnvironment
 from pathfinding_algorithms_3d import Pathfinding3DAlgorithms
+from pathfinding_worker import PathfindingWorker
 from components.vehicle_3d import Vehicle3D
 from components.ui_components import ButtonManager
 from components.map_loader import OSMMapLoader
+from components.map_load_worker import MapLoadWorker
+from components.tile_mosaic import MapPyramid
+from components.iso_projection import IsoProjection
+from components.frame_layers import FrameLayers, GroundPlaneCache, vertical_gradient
+from components.location_registry import GridProjection, snap_route
 
 class Pathfinding3DVisualizer:
     WHITE = (255, 255, 255)
@@ -22,9 +30,17 @@ class Pathfinding3DVisualizer:
     LIGHT_BLUE = (173, 216, 230)
     BG_TOP = (20, 30, 50)  
     BG_BOTTOM = (60, 80, 120)  
+    CAMERA_SETTLE_MS = 150
     
-    def __init__(self, rows=35, cols=35, height=5):
+    def __init__(self, rows=35, cols=35, height=5, snapshot_path='scenario.npz', seed=None, heightmap_path=None,
+                 osm_extract_path=None, map_bbox=None, locations_path=None):
         pygame.init()       
+        self.seed = seed
+        self.heightmap_path = heightmap_path
+        self.osm_extract_path = osm_extract_path
+        self.map_bbox = map_bbox
+        self.locations_path = locations_path
+        self.osm_extract = None
         self.rows = rows
         self.cols = cols
         self.height_levels = height
@@ -34,10 +50,14 @@ class Pathfinding3DVisualizer:
         self.height = 900
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("3D Pathfinding - Vehicle Navigation with OSM")
+        self.background = vertical_gradient((self.width, self.height), self.BG_TOP, self.BG_BOTTOM).convert()
+        self.frame_layers = FrameLayers((self.width, self.height))
         
         # Initialize 3D grid and pathfinder
         self.grid = Grid3DEnvironment(rows, cols, height)
         self.pathfinder = Pathfinding3DAlgorithms(self.grid)
+        self.search_worker = PathfindingWorker(self.pathfinder)
+        self.search_job = None
         self.vehicle = Vehicle3D()
         
         # Isometric view settings
@@ -52,6 +72,10 @@ class Pathfinding3DVisualizer:
         self.camera_pitch = 30.0  
         self.camera_distance = 1.0  
         self.rotation_angle = 0  
+        self.last_camera = None
+        self.projection = None
+        self.projection_camera = None
+        self.camera_moved_at = -self.CAMERA_SETTLE_MS
         
         # Panning/dragging state
         self.is_dragging = False
@@ -88,6 +112,10 @@ class Pathfinding3DVisualizer:
         # OSM Map loaded state
         self.osm_loaded = False
         self.osm_background = None  
+        self.osm_pyramid = None
+        self.ground_planes = GroundPlaneCache()
+        self.map_worker = MapLoadWorker()
+        self.map_job = None
         self.selected_start_location = 'Home'
         self.selected_end_location = 'Dubai Mall'
         
@@ -98,70 +126,203 @@ class Pathfinding3DVisualizer:
 
         self.clock = pygame.time.Clock()
         
+        # Both replace the location table, so they are loaded before the dropdowns
+        if locations_path:
+            try:
+                OSMMapLoader.load_locations(locations_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"✗ Could not load locations: {e}")
+                self.locations_path = None
+        names = OSMMapLoader.get_location_names(2)
+        if len(names) == 2:
+            self.selected_start_location, self.selected_end_location = names
+        if osm_extract_path:
+            self.load_osm_extract()
         location_names = OSMMapLoader.get_location_names()
         self.button_manager = ButtonManager(self.width, self.height, location_names)
-        self.generate_city_environment()
+        
+        # F5 saves the current scenario, F9 reloads it; an existing snapshot is used at
+        # startup unless a seed or heightmap asks for a generated city
+        self.snapshot_path = snapshot_path
+        if self.osm_extract is not None:
+            return
+        snapshot_exists = bool(snapshot_path) and os.path.exists(snapshot_path)
+        if snapshot_exists and seed is None and not heightmap_path:
+            print(f"⚠ Loading saved scenario {snapshot_path} instead of a random city (pass --seed to generate one)")
+            self.load_snapshot()
+        else:
+            if snapshot_exists:
+                print(f"⚠ Generating from --seed/--heightmap; press F9 to load the saved scenario {snapshot_path}")
+            self.generate_city_environment()
     
     def generate_city_environment(self):
+        self.cancel_search()
+        self.cancel_map_load()
+        self.osm_extract = None
         self.grid.reset()
-        self.grid.generate_buildings()
+        if self.seed is None:
+            self.grid.generate_buildings()
+        else:
+            self.grid.generate_city(self.seed)
+            print(f"✓ City generated from seed {self.seed}")
+        if self.heightmap_path:
+            try:
+                self.grid.import_heightmap(self.heightmap_path, slope_weight=1.0)
+            except (OSError, ValueError) as e:
+                print(f"✗ Could not import heightmap: {e}")
         self.grid.set_start(0, 2, 2)
         self.grid.set_goal(0, self.rows - 3, self.cols - 3)
         self.vehicle.position = [0, 2, 2]
     
+    def load_osm_extract(self):
+        self.cancel_search()
+        self.cancel_map_load()
+        try:
+            self.osm_extract = self.grid.import_osm_extract(self.osm_extract_path)
+        except (OSError, ValueError, SyntaxError) as e:
+            # SyntaxError covers malformed XML (ElementTree.ParseError)
+            print(f"✗ Could not import OSM extract: {e}")
+            self.osm_extract = None
+            return
+        self.vehicle.reset()
+        self.metrics = {}
+        # An explicit locations file wins over the extract's own named places
+        if not self.locations_path and len(self.osm_extract.locations) >= 2:
+            OSMMapLoader.set_locations(self.osm_extract.locations)
+            self.selected_start_location, self.selected_end_location = OSMMapLoader.get_location_names(2)
+        self.place_endpoints(self.selected_start_location, self.selected_end_location)
+    
+    def location_projection(self):
+        """How lat/lon map onto the grid: the extract's bounds, else the default map view."""
+        if self.osm_extract is not None:
+            return self.osm_extract.projection(self.rows, self.cols)
+        view = OSMMapLoader.bbox_view(self.map_bbox or OSMMapLoader.DUBAI_BBOX, self.rows, self.cols)
+        return GridProjection.from_view(view, self.rows, self.cols)
+    
+    def place_endpoints(self, start_loc, dest_loc):
+        """Start and goal at two named locations, snapped onto open, mutually reachable cells."""
+        if start_loc not in OSMMapLoader.locations or dest_loc not in OSMMapLoader.locations:
+            print(f"✗ Invalid locations: {start_loc}, {dest_loc}")
+            return
+        rows, cols = OSMMapLoader.locations.cells(self.location_projection(), [start_loc, dest_loc])
+        snapped = snap_route(self.grid, (rows[0], cols[0]), (rows[1], cols[1]))
+        if snapped is None:
+            print("✗ No open ground cell for the route")
+            return
+        start, goal = snapped
+        self.grid.set_start(*start)
+        self.grid.set_goal(*goal)
+        self.vehicle.position = list(start)
+        print(f"✓ Route: {start_loc} {start[1:]} → {dest_loc} {goal[1:]}")
+    
+    def save_snapshot(self):
+        try:
+            path = self.grid.save_snapshot(self.snapshot_path, mode='mmap' if os.path.isdir(self.snapshot_path) else 'compressed')
+            print(f"✓ Scenario saved to {path}")
+        except OSError as e:
+            print(f"✗ Could not save scenario: {e}")
+    
+    def load_snapshot(self):
+        self.cancel_search()
+        self.cancel_map_load()
+        try:
+            self.grid.restore_snapshot(self.snapshot_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"✗ Could not load scenario: {e}")
+            return
+        self.rows, self.cols, self.height_levels = self.grid.rows, self.grid.cols, self.grid.height
+        self.vehicle.reset()
+        self.vehicle.position = list(self.grid.start) if self.grid.start else [0, 0, 0]
+        self.metrics = {}
+        print(f"✓ Scenario loaded from {self.snapshot_path}")
+    
     def load_osm_map(self):
-        self.osm_background = OSMMapLoader.initialize_map(self.grid, self.rows, self.cols)
+        # Tiles download on the map worker; poll_map_load shows them as they arrive
+        self.cancel_search()
+        self.osm_extract = None
+        self.grid.reset()
         self.vehicle.position = [0, 2, 2]
-        self.osm_loaded = True
+        self.osm_background = None
+        self.osm_pyramid = None
+        if self.map_bbox:
+            self.map_job = self.map_worker.submit_bbox_map(self.map_bbox, self.rows, self.cols)
+        else:
+            self.map_job = self.map_worker.submit_dubai_map(self.rows, self.cols)
     
     def load_locations_map(self):
         start_loc = self.button_manager.start_location_dropdown.get_selected_location()
         dest_loc = self.button_manager.dest_location_dropdown.get_selected_location()
         
+        self.cancel_search()
         self.metrics = {}
         self.animation_explored = []
         self.animation_final_path = []
         
-        osm_map, start_loc, dest_loc, success = OSMMapLoader.initialize_locations_map(
-            self.grid, self.vehicle, start_loc, dest_loc, self.rows
-        )
+        if self.osm_extract is not None:
+            # The extract grid already holds the streets; only the endpoints move
+            self.vehicle.reset()
+            self.place_endpoints(start_loc, dest_loc)
+            self.selected_start_location = start_loc
+            self.selected_end_location = dest_loc
+            return
         
+        print(f"\n{'='*60}")
+        print(f"Loading route: {start_loc} → {dest_loc}")
+        print(f"{'='*60}")
+        self.grid.reset()
+        self.vehicle.reset()
+        self.osm_background = None
+        self.osm_pyramid = None
+        self.map_job = self.map_worker.submit_locations_map(start_loc, dest_loc, self.rows)
+    
+    def cancel_map_load(self):
+        if self.map_job is not None:
+            self.map_worker.cancel()
+            self.map_job = None
+    
+    def poll_map_load(self):
+        job = self.map_job
+        if job is None:
+            return
+        if job.surface is not None:
+            self.osm_background = job.surface
+        if not job.finished:
+            return
+        
+        self.map_job = None
+        if job.error is not None:
+            print(f"✗ Map load failed: {job.error}")
+        if job.kind == 'map':
+            self.osm_background = OSMMapLoader.finish_map(self.grid, self.rows, self.cols, job.result, job.terrain)
+            self.vehicle.position = list(self.grid.start)
+            self.osm_pyramid = MapPyramid(self.osm_background) if self.osm_background else None
+            self.osm_loaded = True
+            return
+        
+        osm_map, start_loc, dest_loc, success = OSMMapLoader.finish_locations_map(
+            self.grid, self.vehicle, job.start_location, job.dest_location, job.result or (None, None, None), job.terrain
+        )
         if success:
             self.osm_background = osm_map
+            self.osm_pyramid = MapPyramid(osm_map)
             self.osm_loaded = True
             self.selected_start_location = start_loc
             self.selected_end_location = dest_loc
         else:
             self.load_osm_map()
     
+    def get_projection(self):
+        """The IsoProjection for the current camera, rebuilt only when the camera changes."""
+        camera = self.camera_key()
+        if self.projection_camera != camera:
+            self.projection_camera = camera
+            self.projection = IsoProjection(self.rows, self.cols, self.height_levels, self.camera_yaw,
+                                            self.camera_pitch, self.camera_distance, self.tile_width,
+                                            self.tile_height, self.offset_x, self.offset_y)
+        return self.projection
+    
     def cart_to_iso(self, x, y, z):
-        # Center coordinates
-        cx, cy, cz = self.cols / 2, self.rows / 2, self.height_levels / 2
-        x_rel = x - cx
-        y_rel = y - cy
-        z_rel = z - cz
-          
-        yaw_rad = math.radians(self.camera_yaw)
-        cos_yaw = math.cos(yaw_rad)
-        sin_yaw = math.sin(yaw_rad)
-        
-        x_yaw = x_rel * cos_yaw - y_rel * sin_yaw
-        y_yaw = x_rel * sin_yaw + y_rel * cos_yaw
-        z_yaw = z_rel
-              
-        pitch_rad = math.radians(self.camera_pitch)
-        cos_pitch = math.cos(pitch_rad)
-        sin_pitch = math.sin(pitch_rad)
-        
-        x_final = x_yaw
-        y_final = y_yaw * cos_pitch - z_yaw * sin_pitch
-        z_final = y_yaw * sin_pitch + z_yaw * cos_pitch
-        
-        scale = self.tile_width / 2 * self.camera_distance
-        iso_x = (x_final - y_final) * scale + self.offset_x
-        iso_y = (x_final + y_final) * self.tile_height / 2 * self.camera_distance - z_final * self.tile_height * 2 * self.camera_distance + self.offset_y
-        
-        return iso_x, iso_y
+        return self.get_projection().project(x, y, z)
     
     def iso_to_cart(self, iso_x, iso_y):
         iso_x -= self.offset_x
@@ -190,128 +351,113 @@ class Pathfinding3DVisualizer:
     
     def get_cell_from_mouse(self, pos):
         mouse_x, mouse_y = pos
-        min_dist = float('inf')
-        closest_cell = None
-        
-        for row in range(self.rows):
-            for col in range(self.cols):
-                iso_x, iso_y = self.cart_to_iso(col + 0.5, row + 0.5, 0)
-                dist = math.sqrt((mouse_x - iso_x)**2 + (mouse_y - iso_y)**2)
-                if dist < min_dist:
-                    min_dist = dist
-                    closest_cell = (0, row, col)
-        
-        if min_dist < self.tile_width:
-            return closest_cell
+        centres = self.get_projection().centres(0)
+        dist = np.sqrt((mouse_x - centres[..., 0])**2 + (mouse_y - centres[..., 1])**2)
+        row, col = np.unravel_index(dist.argmin(), dist.shape)
+        
+        if dist[row, col] < self.tile_width:
+            return (0, int(row), int(col))
         return None
     
-    def draw_ground_plane(self):
-        corners = []
-        corner_coords = [(0, 0), (self.cols, 0), (self.cols, self.rows), (0, self.rows)]
-        for col, row in corner_coords:
-            x, y = self.cart_to_iso(col, row, 0)
-            corners.append((x, y))
+    def camera_key(self):
+        """Everything cart_to_iso depends on; static layers are rendered per key."""
+        return (self.camera_yaw, self.camera_pitch, self.camera_distance, self.offset_x, self.offset_y,
+                self.tile_width, self.tile_height, self.rows, self.cols, self.height_levels)
+    
+    def camera_moving(self):
+        """True until the camera has held still for CAMERA_SETTLE_MS."""
+        camera = self.camera_key()
+        now = pygame.time.get_ticks()
+        if camera != self.last_camera:
+            self.last_camera = camera
+            self.camera_moved_at = now
+        return now - self.camera_moved_at < self.CAMERA_SETTLE_MS
+    
+    def draw_ground_layer(self, surface, preview=False):
+        surface.blit(self.background, (0, 0))
+        self.draw_ground_plane(surface, preview)
+        if not self.osm_loaded:
+            self.draw_grid_lines(surface)
+    
+    def draw_scenery_layer(self, surface):
+        # Grid lines go over the explored overlay again, with the parked cars
+        if not self.osm_loaded:
+            self.draw_grid_lines(surface)
+        centres = self.get_projection().centres(0)
+        for row, col in np.argwhere(self.grid.grid[0] == Grid3DEnvironment.CAR):
+            iso_x, iso_y = centres[row, col]
+            Vehicle3D.draw_car_obstacle(surface, iso_x, iso_y, self.tile_width, self.tile_height)
+    
+    def draw_building_layer(self, surface):
+        # Back rows first, so nearer cubes cover the ones behind them
+        projection = self.get_projection()
+        for z in range(1, self.height_levels):
+            cells = np.argwhere(self.grid.grid[z, ::-1] == Grid3DEnvironment.OBSTACLE)
+            if len(cells) == 0:
+                continue
+            centres = projection.centres(z)
+            for flipped_row, col in cells:
+                iso_x, iso_y = centres[self.rows - 1 - flipped_row, col]
+                self.draw_cube(surface, iso_x, iso_y, (80, 80, 80), z)
+    
+    def draw_ground_plane(self, surface, preview=False):
+        lattice = self.get_projection().corners(0)
+        corners = [tuple(lattice[row, col]) for col, row in
+                   [(0, 0), (self.cols, 0), (self.cols, self.rows), (0, self.rows)]]
         if self.osm_background:
-            min_x = min(c[0] for c in corners)
-            max_x = max(c[0] for c in corners)
-            min_y = min(c[1] for c in corners)
-            max_y = max(c[1] for c in corners)
-            
-            width = int(max_x - min_x)
-            height = int(max_y - min_y)
-            scaled_map = pygame.transform.smoothscale(self.osm_background, (width, height))
-            
-            plane_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-            plane_surface.blit(scaled_map, (0, 0))
-
-            mask_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-            mask_corners = [(c[0] - min_x, c[1] - min_y) for c in corners]
-            pygame.draw.polygon(mask_surface, (255, 255, 255, 255), mask_corners)
-
-            plane_surface.blit(mask_surface, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-
-            self.screen.blit(plane_surface, (min_x, min_y))
+            map_progress = self.map_job.tiles_done if self.map_job is not None else None
+            plane_surface, position = self.ground_planes.get(
+                self.camera_key(), corners, self.osm_background, self.osm_pyramid, map_progress, preview
+            )
+            surface.blit(plane_surface, position)
         else:
-            pygame.draw.polygon(self.screen, (255, 255, 255), corners)
-        
+            pygame.draw.polygon(surface, (255, 255, 255), corners)
+    
+    def draw_grid_lines(self, surface):
+        lattice = self.get_projection().corners(0)
+        for p1, p2 in zip(lattice[0].tolist(), lattice[self.rows].tolist()):
+            pygame.draw.line(surface, (100, 100, 100), p1, p2, 1)
         
-        if not self.osm_loaded:
-            for col in range(self.cols + 1):
-                p1 = self.cart_to_iso(col, 0, 0)
-                p2 = self.cart_to_iso(col, self.rows, 0)
-                pygame.draw.line(self.screen, (100, 100, 100), p1, p2, 1)
-            
-            for row in range(self.rows + 1):
-                p1 = self.cart_to_iso(0, row, 0)
-                p2 = self.cart_to_iso(self.cols, row, 0)
-                pygame.draw.line(self.screen, (100, 100, 100), p1, p2, 1)
+        for p1, p2 in zip(lattice[:, 0].tolist(), lattice[:, self.cols].tolist()):
+            pygame.draw.line(surface, (100, 100, 100), p1, p2, 1)
     
     def draw_3d_grid(self):
-        self.draw_ground_plane()
+        # Background, ground, grid lines, cars and buildings only change with the camera,
+        # the map or the grid revision; each frame just blits them around the dynamic parts
+        camera = self.camera_key()
+        map_progress = self.map_job.tiles_done if self.map_job is not None else None
+        # A moving camera gets a low-resolution map preview, refined once it settles
+        preview = self.osm_background is not None and self.camera_moving()
+        ground_key = (camera, self.osm_loaded, self.osm_background, self.osm_pyramid, map_progress, preview)
+        self.frame_layers.blit(self.screen, 'ground', ground_key,
+                               lambda surface: self.draw_ground_layer(surface, preview), transparent=False)
 
         if self.animation_explored:
             s = pygame.Surface((self.screen.get_width(), self.screen.get_height()), pygame.SRCALPHA)
-            for z, row, col in self.animation_explored:
-                corners = [
-                    self.cart_to_iso(col, row, z),
-                    self.cart_to_iso(col + 1, row, z),
-                    self.cart_to_iso(col + 1, row + 1, z),
-                    self.cart_to_iso(col, row + 1, z)
-                ]
+            quads = self.get_projection().quads(np.asarray(self.animation_explored, dtype=np.intp))
+            for corners in quads.tolist():
                 pygame.draw.polygon(s, (*self.CYAN, 200), corners)
             self.screen.blit(s, (0, 0))
 
-        
-        if not self.osm_loaded:
-            for col in range(self.cols + 1):
-                p1 = self.cart_to_iso(col, 0, 0)
-                p2 = self.cart_to_iso(col, self.rows, 0)
-                pygame.draw.line(self.screen, (100, 100, 100), p1, p2, 1)
-            
-            for row in range(self.rows + 1):
-                p1 = self.cart_to_iso(0, row, 0)
-                p2 = self.cart_to_iso(self.cols, row, 0)
-                pygame.draw.line(self.screen, (100, 100, 100), p1, p2, 1)
-        
-        path_points = []
-        
-        for row in range(self.rows):
-            for col in range(self.cols):
-                cell_type = self.grid.grid[0, row, col]
-                iso_x, iso_y = self.cart_to_iso(col + 0.5, row + 0.5, 0)
-                
-                if cell_type == Grid3DEnvironment.START:
-                    pygame.draw.circle(self.screen, self.GREEN, (int(iso_x), int(iso_y)), 6)
-                    pygame.draw.circle(self.screen, (0, 0, 0), (int(iso_x), int(iso_y)), 6, 2)
-                elif cell_type == Grid3DEnvironment.GOAL:
-                    pygame.draw.circle(self.screen, self.RED, (int(iso_x), int(iso_y)), 6)
-                    pygame.draw.circle(self.screen, (0, 0, 0), (int(iso_x), int(iso_y)), 6, 2)
-                elif cell_type == Grid3DEnvironment.CAR:
-                    Vehicle3D.draw_car_obstacle(self.screen, iso_x, iso_y, self.tile_width, self.tile_height)
-                elif cell_type == Grid3DEnvironment.PATH:
-                    path_points.append((int(iso_x), int(iso_y)))
-        
+        scenery_key = (camera, self.osm_loaded, self.grid.revision)
+        self.frame_layers.blit(self.screen, 'scenery', scenery_key, self.draw_scenery_layer)
+        
+        ground = self.grid.grid[0]
+        centres = self.get_projection().centres(0)
+        for cell_type, color in ((Grid3DEnvironment.START, self.GREEN), (Grid3DEnvironment.GOAL, self.RED)):
+            for row, col in np.argwhere(ground == cell_type):
+                iso_x, iso_y = centres[row, col]
+                pygame.draw.circle(self.screen, color, (int(iso_x), int(iso_y)), 6)
+                pygame.draw.circle(self.screen, (0, 0, 0), (int(iso_x), int(iso_y)), 6, 2)
+        
+        on_path = (self.grid.overlay[0] == Grid3DEnvironment.PATH) & (ground != Grid3DEnvironment.START) \
+            & (ground != Grid3DEnvironment.GOAL) & (ground != Grid3DEnvironment.CAR)
+        path_points = [(int(iso_x), int(iso_y)) for iso_x, iso_y in centres[on_path].tolist()]
         if len(path_points) > 1:
             for i in range(len(path_points) - 1):
                 pygame.draw.line(self.screen, self.YELLOW, path_points[i], path_points[i + 1], 8)
         
-        for z in range(1, self.height_levels):  
-            for row in range(self.rows - 1, -1, -1):
-                for col in range(self.cols):
-                    self.draw_cell(z, row, col)
-    
-    def draw_cell(self, z, row, col):
-        cell_type = self.grid.grid[z, row, col]
-        
-        if z > 0 and cell_type == Grid3DEnvironment.EMPTY:
-            if z > self.current_level + 2:
-                return
-        
-        iso_x, iso_y = self.cart_to_iso(col + 0.5, row + 0.5, z)
-        
-        if cell_type == Grid3DEnvironment.OBSTACLE:
-            color = (80, 80, 80)
-            self.draw_cube(iso_x, iso_y, color, z)
+        self.frame_layers.blit(self.screen, 'buildings', (camera, self.grid.revision), self.draw_building_layer)
     
     def draw_marker(self, iso_x, iso_y, color, alpha=255):
         half_w = self.tile_width / 2
@@ -345,7 +491,7 @@ class Pathfinding3DVisualizer:
         pygame.draw.polygon(self.screen, color, points)
         pygame.draw.polygon(self.screen, self.DARK_GRAY, points, 1)
     
-    def draw_cube(self, iso_x, iso_y, color, z):
+    def draw_cube(self, surface, iso_x, iso_y, color, z):
         h = self.tile_height * 2  
 
         top_points = [
@@ -372,13 +518,13 @@ class Pathfinding3DVisualizer:
         darker = tuple(max(0, c - 40) for c in color)
         darkest = tuple(max(0, c - 60) for c in color)
         
-        pygame.draw.polygon(self.screen, darkest, left_points)
-        pygame.draw.polygon(self.screen, darker, right_points)
-        pygame.draw.polygon(self.screen, color, top_points)
+        pygame.draw.polygon(surface, darkest, left_points)
+        pygame.draw.polygon(surface, darker, right_points)
+        pygame.draw.polygon(surface, color, top_points)
         
-        pygame.draw.polygon(self.screen, self.BLACK, top_points, 1)
-        pygame.draw.polygon(self.screen, self.BLACK, left_points, 1)
-        pygame.draw.polygon(self.screen, self.BLACK, right_points, 1)
+        pygame.draw.polygon(surface, self.BLACK, top_points, 1)
+        pygame.draw.polygon(surface, self.BLACK, left_points, 1)
+        pygame.draw.polygon(surface, self.BLACK, right_points, 1)
     
     def draw_vehicle(self):
         if self.vehicle.position:
@@ -469,6 +615,21 @@ class Pathfinding3DVisualizer:
         
         self.button_manager.draw(self.screen)
 
+        if self.search_job is not None:
+            progress = self.search_job.progress
+            search_text = f"Searching... {progress.get('nodes_explored', 0)} nodes | frontier {progress.get('frontier_size', 0)}"
+            search_surface = self.small_font.render(search_text, True, self.CYAN)
+            self.screen.blit(search_surface, (20, 695))
+
+        if self.map_job is not None:
+            done, total = self.map_job.tiles_done, self.map_job.tiles_total
+            map_text = f"Loading map... {done}/{total} tiles" if total else "Loading map..."
+            self.screen.blit(self.small_font.render(map_text, True, self.CYAN), (20, 655))
+            bar_rect = pygame.Rect(20, 672, 200, 8)
+            pygame.draw.rect(self.screen, self.DARK_GRAY, bar_rect)
+            if total:
+                pygame.draw.rect(self.screen, self.CYAN, (bar_rect.x, bar_rect.y, bar_rect.width * done // total, bar_rect.height))
+
         mode_text = f"Mode: {self.mode.upper()}"
         mode_surface = self.font.render(mode_text, True, self.YELLOW)
         self.screen.blit(mode_surface, (20, 720))
@@ -481,7 +642,7 @@ class Pathfinding3DVisualizer:
         pitch_surface = self.font.render(camera_pitch_text, True, self.WHITE)
         self.screen.blit(pitch_surface, (20, 780))
         
-        controls_text = "Left-Click+Drag: Rotate 3D | Mouse Wheel: Zoom"
+        controls_text = "Left-Click+Drag: Rotate 3D | Mouse Wheel: Zoom | F5/F9: Save/Load scenario"
         controls_surface = self.small_font.render(controls_text, True, (150, 150, 150))
         self.screen.blit(controls_surface, (20, 810))
         
@@ -514,6 +675,7 @@ class Pathfinding3DVisualizer:
         cell = self.get_cell_from_mouse(pos)
         if cell:
             z, row, col = cell
+            self.cancel_search()
             
             if self.mode == 'start':
                 self.grid.set_start(0, row, col)  
@@ -552,23 +714,48 @@ class Pathfinding3DVisualizer:
         
         print(f"\nRunning {self.algorithm.upper().replace('_', ' ')}...")
         
-        if self.algorithm == 'dijkstra':
-            path, metrics = self.pathfinder.dijkstra(self.grid.start, self.grid.goal)
-        else:
-            path, metrics = self.pathfinder.a_star(self.grid.start, self.grid.goal)
+        # The search runs on the worker thread; the animation consumes explored nodes as they arrive
+        self.metrics = {}
+        self.animating_search = True
+        self.animation_index = 0
+        self.animation_explored = []
+        self.animation_final_path = []
+        self.explored_nodes = []
+        self.last_animation_time = pygame.time.get_ticks()
+        self.search_job = self.search_worker.submit(self.grid.start, self.grid.goal, self.algorithm)
+    
+    def cancel_search(self):
+        if self.search_job is None and not self.animating_search:
+            return
+        if self.search_job is not None:
+            print("✗ Search cancelled")
+        self.search_worker.cancel()
+        self.search_job = None
+        self.animating_search = False
+        self.animation_explored = []
+        self.animation_final_path = []
+        self.explored_nodes = []
+    
+    def poll_search(self):
+        job = self.search_job
+        if job is None:
+            return
         
-        self.metrics = metrics
+        self.explored_nodes.extend(job.drain_explored())
+        if not job.finished:
+            return
         
-        if path:
-            print(f"✓ Path found! Length: {len(path)}")
-            print(f"  Explored nodes: {len(metrics['explored_nodes'])}")
-
-            self.animating_search = True
-            self.animation_index = 0
-            self.animation_explored = []
-            self.animation_final_path = path.copy()
-            self.explored_nodes = metrics['explored_nodes'].copy()
-            self.last_animation_time = pygame.time.get_ticks()
+        self.search_job = None
+        if job.error is not None:
+            print(f"✗ Search failed: {job.error}")
+            self.animating_search = False
+            return
+        
+        self.metrics = job.metrics
+        if job.path:
+            print(f"✓ Path found! Length: {len(job.path)}")
+            print(f"  Explored nodes: {len(job.metrics['explored_nodes'])}")
+            self.animation_final_path = job.path.copy()
         else:
             print("✗ No path found!")
     
@@ -578,17 +765,20 @@ class Pathfinding3DVisualizer:
         while running:
             self.clock.tick(60)         
             current_time = pygame.time.get_ticks()
+            self.poll_search()
+            self.poll_map_load()
             if self.animating_search and current_time - self.last_animation_time > self.animation_speed:
                 self.last_animation_time = current_time
 
                 if self.animation_index < len(self.explored_nodes):
                     self.animation_explored.append(self.explored_nodes[self.animation_index])
                     self.animation_index += 1
-                else:
+                elif self.search_job is None:
                     self.animating_search = False
-                    self.grid.mark_path(self.animation_final_path)
-                    self.vehicle.set_path(self.animation_final_path)
-                    print("✓ Search animation complete, vehicle moving!")
+                    if self.animation_final_path:
+                        self.grid.mark_path(self.animation_final_path)
+                        self.vehicle.set_path(self.animation_final_path)
+                        print("✓ Search animation complete, vehicle moving!")
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -622,20 +812,17 @@ class Pathfinding3DVisualizer:
                         self.drag_start_pos = event.pos
 
                     self.button_manager.handle_event(event)
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F5:
+                        self.save_snapshot()
+                    elif event.key == pygame.K_F9 and self.snapshot_path and os.path.exists(self.snapshot_path):
+                        self.load_snapshot()
                 elif event.type == pygame.MOUSEWHEEL:
                     self.camera_distance += event.y * -0.1
                     self.camera_distance = max(0.5, min(2.5, self.camera_distance))
             
             self.vehicle.update()
             
-            for y in range(self.height):
-                progress = y / self.height
-                color = (
-                    int(self.BG_TOP[0] + (self.BG_BOTTOM[0] - self.BG_TOP[0]) * progress),
-                    int(self.BG_TOP[1] + (self.BG_BOTTOM[1] - self.BG_TOP[1]) * progress),
-                    int(self.BG_TOP[2] + (self.BG_BOTTOM[2] - self.BG_TOP[2]) * progress)
-                )
-                pygame.draw.line(self.screen, color, (0, y), (self.width, y))
             self.draw_3d_grid()
             self.draw_vehicle()
             self.draw_ui()